@@ -58,10 +58,10 @@ def redis_hget(key1, key2):
     return _redis.hget(key1, key2)
 
 
-def redis_set(key, value, ttl=None):
+def redis_set(key, value, ttl=None, nx=False):
     if not redis_healthcheck():
         return
-    return _redis.set(key, value, ex=ttl)
+    return _redis.set(key, value, ex=ttl, nx=nx)
 
 
 def redis_hset(key1, key2, value):
@@ -76,6 +76,31 @@ def redis_delete(key):
     return _redis.delete(key)
 
 
+def redis_lpush(key, *values):
+    if not redis_healthcheck():
+        return
+    return _redis.lpush(key, *values)
+
+
+def redis_rpoplpush(source, destination):
+    """Move the last value of the source list to the head of the destination list atomically"""
+    if not redis_healthcheck():
+        return
+    return _redis.rpoplpush(source, destination)
+
+
+def redis_lrem(key, value, count=1):
+    if not redis_healthcheck():
+        return
+    return _redis.lrem(key, count, value)
+
+
+def redis_llen(key):
+    if not redis_healthcheck():
+        return 0
+    return _redis.llen(key)
+
+
 def start_job_async_or_sync(job, *args, in_seconds=0, **kwargs):
     """
     Start job async with redis or sync if redis is not connected
@@ -457,10 +457,22 @@ TASKS_MAX_NUMBER = 1000000
 TASKS_MAX_FILE_SIZE = DATA_UPLOAD_MAX_MEMORY_SIZE
 
 TASK_LOCK_TTL = int(get_env('TASK_LOCK_TTL', default=86400))
+# append project summary counter changes to a log (ProjectSummaryDelta) instead of rewriting the summary row,
+# they are folded into ProjectSummary when it's read or by compact_project_summaries command
+PROJECT_SUMMARY_DELTAS = get_bool_env('PROJECT_SUMMARY_DELTAS', False)
+# number of tasks locked for an annotator by one /next call, next calls take them without sampling, 0 disables it
+NEXT_TASK_RESERVATION_SIZE = int(get_env('NEXT_TASK_RESERVATION_SIZE', default=0))
+# reserved tasks return to other annotators after this number of seconds
+NEXT_TASK_RESERVATION_TTL = int(get_env('NEXT_TASK_RESERVATION_TTL', default=300))
+# process follow-up updates of annotation submits (draft removal, stream history, etc) in batched background jobs
+ANNOTATION_SIDE_EFFECTS_ASYNC = get_bool_env('ANNOTATION_SIDE_EFFECTS_ASYNC', False)
+ANNOTATION_SIDE_EFFECTS_BATCH_SIZE = int(get_env('ANNOTATION_SIDE_EFFECTS_BATCH_SIZE', default=100))
 
 LABEL_STREAM_HISTORY_LIMIT = int(get_env('LABEL_STREAM_HISTORY_LIMIT', default=100))
 
 RANDOM_NEXT_TASK_SAMPLE_SIZE = int(get_env('RANDOM_NEXT_TASK_SAMPLE_SIZE', 50))
+# number of unlocked tasks checked by one query in sequential sampling
+SEQUENCE_NEXT_TASK_BATCH_SIZE = int(get_env('SEQUENCE_NEXT_TASK_BATCH_SIZE', 10))
 
 TASK_API_PAGE_SIZE_MAX = int(get_env('TASK_API_PAGE_SIZE_MAX', 0)) or None
 
@@ -524,6 +536,19 @@ DATA_MANAGER_ANNOTATIONS_MAP = {}
 DATA_MANAGER_ACTIONS = {}
 DATA_MANAGER_CUSTOM_FILTER_EXPRESSIONS = 'data_manager.functions.custom_filter_expressions'
 DATA_MANAGER_PREPROCESS_FILTER = 'data_manager.functions.preprocess_filter'
+# sort and filter Data Manager by aggregates materialized in TaskAggregate table instead of
+# calculating them over annotations and predictions, run `python manage.py backfill_task_aggregates` before enabling
+DATA_MANAGER_MATERIALIZED_AGGREGATES = get_bool_env('DATA_MANAGER_MATERIALIZED_AGGREGATES', False)
+# max number of task data columns with database indexes per project (project.indexed_data_columns)
+DATA_MANAGER_MAX_INDEXED_COLUMNS = int(get_env('DATA_MANAGER_MAX_INDEXED_COLUMNS', 10))
+# cache totals and ordered ids of the first pages of filtered task lists for this number of seconds, 0 disables it;
+# results are invalidated when tasks, annotations or predictions of the project change,
+# it works only with a shared CACHES backend (e.g. redis), so all workers see the invalidation
+DATA_MANAGER_RESULT_CACHE_TTL = int(get_env('DATA_MANAGER_RESULT_CACHE_TTL', 0))
+DATA_MANAGER_RESULT_CACHE_IDS = int(get_env('DATA_MANAGER_RESULT_CACHE_IDS', 1000))
+# don't count filtered task lists on every page: totals are estimated when nothing is filtered,
+# otherwise the Data Manager fetches them separately from /api/dm/totals/
+DATA_MANAGER_DEFERRED_TOTALS = get_bool_env('DATA_MANAGER_DEFERRED_TOTALS', False)
 USER_LOGIN_FORM = 'users.forms.LoginForm'
 PROJECT_MIXIN = 'projects.mixins.ProjectMixin'
 TASK_MIXIN = 'tasks.mixins.TaskMixin'
@@ -611,6 +636,25 @@ FUTURE_SAVE_TASK_TO_STORAGE = get_bool_env('FUTURE_SAVE_TASK_TO_STORAGE', defaul
 FUTURE_SAVE_TASK_TO_STORAGE_JSON_EXT = get_bool_env('FUTURE_SAVE_TASK_TO_STORAGE_JSON_EXT', default=True)
 STORAGE_IN_PROGRESS_TIMER = float(get_env('STORAGE_IN_PROGRESS_TIMER', 5.0))
 STORAGE_EXPORT_CHUNK_SIZE = int(get_env('STORAGE_EXPORT_CHUNK_SIZE', 100))
+# max number of objects uploaded in parallel by an export storage sync
+STORAGE_EXPORT_CONCURRENCY = int(get_env('STORAGE_EXPORT_CONCURRENCY', 16))
+STORAGE_IMPORT_BATCH_SIZE = int(get_env('STORAGE_IMPORT_BATCH_SIZE', 1000))
+# max number of objects downloaded in parallel by an import storage sync
+STORAGE_IMPORT_CONCURRENCY = int(get_env('STORAGE_IMPORT_CONCURRENCY', 16))
+# import storage sync lists only keys after the last synced key, new keys must sort after the old ones;
+# run a full sync (incremental=false) after changing storage prefix or filters
+STORAGE_INCREMENTAL_SYNC = get_bool_env('STORAGE_INCREMENTAL_SYNC', False)
+# cloud storage clients are shared by storages with the same credentials, least recently used ones
+# are dropped when the pool is full, clients older than TTL (seconds) are recreated
+STORAGE_CLIENT_POOL_SIZE = int(get_env('STORAGE_CLIENT_POOL_SIZE', 64))
+STORAGE_CLIENT_POOL_TTL = int(get_env('STORAGE_CLIENT_POOL_TTL', 3600))
+# generated storage URLs are cached for this fraction of storage presign TTL, 0 disables the cache;
+# cached URLs can be shared between workers via redis
+STORAGE_PRESIGNED_URL_CACHE_TTL_RATIO = float(get_env('STORAGE_PRESIGNED_URL_CACHE_TTL_RATIO', 0.5))
+STORAGE_PRESIGNED_URL_CACHE_SIZE = int(get_env('STORAGE_PRESIGNED_URL_CACHE_SIZE', 10000))
+STORAGE_PRESIGNED_URL_CACHE_REDIS = get_bool_env('STORAGE_PRESIGNED_URL_CACHE_REDIS', False)
+# number of task batches prefetched in a background thread during export snapshot creation, 0 disables prefetching
+EXPORT_PREFETCH_BATCHES = int(get_env('EXPORT_PREFETCH_BATCHES', 0))
 
 USE_NGINX_FOR_EXPORT_DOWNLOADS = get_bool_env('USE_NGINX_FOR_EXPORT_DOWNLOADS', False)
 
@@ -627,6 +627,25 @@ def batch(iterable, n=1):
         yield iterable[ndx : min(ndx + n, l)]
 
 
+def batch_ids(queryset, n=1000):
+    """Keyset pagination over queryset primary keys: yields lists with up to n ids ordered by id.
+
+    Each chunk is a separate `WHERE id > last_id ORDER BY id LIMIT n` query,
+    so nothing is materialized up front and every query hits (project_id, id)-like indexes
+    regardless of the queryset size.
+    """
+    queryset = queryset.order_by('pk').values_list('pk', flat=True)
+    last_id = None
+    while True:
+        chunk = queryset if last_id is None else queryset.filter(pk__gt=last_id)
+        ids = list(chunk[:n])
+        if ids:
+            yield ids
+        if len(ids) < n:
+            return
+        last_id = ids[-1]
+
+
 def round_floats(o):
     if isinstance(o, float):
         return round(o, 2)
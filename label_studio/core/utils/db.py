@@ -1,7 +1,8 @@
+import json
 import logging
 from typing import Optional, TypeVar
 
-from django.db import models
+from django.db import connections, models
 from django.db.models import Model, QuerySet, Subquery
 
 logger = logging.getLogger(__name__)
@@ -23,3 +24,24 @@ def fast_first(queryset: QuerySet[ModelType]) -> Optional[ModelType]:
     if result := queryset[:1]:
         return result[0]
     return None
+
+
+def estimate_count(queryset: QuerySet) -> int:
+    """Row count of the queryset estimated by the Postgres query planner,
+    exact count is used for other databases
+    """
+    connection = connections[queryset.db]
+    if connection.vendor != 'postgresql':
+        return queryset.count()
+
+    try:
+        sql, params = queryset.order_by().query.get_compiler(queryset.db).as_sql()
+        with connection.cursor() as cursor:
+            cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}', params)
+            plan = cursor.fetchone()[0]
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        return int(plan[0]['Plan']['Plan Rows'])
+    except Exception as exc:
+        logger.warning(f'Can not estimate count with the query planner: {exc}')
+        return queryset.count()
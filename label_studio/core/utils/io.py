@@ -1,6 +1,7 @@
 """This file and its contents are licensed under the Apache License 2.0. Please see the included NOTICE for copyright information and LICENSE for a copy of the license.
 """
 import glob
+import hashlib
 import io
 import ipaddress
 import itertools
@@ -169,6 +170,29 @@ class SerializableGenerator(list):
         return itertools.chain(self._head, *self[:1])
 
 
+def write_json_list(items, file, dumps=json.dumps, separator=','):
+    """Write items into binary file as JSON list one by one, md5 is calculated on the fly
+
+    :param items: iterable of JSON serializable objects, e.g. generator
+    :param file: file object opened in binary mode
+    :param dumps: function to encode one item into str
+    :param separator: list items separator
+    :return: md5 hexdigest of written bytes
+    """
+    md5_object = hashlib.md5()  # nosec
+
+    def write(chunk):
+        chunk = chunk.encode('utf-8')
+        md5_object.update(chunk)
+        file.write(chunk)
+
+    write('[')
+    for i, item in enumerate(items):
+        write(separator + dumps(item) if i else dumps(item))
+    write(']')
+    return md5_object.hexdigest()
+
+
 def validate_upload_url(url, block_local_urls=True):
     """Utility function for defending against SSRF attacks. Raises
         - InvalidUploadUrlError if the url is not HTTP[S], or if block_local_urls is enabled
@@ -0,0 +1,4 @@
+info = {"message": "[user-014] Add per-project indexes for task data columns", "commit": "0afb12ac294e69ee74b4d4a129b46ce136542cc4", "date": "2026/10/18 06:45:10", "branch": "", "version": "0afb12a+dirty"}
+
+# This file is automatically generated by version.py
+# Do not include it to git!
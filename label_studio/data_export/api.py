@@ -9,7 +9,7 @@ from urllib.parse import urlparse
 from core.feature_flags import flag_set
 from core.permissions import all_permissions
 from core.redis import start_job_async_or_sync
-from core.utils.common import batch
+from core.utils.common import batch_ids
 from django.conf import settings
 from django.core.files import File
 from django.core.files.storage import FileSystemStorage
@@ -167,6 +167,16 @@ class ExportAPI(generics.RetrieveAPIView):
     def get_task_queryset(self, queryset):
         return queryset.select_related('project').prefetch_related('annotations', 'predictions')
 
+    def get_export_data(self, query, interpolate_key_frames):
+        """Serialize tasks batch by batch, only one batch is kept in memory at the same time"""
+        for _task_ids in batch_ids(query, 1000):
+            yield from ExportDataSerializer(
+                self.get_task_queryset(Task.objects.filter(id__in=_task_ids)),
+                many=True,
+                expand=['drafts'],
+                context={'interpolate_key_frames': interpolate_key_frames},
+            ).data
+
     def get(self, request, *args, **kwargs):
         project = self.get_object()
         query_serializer = ExportParamSerializer(data=request.GET)
@@ -189,17 +199,8 @@ class ExportAPI(generics.RetrieveAPIView):
         if only_finished:
             query = query.filter(annotations__isnull=False).distinct()
 
-        task_ids = query.values_list('id', flat=True)
-
         logger.debug('Serialize tasks for export')
-        tasks = []
-        for _task_ids in batch(task_ids, 1000):
-            tasks += ExportDataSerializer(
-                self.get_task_queryset(query.filter(id__in=_task_ids)),
-                many=True,
-                expand=['drafts'],
-                context={'interpolate_key_frames': interpolate_key_frames},
-            ).data
+        tasks = self.get_export_data(query, interpolate_key_frames)
         logger.debug('Prepare export files')
 
         export_stream, content_type, filename = DataExport.generate_export_file(
@@ -3,25 +3,27 @@ import json
 import logging
 import pathlib
 import shutil
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-from functools import reduce
+from functools import partial, reduce
 
 import django_rq
 from core.redis import redis_connected
-from core.utils.common import batch
+from core.utils.common import batch_ids
 from core.utils.io import (
-    SerializableGenerator,
     get_all_dirs_from_dir,
     get_all_files_from_dir,
     get_temp_dir,
     read_bytes_stream,
+    write_json_list,
 )
 from data_manager.models import View
 from django.conf import settings
 from django.core.files import File
 from django.core.files import temp as tempfile
-from django.db import transaction
-from django.db.models import Prefetch
+from django.db import connections, transaction
+from django.db.models import Exists, OuterRef, Prefetch
 from django.db.models.query_utils import Q
 from django.utils import dateformat, timezone
 from label_studio_converter import Converter
@@ -42,13 +44,15 @@ class ExportMixin:
     def get_default_title(self):
         return f"{self.project.title.replace(' ', '-')}-at-{dateformat.format(timezone.now(), 'Y-m-d-H-i')}"
 
-    def _get_filtered_tasks(self, tasks, task_filter_options=None):
+    def _get_filtered_tasks(self, tasks, task_filter_options=None, annotation_filter_options=None):
         """
         task_filter_options: None or Dict({
             view: optional int id or View
             skipped: optional None or str:("include|exclude")
             finished: optional None or str:("include|exclude")
             annotated: optional None or str:("include|exclude")
+            only_with_annotations: optional None or bool,
+                keep only tasks having annotations that match annotation_filter_options
         })
         """
         if not isinstance(task_filter_options, dict):
@@ -59,7 +63,9 @@ class ExportMixin:
                 prepare_params = View.objects.get(project=self.project, id=value).get_prepare_tasks_params(
                     add_selected_items=True
                 )
-                tab_tasks = Task.prepared.only_filtered(prepare_params=prepare_params).values_list('id', flat=True)
+                tab_tasks = Task.prepared.only_filtered(
+                    prepare_params=prepare_params, project=self.project
+                ).values_list('id', flat=True)
                 tasks = tasks.filter(id__in=tab_tasks)
             except (ValueError, View.DoesNotExist) as exc:
                 logger.warning(f'Incorrect view params {exc}')
@@ -82,6 +88,9 @@ class ExportMixin:
                 tasks = tasks.filter(annotations__was_cancelled=False)
             elif value == EXCLUDE:
                 tasks = tasks.exclude(annotations__was_cancelled=False)
+        if task_filter_options.get('only_with_annotations'):
+            annotations = self._get_filtered_annotations_queryset(annotation_filter_options=annotation_filter_options)
+            tasks = tasks.filter(Exists(annotations.filter(task=OuterRef('pk'))))
 
         return tasks
 
@@ -150,6 +159,43 @@ class ExportMixin:
             .prefetch_related('predictions', 'drafts')
         )
 
+    def _fetch_tasks(self, ids, annotation_filter_options):
+        return list(self.get_task_queryset(ids, annotation_filter_options))
+
+    def _iter_id_batches(self, tasks_queryset, batch_size):
+        # all filters are applied in the id query, so counters are taken from it
+        for ids in batch_ids(tasks_queryset, batch_size):
+            self.counters['task_number'] += len(ids)
+            yield ids
+
+    def _iter_task_batches(self, id_batches, annotation_filter_options):
+        """Fetch tasks with prefetched relations batch by batch.
+
+        If settings.EXPORT_PREFETCH_BATCHES > 0, the next batches are fetched from DB in a background thread
+        while the current batch is being serialized and written, so DB round trips and serialization overlap.
+        """
+        prefetch_batches = settings.EXPORT_PREFETCH_BATCHES
+        if prefetch_batches <= 0:
+            for ids in id_batches:
+                yield self._fetch_tasks(ids, annotation_filter_options)
+            return
+
+        executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='export-prefetch')
+        futures = deque()
+        try:
+            for ids in id_batches:
+                futures.append(executor.submit(self._fetch_tasks, ids, annotation_filter_options))
+                if len(futures) > prefetch_batches:
+                    yield futures.popleft().result()
+            while futures:
+                yield futures.popleft().result()
+        finally:
+            for future in futures:
+                future.cancel()
+            # the worker thread opens its own DB connection, it must be closed in the same thread
+            executor.submit(connections.close_all).result()
+            executor.shutdown(wait=True)
+
     def get_export_data(self, task_filter_options=None, annotation_filter_options=None, serialization_options=None):
         """
         serialization_options: None or Dict({
@@ -178,28 +224,23 @@ class ExportMixin:
         logger.debug('Run get_task_queryset')
 
         with transaction.atomic():
-            # TODO: make counters from queryset
-            # counters = Project.objects.with_counts().filter(id=self.project.id)[0].get_counters()
-            self.counters = {'task_number': 0}
             all_tasks = self.project.tasks
             logger.debug('Tasks filtration')
-            task_ids = (
-                self._get_filtered_tasks(all_tasks, task_filter_options=task_filter_options)
-                .distinct()
-                .values_list('id', flat=True)
-            )
+            tasks_queryset = self._get_filtered_tasks(
+                all_tasks,
+                task_filter_options=task_filter_options,
+                annotation_filter_options=annotation_filter_options,
+            ).distinct()
+            self.counters = {'task_number': 0}
             base_export_serializer_option = self._get_export_serializer_option(serialization_options)
             i = 0
             BATCH_SIZE = 1000
-            for ids in batch(task_ids, BATCH_SIZE):
+            for tasks in self._iter_task_batches(
+                self._iter_id_batches(tasks_queryset, BATCH_SIZE), annotation_filter_options
+            ):
                 i += 1
-                tasks = list(self.get_task_queryset(ids, annotation_filter_options))
                 logger.debug(f'Batch: {i*BATCH_SIZE}')
-                if isinstance(task_filter_options, dict) and task_filter_options.get('only_with_annotations'):
-                    tasks = [task for task in tasks if task.annotations.exists()]
-
                 serializer = ExportDataSerializer(tasks, many=True, **base_export_serializer_option)
-                self.counters['task_number'] += len(tasks)
                 for task in serializer.data:
                     yield task
 
@@ -231,22 +272,15 @@ class ExportMixin:
             f'serialization_options: {serialization_options}\n'
         )
         try:
-            iter_json = json.JSONEncoder(ensure_ascii=False).iterencode(
-                SerializableGenerator(
-                    self.get_export_data(
-                        task_filter_options=task_filter_options,
-                        annotation_filter_options=annotation_filter_options,
-                        serialization_options=serialization_options,
-                    )
-                )
+            export_data = self.get_export_data(
+                task_filter_options=task_filter_options,
+                annotation_filter_options=annotation_filter_options,
+                serialization_options=serialization_options,
             )
             with tempfile.NamedTemporaryFile(suffix='.export.json', dir=settings.FILE_UPLOAD_TEMP_DIR) as file:
-                for chunk in iter_json:
-                    encoded_chunk = chunk.encode('utf-8')
-                    file.write(encoded_chunk)
+                # tasks are encoded one by one with C json encoder, md5 is calculated while writing
+                md5 = write_json_list(export_data, file, dumps=partial(json.dumps, ensure_ascii=False), separator=', ')
                 file.seek(0)
-
-                md5 = self.eval_md5(file)
                 self.save_file(file, md5)
 
             self.status = self.Status.COMPLETED
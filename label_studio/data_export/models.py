@@ -1,17 +1,18 @@
 """This file and its contents are licensed under the Apache License 2.0. Please see the included NOTICE for copyright information and LICENSE for a copy of the license.
 """
-import hashlib
 import logging
 import os
 import shutil
+import tempfile
 from copy import deepcopy
 from datetime import datetime
+from functools import partial
 
 import ujson as json
 from core import version
 from core.feature_flags import flag_set
 from core.utils.common import load_func
-from core.utils.io import get_all_files_from_dir, get_temp_dir, read_bytes_stream
+from core.utils.io import get_all_files_from_dir, get_temp_dir, read_bytes_stream, write_json_list
 from django.conf import settings
 from django.db import models
 from django.db.models.signals import post_save
@@ -94,8 +95,8 @@ def set_export_default_name(sender, instance, created, **kwargs):
 class DataExport(object):
     # TODO: deprecated
     @staticmethod
-    def save_export_files(project, now, get_args, data, md5, name):
-        """Generate two files: meta info and result file and store them locally for logging"""
+    def save_export_files(project, now, get_args, data_path, md5, name):
+        """Move already written result file to its final name and generate meta info file for logging"""
         filename_results = os.path.join(settings.EXPORT_DIR, name + '.json')
         filename_info = os.path.join(settings.EXPORT_DIR, name + '-info.json')
         annotation_number = Annotation.objects.filter(project=project).count()
@@ -122,12 +123,34 @@ class DataExport(object):
             },
         }
 
-        with open(filename_results, 'w', encoding='utf-8') as f:
-            f.write(data)
+        os.replace(data_path, filename_results)
         with open(filename_info, 'w', encoding='utf-8') as f:
             json.dump(info, f, ensure_ascii=False)
         return filename_results
 
+    @staticmethod
+    def write_export_data(tasks, file):
+        """Stream tasks into binary file as JSON list one by one
+
+        :return: md5 hexdigest of written bytes
+        """
+        return write_json_list(tasks, file, dumps=partial(json.dumps, ensure_ascii=False))
+
+    @staticmethod
+    def add_most_common_label(tasks):
+        for annotation_data in tasks:
+            labels = {}
+            for annotation in annotation_data["annotations"]:
+                for annotation_result in annotation["result"]:
+                    annotaion_label = annotation_result["value"][annotation_result["type"]][0]
+                    if annotaion_label in labels:
+                        labels[annotaion_label] = labels[annotaion_label] + 1
+                    else:
+                        labels[annotaion_label] = 1
+            if len(labels) > 0:
+                annotation_data['most_common_label'] = max(labels.items(), key=lambda x: x[1])
+            yield annotation_data
+
     @staticmethod
     def get_export_formats(project):
         converter = Converter(config=project.get_parsed_config(), project_dir=None)
@@ -143,35 +166,25 @@ class DataExport(object):
 
     @staticmethod
     def generate_export_file(project, tasks, output_format, download_resources, get_args):
-        for idx, annotation_data in enumerate(tasks):
-            # most_common_file = None
-            most_common_label = None
-            # files = {}
-            labels = {}
-            # file_upload = annotation_data["file_upload"]
-            # if file_upload in files:
-            #     files[file_upload] = files[file_upload] + 1
-            # else:
-            #     files[file_upload] = 1
-            for annotation in annotation_data["annotations"]:
-                for annotation_result in annotation["result"]:
-                    annotaion_label = annotation_result["value"][annotation_result["type"]][0]
-                    if annotaion_label in labels:
-                            labels[annotaion_label] = labels[annotaion_label]+1
-                    else:
-                        labels[annotaion_label] = 1
-            if len(labels) > 0:
-                annotation_data['most_common_label'] = max(labels.items(), key=lambda x: x[1])
-            # if len(files) > 0:
-            #     annotation_data['most_common_file'] = max(files.items(), key= lambda x: x[1])
+        """Generate export file in output_format from tasks
+
+        :param tasks: iterable of serialized tasks, it's consumed only once,
+                      so generators are welcome to keep memory usage bounded by one batch
+        """
+        tasks = DataExport.add_most_common_label(tasks)
 
-        # prepare for saving
+        # prepare for saving: stream tasks to temp file and calculate md5 simultaneously
         now = datetime.now()
-        data = json.dumps(tasks, ensure_ascii=False)
-        md5 = hashlib.md5(json.dumps(data).encode('utf-8')).hexdigest()   # nosec
+        with tempfile.NamedTemporaryFile(suffix='.export.tmp', dir=settings.EXPORT_DIR, delete=False) as file:
+            try:
+                md5 = DataExport.write_export_data(tasks, file)
+            except Exception:
+                file.close()
+                os.remove(file.name)
+                raise
         name = 'project-' + str(project.id) + '-at-' + now.strftime('%Y-%m-%d-%H-%M') + f'-{md5[0:8]}'
 
-        input_json = DataExport.save_export_files(project, now, get_args, data, md5, name)
+        input_json = DataExport.save_export_files(project, now, get_args, file.name, md5, name)
 
         converter = Converter(
             config=project.get_parsed_config(),
@@ -13,6 +13,7 @@ from importlib import import_module
 
 from core.feature_flags import flag_set
 from data_manager.functions import DataManagerException
+from data_manager.result_cache import bump_data_version
 from django.conf import settings
 from rest_framework.exceptions import PermissionDenied as DRFPermissionDenied
 
@@ -115,6 +116,9 @@ def perform_action(action_id, project, queryset, user, **kwargs):
         text = 'Error while perform action: ' + action_id + '\n' + tb.format_exc()
         logger.error(text, extra={'sentry_skip': True})
         raise e
+    finally:
+        # actions change tasks in bulk bypassing model signals
+        bump_data_version(project.id)
 
     return result
 
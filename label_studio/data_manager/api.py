@@ -1,16 +1,26 @@
 """This file and its contents are licensed under the Apache License 2.0. Please see the included NOTICE for copyright information and LICENSE for a copy of the license.
 """
 import logging
+from functools import partial
 
 from asgiref.sync import async_to_sync, sync_to_async
 from core.feature_flags import flag_set
 from core.permissions import ViewClassPermission, all_permissions
 from core.utils.common import int_from_request, load_func
+from core.utils.db import estimate_count
 from core.utils.params import bool_from_request
 from data_manager.actions import get_all_actions, perform_action
 from data_manager.functions import evaluate_predictions, get_prepare_params, get_prepared_queryset
 from data_manager.managers import get_fields_for_evaluation
 from data_manager.models import View
+from data_manager.result_cache import (
+    CachedResultPaginator,
+    DeferredCountPaginator,
+    get_cached_result,
+    get_result_cache_key,
+    result_cache_enabled,
+    set_cached_result,
+)
 from data_manager.serializers import DataManagerTaskSerializer, ViewResetSerializer, ViewSerializer
 from django.conf import settings
 from django.utils.decorators import method_decorator
@@ -21,6 +31,7 @@ from projects.models import Project
 from projects.serializers import ProjectSerializer
 from rest_framework import generics, viewsets
 from rest_framework.decorators import action
+from rest_framework.exceptions import NotFound
 from rest_framework.pagination import PageNumberPagination
 from rest_framework.response import Response
 from rest_framework.views import APIView
@@ -130,11 +141,29 @@ class ViewAPI(viewsets.ModelViewSet):
         return View.objects.filter(project__organization=self.request.user.active_organization).order_by('id')
 
 
+def count_totals(queryset):
+    """Exact totals of the filtered task queryset"""
+    return {
+        'total': queryset.count(),
+        'total_predictions': Prediction.objects.filter(task_id__in=queryset).count(),
+        'total_annotations': Annotation.objects.filter(task_id__in=queryset, was_cancelled=False).count(),
+    }
+
+
+def has_filters(prepare_params):
+    """Check if prepare params narrow down the list of project tasks"""
+    if prepare_params.filters and prepare_params.filters.items:
+        return True
+    selected = prepare_params.selectedItems
+    return selected is not None and not (selected.all and not selected.excluded)
+
+
 class TaskPagination(PageNumberPagination):
     page_size = 100
     page_size_query_param = 'page_size'
     total_annotations = 0
     total_predictions = 0
+    totals_mode = None
     max_page_size = settings.TASK_API_PAGE_SIZE_MAX
 
     @async_to_sync
@@ -151,25 +180,58 @@ class TaskPagination(PageNumberPagination):
         self.total_annotations = Annotation.objects.filter(task_id__in=queryset, was_cancelled=False).count()
         return super().paginate_queryset(queryset, request, view)
 
+    def cached_paginate_queryset(self, queryset, request, view, cache_key):
+        """Take totals and ordered ids of the first pages from the result cache,
+        so scrolling doesn't run aggregations over the whole filtered queryset on every page
+        """
+        result = get_cached_result(cache_key)
+        if result is None:
+            result = count_totals(queryset)
+            result['ids'] = list(queryset.values_list('id', flat=True)[: settings.DATA_MANAGER_RESULT_CACHE_IDS])
+            set_cached_result(cache_key, result, settings.DATA_MANAGER_RESULT_CACHE_TTL)
+
+        self.total_predictions = result['total_predictions']
+        self.total_annotations = result['total_annotations']
+        self.django_paginator_class = partial(CachedResultPaginator, result=result)
+        return super().paginate_queryset(queryset, request, view)
+
+    def deferred_paginate_queryset(self, queryset, request, view, totals):
+        """Don't count the filtered queryset, totals are estimated or unknown and fetched from TaskTotalsAPI"""
+        self.total_predictions = totals['total_predictions']
+        self.total_annotations = totals['total_annotations']
+        self.totals_mode = totals['totals_mode']
+        self.django_paginator_class = partial(DeferredCountPaginator, count=totals['total'])
+        return super().paginate_queryset(queryset, request, view)
+
     def paginate_queryset(self, queryset, request, view=None):
+        deferred_totals = getattr(view, 'deferred_totals', None)
+        if deferred_totals is not None:
+            return self.deferred_paginate_queryset(queryset, request, view, deferred_totals)
+        cache_key = getattr(view, 'result_cache_key', None)
+        if cache_key is not None:
+            return self.cached_paginate_queryset(queryset, request, view, cache_key)
         if flag_set('fflag_fix_back_leap_24_tasks_api_optimization_05092023_short'):
             return self.async_paginate_queryset(queryset, request, view)
         else:
             return self.sync_paginate_queryset(queryset, request, view)
 
     def get_paginated_response(self, data):
-        return Response(
-            {
-                'total_annotations': self.total_annotations,
-                'total_predictions': self.total_predictions,
-                'total': self.page.paginator.count,
-                'tasks': data,
-            }
-        )
+        response = {
+            'total_annotations': self.total_annotations,
+            'total_predictions': self.total_predictions,
+            'total': self.page.paginator.count,
+            'tasks': data,
+        }
+        if self.totals_mode is not None:
+            # 'exact', 'estimate' or 'deferred' when totals are None and must be fetched from /api/dm/totals/
+            response['totals_mode'] = self.totals_mode
+        return Response(response)
 
 
 class TaskListAPI(generics.ListCreateAPIView):
     task_serializer_class = DataManagerTaskSerializer
+    result_cache_key = None
+    deferred_totals = None
     permission_required = ViewClassPermission(
         GET=all_permissions.tasks_view,
         POST=all_permissions.tasks_change,
@@ -191,8 +253,8 @@ class TaskListAPI(generics.ListCreateAPIView):
             'annotations': all_fields,
         }
 
-    def get_task_queryset(self, request, prepare_params):
-        return Task.prepared.only_filtered(prepare_params=prepare_params)
+    def get_task_queryset(self, request, prepare_params, project=None):
+        return Task.prepared.only_filtered(prepare_params=prepare_params, project=project)
 
     @staticmethod
     def prefetch(queryset):
@@ -209,26 +271,53 @@ class TaskListAPI(generics.ListCreateAPIView):
             'file_upload',
         )
 
-    def get(self, request):
-        # get project
+    def get_project(self, request):
         view_pk = int_from_request(request.GET, 'view', 0) or int_from_request(request.data, 'view', 0)
         project_pk = int_from_request(request.GET, 'project', 0) or int_from_request(request.data, 'project', 0)
         if project_pk:
             project = generics.get_object_or_404(Project, pk=project_pk)
-            self.check_object_permissions(request, project)
         elif view_pk:
             view = generics.get_object_or_404(View, pk=view_pk)
             project = view.project
-            self.check_object_permissions(request, project)
         else:
-            return Response({'detail': 'Neither project nor view id specified'}, status=404)
+            raise NotFound('Neither project nor view id specified')
+        self.check_object_permissions(request, project)
+        return project, view_pk
+
+    def get_deferred_totals(self, project, prepare_params, totals_cache_key):
+        """Totals which don't need counting of the filtered queryset:
+        cached exact totals, query planner estimates for the whole project when nothing is filtered,
+        otherwise unknown totals which are fetched from TaskTotalsAPI
+        """
+        totals = get_cached_result(totals_cache_key)
+        if totals is not None:
+            return dict(totals, totals_mode='exact')
+        if not has_filters(prepare_params):
+            return {
+                'total': estimate_count(Task.objects.filter(project=project)),
+                'total_annotations': estimate_count(Annotation.objects.filter(project=project, was_cancelled=False)),
+                'total_predictions': estimate_count(Prediction.objects.filter(project=project)),
+                'totals_mode': 'estimate',
+            }
+        return {'total': None, 'total_annotations': None, 'total_predictions': None, 'totals_mode': 'deferred'}
+
+    def get(self, request):
+        # get project
+        project, view_pk = self.get_project(request)
         # get prepare params (from view or from payload directly)
         prepare_params = get_prepare_params(request, project)
-        queryset = self.get_task_queryset(request, prepare_params)
+        # building of the queryset changes filter values in prepare_params, cache keys must match TaskTotalsAPI ones
+        cache_params = prepare_params.copy(deep=True, exclude={'request'})
+        queryset = self.get_task_queryset(request, prepare_params, project)
         context = self.get_task_serializer_context(self.request, project)
 
         # paginated tasks
         self.pagination_class = TaskPagination
+        if settings.DATA_MANAGER_DEFERRED_TOTALS:
+            totals_cache_key = get_result_cache_key(project.id, view_pk, cache_params, request.user.id, 'totals')
+            self.deferred_totals = self.get_deferred_totals(project, cache_params, totals_cache_key)
+        elif result_cache_enabled():
+            self.result_cache_key = get_result_cache_key(project.id, view_pk, cache_params, request.user.id)
         page = self.paginate_queryset(queryset)
 
         # get request params
@@ -248,6 +337,7 @@ class TaskListAPI(generics.ListCreateAPIView):
                         fields_for_evaluation=fields_for_evaluation,
                         all_fields=all_fields,
                         request=request,
+                        project=project,
                     )
                 )
             )
@@ -275,12 +365,44 @@ class TaskListAPI(generics.ListCreateAPIView):
         if project.evaluate_predictions_automatically:
             evaluate_predictions(queryset.filter(predictions__isnull=True))
         queryset = Task.prepared.annotate_queryset(
-            queryset, fields_for_evaluation=fields_for_evaluation, all_fields=all_fields, request=request
+            queryset,
+            fields_for_evaluation=fields_for_evaluation,
+            all_fields=all_fields,
+            request=request,
+            project=project,
         )
         serializer = self.task_serializer_class(queryset, many=True, context=context)
         return Response(serializer.data)
 
 
+class TaskTotalsAPI(TaskListAPI):
+    """Totals of the filtered task list, which are deferred by TaskListAPI with DATA_MANAGER_DEFERRED_TOTALS"""
+
+    http_method_names = ['get']
+
+    @swagger_auto_schema(
+        tags=['Data Manager'],
+        operation_summary='Get task list totals',
+        operation_description='Retrieve the number of tasks, annotations and predictions in the filtered task list.',
+    )
+    def get(self, request):
+        project, view_pk = self.get_project(request)
+        prepare_params = get_prepare_params(request, project)
+        cache_params = prepare_params.copy(deep=True, exclude={'request'})
+
+        # totals are a part of the cached page results
+        result = get_cached_result(get_result_cache_key(project.id, view_pk, cache_params, request.user.id))
+        if result is not None:
+            return Response({key: result[key] for key in ('total', 'total_annotations', 'total_predictions')})
+
+        cache_key = get_result_cache_key(project.id, view_pk, cache_params, request.user.id, 'totals')
+        totals = get_cached_result(cache_key)
+        if totals is None:
+            totals = count_totals(self.get_task_queryset(request, prepare_params, project))
+            set_cached_result(cache_key, totals, settings.DATA_MANAGER_RESULT_CACHE_TTL)
+        return Response(totals)
+
+
 @method_decorator(
     name='get',
     decorator=swagger_auto_schema(
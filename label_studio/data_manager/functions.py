@@ -42,7 +42,7 @@ def get_all_columns(project, *_):
     data_types.update(project_data_types.items())
 
     # all data types from import data
-    all_data_columns = project.summary.all_data_columns
+    all_data_columns = project.summary.compacted().all_data_columns
     if all_data_columns:
         data_types.update({key: 'Unknown' for key in all_data_columns if key not in data_types})
 
@@ -310,7 +310,7 @@ def get_prepare_params(request, project):
 
 def get_prepared_queryset(request, project):
     prepare_params = get_prepare_params(request, project)
-    queryset = Task.prepared.only_filtered(prepare_params=prepare_params)
+    queryset = Task.prepared.only_filtered(prepare_params=prepare_params, project=project)
     return queryset
 
 
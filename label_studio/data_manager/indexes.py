@@ -0,0 +1,100 @@
+"""This file and its contents are licensed under the Apache License 2.0. Please see the included NOTICE for copyright information and LICENSE for a copy of the license.
+"""
+import hashlib
+import json
+import logging
+import re
+
+from django.db import connection
+from django.db.models import F, Func, TextField
+
+logger = logging.getLogger(__name__)
+
+# column names are inlined into index DDL, so only a safe subset of characters is allowed
+INDEXED_DATA_COLUMN_RE = re.compile(r'^[\w\-. $]{1,256}$')
+
+
+def get_index_prefix(project_id):
+    return f'task_data_{project_id}_'
+
+
+def _quote(value):
+    return "'" + value.replace("'", "''") + "'"
+
+
+def data_column_sql(data, column):
+    """Text value of the task data column, the key is inlined because
+    databases match index expressions only with literals (sqlite doesn't do it for bound parameters)
+    """
+    if connection.vendor == 'postgresql':
+        return f'({data} ->> {_quote(column)})'
+    return f"JSON_EXTRACT({data}, {_quote('$.' + json.dumps(column))})"
+
+
+class DataColumn(Func):
+    """Task data column expression matching project data column indexes"""
+
+    output_field = TextField()
+
+    def __init__(self, column):
+        if not INDEXED_DATA_COLUMN_RE.match(column):
+            raise ValueError(f'Unsupported data column name: {column}')
+        self.column = column
+        super().__init__(F('data'))
+
+    def as_sql(self, compiler, connection, **extra_context):
+        data, params = compiler.compile(self.source_expressions[0])
+        return data_column_sql(data, self.column), params
+
+
+def get_data_column_indexes(project_id, column, trigram=False):
+    """Partial expression indexes for one task data column of the project
+
+    :return: dict {index name: create index statement without CREATE INDEX}
+    """
+    name = get_index_prefix(project_id) + hashlib.md5(column.encode()).hexdigest()[:8]  # nosec
+    where = f'WHERE project_id = {int(project_id)}'
+    expression = data_column_sql('data', column)
+    indexes = {name: f'{name} ON task ({expression}) {where}'}
+    if trigram:
+        # icontains is compiled to UPPER(x::text) LIKE UPPER(%s)
+        indexes[name + '_trgm'] = f'{name}_trgm ON task USING gin (UPPER({expression}::text) gin_trgm_ops) {where}'
+    return indexes
+
+
+def _has_trigram_extension(cursor):
+    if connection.vendor != 'postgresql':
+        return False
+    cursor.execute("SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm'")
+    return cursor.fetchone() is not None
+
+
+def sync_data_column_indexes(project_id, columns):
+    """Create indexes for task data columns marked as indexed in the project and drop the rest
+
+    :param project_id: project id
+    :param columns: list of task data columns, empty list drops all project indexes
+    """
+    # concurrent index creation doesn't lock the task table, but it's not possible inside transactions
+    concurrently = 'CONCURRENTLY ' if connection.vendor == 'postgresql' and not connection.in_atomic_block else ''
+    prefix = get_index_prefix(project_id)
+
+    with connection.cursor() as cursor:
+        trigram = _has_trigram_extension(cursor)
+        expected = {}
+        for column in columns:
+            if not INDEXED_DATA_COLUMN_RE.match(column):
+                logger.warning(f'Data column "{column}" of project {project_id} can\'t be indexed')
+                continue
+            expected.update(get_data_column_indexes(project_id, column, trigram=trigram))
+        existing = {
+            name for name in connection.introspection.get_constraints(cursor, 'task') if name.startswith(prefix)
+        }
+
+        for name in existing - set(expected):
+            logger.info(f'Drop task data index {name} of project {project_id}')
+            cursor.execute(f'DROP INDEX {concurrently}IF EXISTS {name}')
+
+        for name in set(expected) - existing:
+            logger.info(f'Create task data index {name} of project {project_id}')
+            cursor.execute(f'CREATE INDEX {concurrently}IF NOT EXISTS {expected[name]}')
@@ -6,6 +6,7 @@ from datetime import datetime
 
 import ujson as json
 from core.feature_flags import flag_set
+from data_manager.indexes import DataColumn
 from data_manager.prepare_params import ConjunctionEnum
 from django.conf import settings
 from django.contrib.postgres.aggregates import ArrayAgg
@@ -60,6 +61,55 @@ operators = {
 }
 
 
+# python types of column values by django internal field type, unknown types are treated as strings
+FIELD_VALUE_TYPES = {
+    'ArrayField': 'list',
+    'AutoField': 'int',
+    'BigAutoField': 'int',
+    'BigIntegerField': 'int',
+    'BooleanField': 'bool',
+    'DateTimeField': 'datetime',
+    'FloatField': 'float',
+    'ForeignKey': 'int',
+    'IntegerField': 'int',
+    'JSONField': 'dict',
+    'OneToOneField': 'int',
+    'PositiveIntegerField': 'int',
+}
+
+# labeling config object tags which take lists from task data
+LIST_DATA_TYPES = ('List', 'Paragraphs')
+
+
+def get_field_value_type(queryset, field_name, project):
+    """Get python type name of column values without database queries:
+    task data types come from the labeling config (imported data columns are strings),
+    other fields are resolved via queryset annotations and model fields
+
+    :param queryset: task queryset with annotated fields from the annotations map
+    :param field_name: django ORM field name
+    :param project: project of tasks
+    :return: type name, e.g. 'str' or 'list'
+    """
+    if field_name.startswith('data__'):
+        data_type = project.data_types.get(field_name[len('data__') :])
+        return 'list' if data_type in LIST_DATA_TYPES else 'str'
+
+    try:
+        if field_name in queryset.query.annotations:
+            output_field = queryset.query.annotations[field_name].output_field
+        else:
+            model = queryset.model
+            for name in field_name.split('__'):
+                output_field = model._meta.get_field(name)
+                model = output_field.related_model
+    except Exception as exc:
+        logger.debug(f'Field type of {field_name} is unknown: {exc}')
+        return 'str'
+
+    return FIELD_VALUE_TYPES.get(output_field.get_internal_type(), 'str')
+
+
 def get_fields_for_filter_ordering(prepare_params):
     result = []
     if prepare_params is None:
@@ -151,7 +201,10 @@ def apply_ordering(queryset, ordering, project, request, view_data=None):
                     numeric_ordering_applied = True
                 except Exception as e:
                     logger.warning(f'Failed to apply numeric ordering for field {json_field}: {e}')
-            if not numeric_ordering_applied:
+            if not numeric_ordering_applied and json_field in (project.indexed_data_columns or []):
+                # the same expression as in the project data column index
+                queryset = queryset.annotate(ordering_field=DataColumn(json_field))
+            elif not numeric_ordering_applied:
                 queryset = queryset.annotate(ordering_field=KeyTextTransform(json_field, 'data'))
             f = F('ordering_field').asc(nulls_last=True) if ascending else F('ordering_field').desc(nulls_last=True)
 
@@ -333,6 +386,11 @@ def apply_filters(queryset, filters, project, request):
                 }
             )
             clean_field_name = f'filter_{json_field.replace("$undefined$", "undefined")}'
+        elif field_name.startswith('data__') and field_name[len('data__') :] in (project.indexed_data_columns or []):
+            # the same expression as in the project data column index
+            json_field = field_name[len('data__') :]
+            clean_field_name = f'filter_{json_field.replace("$undefined$", "undefined")}'
+            queryset = queryset.annotate(**{clean_field_name: DataColumn(json_field)})
         else:
             clean_field_name = field_name
 
@@ -345,9 +403,7 @@ def apply_filters(queryset, filters, project, request):
             _filter.value = 0
 
         # get type of annotated field
-        value_type = 'str'
-        if queryset.exists():
-            value_type = type(queryset.values_list(field_name, flat=True)[0]).__name__
+        value_type = get_field_value_type(queryset, field_name, project)
 
         if (value_type == 'list' or value_type == 'tuple') and 'equal' in _filter.operator:
             raise Exception('Not supported filter type')
@@ -454,10 +510,11 @@ def apply_filters(queryset, filters, project, request):
 
 
 class TaskQuerySet(models.QuerySet):
-    def prepared(self, prepare_params=None):
+    def prepared(self, prepare_params=None, project=None):
         """Apply filters, ordering and selected items to queryset
 
         :param prepare_params: prepare params with project, filters, orderings, etc
+        :param project: project instance of prepare_params.project, it's loaded if not specified
         :return: ordered and filtered queryset
         """
         from projects.models import Project
@@ -467,7 +524,8 @@ class TaskQuerySet(models.QuerySet):
         if prepare_params is None:
             return queryset
 
-        project = Project.objects.get(pk=prepare_params.project)
+        if project is None:
+            project = Project.objects.get(pk=prepare_params.project)
         request = prepare_params.request
         queryset = apply_filters(queryset, prepare_params.filters, project, request)
         queryset = apply_ordering(queryset, prepare_params.ordering, project, request, view_data=prepare_params.data)
@@ -498,6 +556,9 @@ class GroupConcat(Aggregate):
 def annotate_completed_at(queryset):
     from tasks.models import Annotation
 
+    if settings.DATA_MANAGER_MATERIALIZED_AGGREGATES:
+        return queryset.annotate(completed_at=Case(When(is_labeled=True, then=F('aggregate__last_annotation_at'))))
+
     newest = Annotation.objects.filter(task=OuterRef('pk')).order_by('-id')[:1]
     return queryset.annotate(completed_at=Case(When(is_labeled=True, then=Subquery(newest.values('created_at')))))
 
@@ -533,27 +594,31 @@ def annotate_annotators(queryset):
         return queryset.annotate(annotators=ArrayAgg('annotations__completed_by', distinct=True))
 
 
+def annotate_all_predictions_score(queryset):
+    if settings.DATA_MANAGER_MATERIALIZED_AGGREGATES:
+        return queryset.annotate(predictions_score=F('aggregate__predictions_score'))
+    return queryset.annotate(predictions_score=Avg('predictions__score'))
+
+
 def annotate_predictions_score(queryset):
-    first_task = queryset.first()
-    if not first_task:
+    project = getattr(queryset, 'project', None)
+    if project is None:
         return queryset
 
     # new approach with each ML backend contains it's version
-    if flag_set('ff_front_dev_1682_model_version_dropdown_070622_short', first_task.project.organization.created_by):
-        model_versions = list(
-            first_task.project.ml_backends.filter(project=first_task.project).values_list('model_version', flat=True)
-        )
+    if flag_set('ff_front_dev_1682_model_version_dropdown_070622_short', project.organization.created_by):
+        model_versions = list(project.ml_backends.values_list('model_version', flat=True))
         if len(model_versions) == 0:
-            return queryset.annotate(predictions_score=Avg('predictions__score'))
+            return annotate_all_predictions_score(queryset)
 
         else:
             return queryset.annotate(
                 predictions_score=Avg('predictions__score', filter=Q(predictions__model_version__in=model_versions))
             )
     else:
-        model_version = first_task.project.model_version
+        model_version = project.model_version
         if model_version is None:
-            return queryset.annotate(predictions_score=Avg('predictions__score'))
+            return annotate_all_predictions_score(queryset)
         else:
             return queryset.annotate(
                 predictions_score=Avg('predictions__score', filter=Q(predictions__model_version=model_version))
@@ -577,12 +642,17 @@ def annotate_predictions_model_versions(queryset):
 
 
 def annotate_avg_lead_time(queryset):
+    if settings.DATA_MANAGER_MATERIALIZED_AGGREGATES:
+        return queryset.annotate(avg_lead_time=F('aggregate__avg_lead_time'))
     return queryset.annotate(avg_lead_time=Avg('annotations__lead_time'))
 
 
 def annotate_draft_exists(queryset):
     from tasks.models import AnnotationDraft
 
+    if settings.DATA_MANAGER_MATERIALIZED_AGGREGATES:
+        return queryset.annotate(draft_exists=Coalesce(F('aggregate__draft_exists'), Value(False)))
+
     return queryset.annotate(draft_exists=Exists(AnnotationDraft.objects.filter(task=OuterRef('pk'))))
 
 
@@ -618,17 +688,25 @@ def update_annotation_map(obj):
 
 class PreparedTaskManager(models.Manager):
     @staticmethod
-    def annotate_queryset(queryset, fields_for_evaluation=None, all_fields=False, request=None):
+    def annotate_queryset(queryset, fields_for_evaluation=None, all_fields=False, request=None, project=None):
+        """Annotate tasks with aggregated fields from DATA_MANAGER_ANNOTATIONS_MAP,
+        each field is evaluated once: fields already annotated by filters and ordering are skipped
+
+        :param project: project of the tasks, it's taken from the first task if not specified
+        """
         annotations_map = get_annotations_map()
 
         if fields_for_evaluation is None:
             fields_for_evaluation = []
 
-        first_task = queryset.first()
-        project = None if first_task is None else first_task.project
+        if project is None:
+            first_task = queryset.select_related('project').first()
+            project = None if first_task is None else first_task.project
 
         # db annotations applied only if we need them in ordering or filters
         for field in annotations_map.keys():
+            if field in queryset.query.annotations:
+                continue
             if field in fields_for_evaluation or all_fields:
                 queryset.project = project
                 queryset.request = request
@@ -645,20 +723,35 @@ class PreparedTaskManager(models.Manager):
         :param request: request for user extraction
         :return: task queryset with annotated fields
         """
-        queryset = self.only_filtered(prepare_params=prepare_params)
+        from projects.models import Project
+
+        project = Project.objects.get(pk=prepare_params.project)
+        queryset = self.only_filtered(prepare_params=prepare_params, project=project)
         return self.annotate_queryset(
             queryset,
             fields_for_evaluation=fields_for_evaluation,
             all_fields=all_fields,
             request=prepare_params.request,
+            project=project,
         )
 
-    def only_filtered(self, prepare_params=None):
+    def only_filtered(self, prepare_params=None, project=None):
+        """Filtered and ordered tasks with fields annotated for filters and ordering only
+
+        :param prepare_params: filters, ordering, selected items
+        :param project: project instance of prepare_params.project, it's loaded if not specified
+        """
+        from projects.models import Project
+
+        if project is None:
+            project = Project.objects.get(pk=prepare_params.project)
         request = prepare_params.request
         queryset = TaskQuerySet(self.model).filter(project=prepare_params.project)
         fields_for_filter_ordering = get_fields_for_filter_ordering(prepare_params)
-        queryset = self.annotate_queryset(queryset, fields_for_evaluation=fields_for_filter_ordering, request=request)
-        return queryset.prepared(prepare_params=prepare_params)
+        queryset = self.annotate_queryset(
+            queryset, fields_for_evaluation=fields_for_filter_ordering, request=request, project=project
+        )
+        return queryset.prepared(prepare_params=prepare_params, project=project)
 
 
 class TaskManager(models.Manager):
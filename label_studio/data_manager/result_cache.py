@@ -0,0 +1,141 @@
+"""This file and its contents are licensed under the Apache License 2.0. Please see the included NOTICE for copyright information and LICENSE for a copy of the license.
+"""
+import hashlib
+import json
+import logging
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.paginator import EmptyPage, PageNotAnInteger, Paginator
+from django.utils.functional import cached_property
+from django.utils.translation import gettext_lazy as _
+
+logger = logging.getLogger(__name__)
+
+DATA_VERSION_KEY = 'data-manager:data-version:{project_id}'
+RESULT_KEY = 'data-manager:{kind}:{project_id}:{version}:{params_hash}'
+
+
+# caches which are not shared between worker processes, invalidation of results can't reach other workers
+LOCAL_CACHE_BACKENDS = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+
+
+def result_cache_enabled():
+    """Results are cached only with a shared cache backend (e.g. redis), so all workers see invalidations"""
+    if settings.DATA_MANAGER_RESULT_CACHE_TTL <= 0:
+        return False
+    return settings.CACHES['default']['BACKEND'] not in LOCAL_CACHE_BACKENDS
+
+
+def get_data_version(project_id):
+    """Return counter of task, annotation and prediction changes in the project"""
+    if not result_cache_enabled():
+        return 0
+    key = DATA_VERSION_KEY.format(project_id=project_id)
+    version = cache.get(key)
+    if version is None:
+        version = 0
+        cache.add(key, version, timeout=None)
+    return version
+
+
+def bump_data_version(project_id):
+    """Invalidate all cached Data Manager results of the project
+
+    :param project_id: project id, None is ignored
+    """
+    if project_id is None or not result_cache_enabled():
+        return
+    key = DATA_VERSION_KEY.format(project_id=project_id)
+    try:
+        cache.incr(key)
+    except ValueError:
+        # key is missing, nothing was cached with the previous version
+        cache.add(key, 1, timeout=None)
+
+
+def get_result_cache_key(project_id, view_id, prepare_params, user_id, kind='result'):
+    """Make cache key of filtered and ordered task list
+
+    :param project_id: project id
+    :param view_id: Data Manager view id or 0
+    :param prepare_params: PrepareParams with filters, ordering and selected items
+    :param user_id: id of the user, queryset can depend on user permissions
+    :param kind: 'result' for totals with ordered ids, 'totals' for totals only
+    """
+    params = json.dumps([view_id, user_id, prepare_params.dict(exclude={'request'})], sort_keys=True, default=str)
+    return RESULT_KEY.format(
+        kind=kind,
+        project_id=project_id,
+        version=get_data_version(project_id),
+        params_hash=hashlib.sha256(params.encode()).hexdigest(),
+    )
+
+
+def get_cached_result(key):
+    if not result_cache_enabled():
+        return None
+    return cache.get(key)
+
+
+def set_cached_result(key, result, ttl):
+    if result_cache_enabled():
+        cache.set(key, result, timeout=ttl)
+
+
+class CachedResultPaginator(Paginator):
+    """Paginator over the filtered task queryset which takes count and ordered ids of the first pages
+    from the cached result, pages behind the cached ids are fetched from the queryset as usual
+    """
+
+    def __init__(self, object_list, per_page, result=None, **kwargs):
+        super().__init__(object_list, per_page, **kwargs)
+        self.result = result
+
+    @cached_property
+    def count(self):
+        return self.result['total']
+
+    def page(self, number):
+        number = self.validate_number(number)
+        bottom = (number - 1) * self.per_page
+        top = bottom + self.per_page
+        ids = self.result['ids']
+        if top > len(ids) and len(ids) < self.count:
+            return super().page(number)
+
+        page_ids = ids[bottom:top]
+        tasks = {task.id: task for task in self.object_list.model.objects.filter(id__in=page_ids)}
+        return self._get_page([tasks[_id] for _id in page_ids if _id in tasks], number, self)
+
+
+class DeferredCountPaginator(Paginator):
+    """Paginator which doesn't count the filtered task queryset, the total is estimated or unknown (None).
+    The page is fetched with one extra row to find out whether the next page exists.
+    """
+
+    count = None
+    num_pages = 1
+
+    def __init__(self, object_list, per_page, count=None, **kwargs):
+        super().__init__(object_list, per_page, **kwargs)
+        self.count = count
+
+    def page(self, number):
+        try:
+            number = int(number)
+        except (TypeError, ValueError):
+            raise PageNotAnInteger(_('That page number is not an integer'))
+        if number < 1:
+            raise EmptyPage(_('That page number is less than 1'))
+
+        bottom = (number - 1) * self.per_page
+        objects = list(self.object_list[bottom : bottom + self.per_page + 1])
+        if not objects and number > 1:
+            raise EmptyPage(_('That page contains no results'))
+
+        self.num_pages = number + 1 if len(objects) > self.per_page else number
+        return self._get_page(objects[: self.per_page], number, self)
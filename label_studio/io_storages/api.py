@@ -6,6 +6,7 @@ import os
 
 from core.permissions import all_permissions
 from core.utils.io import read_yaml
+from core.utils.params import bool_from_request
 from django.conf import settings
 from drf_yasg import openapi as openapi
 from drf_yasg.utils import swagger_auto_schema
@@ -107,7 +108,11 @@ class ImportStorageSyncAPI(generics.GenericAPIView):
             response_data = {'message': f'Storage {str(storage.id)} is not synchronizable'}
             return Response(status=status.HTTP_400_BAD_REQUEST, data=response_data)
         storage.validate_connection()
-        storage.sync()
+        # incremental sync processes only keys after the last synced one, by default STORAGE_INCREMENTAL_SYNC is used
+        incremental = None
+        if 'incremental' in request.data:
+            incremental = bool_from_request(request.data, 'incremental', False)
+        storage.sync(incremental=incremental)
         storage.refresh_from_db()
         return Response(self.serializer_class(storage).data)
 
@@ -129,7 +134,9 @@ class ExportStorageSyncAPI(generics.GenericAPIView):
             response_data = {'message': f'Storage {str(storage.id)} is not synchronizable'}
             return Response(status=status.HTTP_400_BAD_REQUEST, data=response_data)
         storage.validate_connection()
-        storage.sync()
+        # unchanged objects are skipped by default, force uploads all of them again
+        force = bool_from_request(request.data, 'force', False)
+        storage.sync(force=force)
         storage.refresh_from_db()
         return Response(self.serializer_class(storage).data)
 
@@ -22,6 +22,8 @@ from io_storages.base_models import (
     ImportStorageLink,
     ProjectStorageMixin,
 )
+from io_storages.client_pool import client_pool
+from io_storages.utils import get_content_hash
 from tasks.models import Annotation
 
 from label_studio.io_storages.azure_blob.utils import AZURE
@@ -48,6 +50,9 @@ class AzureBlobStorageMixin(models.Model):
     def get_account_key(self):
         return str(self.account_key) if self.account_key else get_env('AZURE_BLOB_ACCOUNT_KEY')
 
+    def get_client_credentials(self):
+        return self.get_account_name(), self.get_account_key()
+
     def get_client_and_container(self):
         account_name = self.get_account_name()
         account_key = self.get_account_key()
@@ -64,7 +69,9 @@ class AzureBlobStorageMixin(models.Model):
             + account_key
             + ';EndpointSuffix=core.windows.net'
         )
-        client = BlobServiceClient.from_connection_string(conn_str=connection_string)
+        client = client_pool.get(
+            'azure', connection_string, lambda: BlobServiceClient.from_connection_string(conn_str=connection_string)
+        )
         container = client.get_container_client(str(self.container))
         return client, container
 
@@ -104,6 +111,9 @@ class AzureBlobImportStorageBase(AzureBlobStorageMixin, ImportStorage):
     )
 
     def iterkeys(self):
+        return self.iterkeys_after(None)
+
+    def iterkeys_after(self, key):
         container = self.get_container()
         prefix = str(self.prefix) if self.prefix else ''
         files = container.list_blobs(name_starts_with=prefix)
@@ -113,6 +123,9 @@ class AzureBlobImportStorageBase(AzureBlobStorageMixin, ImportStorage):
             # skip folder
             if file.name == (prefix.rstrip('/') + '/'):
                 continue
+            # Azure lists blobs in lexicographical order, but it can't start listing from a name
+            if key and file.name <= key:
+                continue
             # check regex pattern filter
             if regex and not regex.match(file.name):
                 logger.debug(file.name + ' is skipped by regex filter')
@@ -172,19 +185,26 @@ class AzureBlobImportStorage(ProjectStorageMixin, AzureBlobImportStorageBase):
 
 class AzureBlobExportStorage(AzureBlobStorageMixin, ExportStorage):  # note: order is important!
     def save_annotation(self, annotation):
-        container = self.get_container()
         logger.debug(f'Creating new object on {self.__class__.__name__} Storage {self} for annotation {annotation}')
         ser_annotation = self._get_serialized_data(annotation)
         # get key that identifies this object in storage
         key = AzureBlobExportStorageLink.get_key(annotation)
+        self.save_object(key, ser_annotation)
+
+        # create link if everything ok
+        AzureBlobExportStorageLink.create(annotation, self, content_hash=get_content_hash(ser_annotation))
+
+    def save_object(self, key, data):
+        container = self.get_container()
         key = str(self.prefix) + '/' + key if self.prefix else key
 
         # put object into storage
         blob = container.get_blob_client(key)
-        blob.upload_blob(json.dumps(ser_annotation), overwrite=True)
+        blob.upload_blob(json.dumps(data), overwrite=True)
 
-        # create link if everything ok
-        AzureBlobExportStorageLink.create(annotation, self)
+    def delete_object(self, key):
+        key = str(self.prefix) + '/' + key if self.prefix else key
+        self.get_container().delete_blob(key)
 
 
 def async_export_annotation_to_azure_storages(annotation):
@@ -2,6 +2,7 @@ import logging
 
 from azure.storage.blob import BlobServiceClient
 from core.utils.params import get_env
+from io_storages.client_pool import client_pool
 
 logger = logging.getLogger(__name__)
 
@@ -25,7 +26,9 @@ class AZURE(object):
             + account_key
             + ';EndpointSuffix=core.windows.net'
         )
-        client = BlobServiceClient.from_connection_string(conn_str=connection_string)
+        client = client_pool.get(
+            'azure', connection_string, lambda: BlobServiceClient.from_connection_string(conn_str=connection_string)
+        )
         container = client.get_container_client(str(container))
         return client, container
 
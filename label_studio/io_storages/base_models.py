@@ -4,7 +4,9 @@ import base64
 import json
 import logging
 import traceback as tb
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
+from itertools import islice
 from urllib.parse import urljoin
 
 import django_rq
@@ -12,20 +14,27 @@ import rq
 import rq.exceptions
 from core.feature_flags import flag_set
 from core.redis import is_job_in_queue, is_job_on_worker, redis_connected
-from core.utils.common import load_func
+from core.utils.common import batch_ids, load_func
 from data_export.serializers import ExportDataSerializer
+from data_manager.result_cache import bump_data_version
 from django.conf import settings
 from django.contrib.auth.models import AnonymousUser
 from django.db import models, transaction
-from django.db.models import JSONField
+from django.db.models import Exists, JSONField, OuterRef
 from django.shortcuts import reverse
 from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
 from django_rq import job
-from io_storages.utils import get_uri_via_regex
+from io_storages.presigned_url_cache import presigned_url_cache
+from io_storages.utils import get_content_hash, get_uri_via_regex
 from rq.job import Job
-from tasks.models import Annotation, Task
-from tasks.serializers import AnnotationSerializer, PredictionSerializer
+from tasks.models import Annotation, Prediction, Task, TaskAggregate
+from tasks.serializers import (
+    AnnotationBulkSerializer,
+    AnnotationSerializer,
+    PredictionBulkSerializer,
+    PredictionSerializer,
+)
 from webhooks.models import WebhookAction
 from webhooks.utils import emit_webhooks_for_instance
 
@@ -68,14 +77,18 @@ class StorageInfo(models.Model):
         self.last_sync_job = job_id
         self.save(update_fields=['last_sync_job'])
 
-    def info_set_queued(self):
+    def info_set_queued(self, **kwargs):
         self.last_sync = None
         self.last_sync_count = None
         self.last_sync_job = None
         self.status = self.Status.QUEUED
 
-        # reset and init meta
-        self.meta = {'attempts': self.meta.get('attempts', 0) + 1, 'time_queued': str(timezone.now())}
+        # reset and init meta, the sync watermark must survive between syncs
+        meta = {'attempts': self.meta.get('attempts', 0) + 1, 'time_queued': str(timezone.now())}
+        if 'last_key' in self.meta:
+            meta['last_key'] = self.meta['last_key']
+        meta.update(kwargs)
+        self.meta = meta
 
         self.save(update_fields=['last_sync_job', 'last_sync', 'last_sync_count', 'status', 'meta'])
 
@@ -217,6 +230,10 @@ class Storage(StorageInfo):
     def validate_connection(self, client=None):
         raise NotImplementedError('validate_connection is not implemented')
 
+    def get_client_credentials(self):
+        """Credentials which the storage client is built from, cached data is bound to them"""
+        return None
+
     class Meta:
         abstract = True
 
@@ -225,12 +242,29 @@ class ImportStorage(Storage):
     def iterkeys(self):
         return iter(())
 
+    def iterkeys_after(self, key):
+        """Iterate over keys going after the key in lexicographical order, it's used by incremental sync.
+        Storages that can't start listing from a key are listed from the beginning,
+        the sync skips keys with existing links anyway.
+        """
+        return self.iterkeys()
+
     def get_data(self, key):
         raise NotImplementedError
 
     def generate_http_url(self, url):
         raise NotImplementedError
 
+    def get_http_url(self, url):
+        """Cached generate_http_url(): presigned URLs are kept for a part of presign TTL,
+        so they stay the same between requests and aren't signed again
+        """
+        presign_ttl = getattr(self, 'presign_ttl', None)
+        cache_ttl = int(presign_ttl * 60 * settings.STORAGE_PRESIGNED_URL_CACHE_TTL_RATIO) if presign_ttl else 0
+        if cache_ttl <= 0:
+            return self.generate_http_url(url)
+        return presigned_url_cache.get_or_generate(self, url, cache_ttl, lambda: self.generate_http_url(url))
+
     def can_resolve_url(self, url):
         # TODO: later check to the full prefix like "url.startswith(self.path_full)"
         # Search of occurrences inside string, e.g. for cases like "gs://bucket/file.pdf" or "<embed src='gs://bucket/file.pdf'/>"
@@ -275,7 +309,7 @@ class ImportStorage(Storage):
                     return uri.replace(extracted_uri, proxy_url)
                 else:
                     # resolve uri to url using storages
-                    http_url = self.generate_http_url(extracted_uri)
+                    http_url = self.get_http_url(extracted_uri)
 
                 return uri.replace(extracted_uri, http_url)
             except Exception:
@@ -293,8 +327,9 @@ class ImportStorage(Storage):
 
         raise NotImplementedError
 
-    @classmethod
-    def add_task(cls, data, project, maximum_annotations, max_inner_id, storage, key, link_class):
+    @staticmethod
+    def _parse_task(data):
+        """Split storage object into task data, predictions and annotations"""
         # predictions
         predictions = data.get('predictions', [])
         if predictions:
@@ -305,16 +340,20 @@ class ImportStorage(Storage):
 
         # annotations
         annotations = data.get('annotations', [])
-        cancelled_annotations = 0
         if annotations:
             if 'data' not in data:
                 raise ValueError(
                     'If you use "annotations" field in the task, ' 'you must put "data" field in the task too'
                 )
-            cancelled_annotations = len([a for a in annotations if a.get('was_cancelled', False)])
 
         if 'data' in data and isinstance(data['data'], dict):
             data = data['data']
+        return data, predictions, annotations
+
+    @classmethod
+    def add_task(cls, data, project, maximum_annotations, max_inner_id, storage, key, link_class):
+        data, predictions, annotations = cls._parse_task(data)
+        cancelled_annotations = len([a for a in annotations if a.get('was_cancelled', False)])
 
         with transaction.atomic():
             task = Task.objects.create(
@@ -355,10 +394,167 @@ class ImportStorage(Storage):
         return task
         # FIXME: add_annotation_history / post_process_annotations should be here
 
+    @classmethod
+    def add_tasks(cls, items, project, maximum_annotations, max_inner_id, storage, link_class):
+        """Bulk version of add_task: store tasks, links, predictions and annotations for a page of storage objects
+
+        :param items: list of (key, data) pairs loaded from storage
+        :return: list of created tasks
+        """
+        raise_exception = not flag_set(
+            'ff_fix_back_dev_3342_storage_scan_with_invalid_annotations', user=AnonymousUser()
+        )
+
+        db_tasks, task_predictions, task_annotations = [], [], []
+        for i, (_key, data) in enumerate(items):
+            data, predictions, annotations = cls._parse_task(data)
+
+            # validate nested objects without task and project, they are not in DB yet
+            prediction_ser = PredictionBulkSerializer(data=predictions, many=True)
+            valid = prediction_ser.is_valid(raise_exception=raise_exception)
+            predictions = prediction_ser.validated_data if valid else []
+            annotation_ser = AnnotationBulkSerializer(data=annotations, many=True)
+            valid = annotation_ser.is_valid(raise_exception=raise_exception)
+            annotations = annotation_ser.validated_data if valid else []
+            task_predictions.append(predictions)
+            task_annotations.append(annotations)
+
+            cancelled_annotations = len([a for a in annotations if a.get('was_cancelled', False)])
+            # bulk_create skips update_is_labeled(), count annotations the same way as Task.completed_annotations
+            if project.skip_queue == project.SkipQueue.IGNORE_SKIPPED:
+                completed_annotations = len(annotations)
+            else:
+                completed_annotations = len(
+                    [a for a in annotations if not a.get('was_cancelled', False) and a.get('result') is not None]
+                )
+            db_tasks.append(
+                Task(
+                    data=data,
+                    project=project,
+                    overlap=maximum_annotations,
+                    is_labeled=completed_annotations >= maximum_annotations,
+                    total_predictions=len(predictions),
+                    total_annotations=len(annotations) - cancelled_annotations,
+                    cancelled_annotations=cancelled_annotations,
+                    inner_id=max_inner_id + i,
+                )
+            )
+
+        with transaction.atomic():
+            # sqlite doesn't return ids from bulk_create, so we assign them manually as BaseTaskSerializerBulk does
+            if settings.DJANGO_DB == settings.DJANGO_DB_SQLITE:
+                last_task = Task.objects.order_by('-id').only('id').first()
+                current_id = last_task.id + 1 if last_task else 1
+                for task in db_tasks:
+                    task.id = current_id
+                    current_id += 1
+            db_tasks = Task.objects.bulk_create(db_tasks, batch_size=settings.BATCH_SIZE)
+
+            link_class.create_many(db_tasks, [key for key, _data in items], storage)
+            logger.debug(f'Create {len(db_tasks)} {storage.__class__.__name__} links')
+
+            db_predictions = []
+            for task, predictions in zip(db_tasks, task_predictions):
+                for prediction in predictions:
+                    # bulk_create doesn't call Prediction.save(), so normalize the result here
+                    prediction['result'] = Prediction.prepare_prediction_result(prediction['result'], project)
+                    db_predictions.append(Prediction(task=task, project=project, **prediction))
+            Prediction.objects.bulk_create(db_predictions, batch_size=settings.BATCH_SIZE)
+            logger.debug(f'Create {len(db_predictions)} predictions for {len(db_tasks)} tasks')
+
+            db_annotations = [
+                Annotation(task=task, project=project, **annotation)
+                for task, annotations in zip(db_tasks, task_annotations)
+                for annotation in annotations
+            ]
+            Annotation.objects.bulk_create(db_annotations, batch_size=settings.BATCH_SIZE)
+            logger.debug(f'Create {len(db_annotations)} annotations for {len(db_tasks)} tasks')
+
+            # bulk_create skips post_save signals, so update project summary counters explicitly
+            if hasattr(project, 'summary'):
+                project.summary.update_data_columns(db_tasks)
+                project.summary.update_created_annotations_and_labels(db_annotations)
+            if db_annotations:
+                from projects.models import ProjectAnnotationsCounter
+
+                ProjectAnnotationsCounter.increment(project.id, len(db_annotations))
+
+            # bulk_create skips signals which maintain materialized task aggregates too
+            if settings.DATA_MANAGER_MATERIALIZED_AGGREGATES:
+                TaskAggregate.refresh(
+                    [
+                        task.id
+                        for task, predictions, annotations in zip(db_tasks, task_predictions, task_annotations)
+                        if predictions or annotations
+                    ]
+                )
+            bump_data_version(project.id)
+
+        return db_tasks
+
+    def _load_task_data(self, key):
+        try:
+            return self.get_data(key)
+        except (UnicodeDecodeError, json.decoder.JSONDecodeError) as exc:
+            logger.debug(exc, exc_info=True)
+            raise ValueError(
+                f'Error loading JSON from file "{key}".\nIf you\'re trying to import non-JSON data '
+                f'(images, audio, text, etc.), edit storage settings and enable '
+                f'"Treat every bucket object as a source file"'
+            )
+
+    @property
+    def sync_concurrency(self):
+        """Max number of objects downloaded in parallel while syncing this storage"""
+        return settings.STORAGE_IMPORT_CONCURRENCY
+
+    def _iter_new_objects(self, link_class):
+        """Yield pages of (key, data) pairs for keys without links and the number of skipped existing keys.
+
+        Objects of the next page are downloaded by a thread pool while the caller stores the current page,
+        results are yielded in the iterkeys() order, so inner_id assignment doesn't depend on download timing.
+        """
+        # incremental sync lists only keys after the watermark saved by the previous sync
+        last_key = self.meta.get('last_key') if self.meta.get('incremental') else None
+        keys_iterator = iter(self.iterkeys_after(last_key) if last_key else self.iterkeys())
+        pages = []
+        with ThreadPoolExecutor(max_workers=self.sync_concurrency) as executor:
+            try:
+                while True:
+                    keys = list(dict.fromkeys(islice(keys_iterator, settings.STORAGE_IMPORT_BATCH_SIZE)))
+                    if keys:
+                        logger.debug(f'Scanning {len(keys)} keys starting from {keys[0]}')
+                        # skip keys with already existing tasks
+                        existing_keys = link_class.existing_keys(keys, self)
+                        new_keys = [key for key in keys if key not in existing_keys]
+                        logger.debug(f'{self}: found {len(new_keys)} new keys, {len(existing_keys)} links exist')
+                        futures = [executor.submit(self._load_task_data, key) for key in new_keys]
+                        pages.append((len(existing_keys), new_keys, futures, max(keys)))
+
+                    # the next page is already being downloaded, return the previous one
+                    if len(pages) > 1 or (pages and not keys):
+                        existed, new_keys, futures, max_key = pages.pop(0)
+                        yield existed, [(key, future.result()) for key, future in zip(new_keys, futures)]
+                        # the page is stored, move the watermark
+                        last_key = max(last_key, max_key) if last_key else max_key
+                        self.meta['last_key'] = last_key
+
+                    if not keys:
+                        break
+            finally:
+                # don't wait for downloads which won't be used when the sync is failed
+                for _existed, _new_keys, futures, _max_key in pages:
+                    for future in futures:
+                        future.cancel()
+
     def _scan_and_create_links(self, link_class):
         """
         TODO: deprecate this function and transform it to "pipeline" version  _scan_and_create_links_v2,
         TODO: it must be compatible with opensource, so old version is needed as well
+
+        Keys are processed in pages of STORAGE_IMPORT_BATCH_SIZE: every page is checked against
+        existing links with one query, then all new tasks of the page are stored with bulk inserts
+        while objects of the next page are downloaded.
         """
         # set in progress status for storage info
         self.info_set_in_progress()
@@ -369,38 +565,24 @@ class ImportStorage(Storage):
         max_inner_id = (task.inner_id + 1) if task else 1
 
         tasks_for_webhook = []
-        for key in self.iterkeys():
+        for existed, items in self._iter_new_objects(link_class):
             # w/o Dataflow
             # pubsub.push(topic, key)
-            # -> GF.pull(topic, key) + env -> add_task()
-            logger.debug(f'Scanning key {key}')
+            # -> GF.pull(topic, key) + env -> add_tasks()
+            tasks_existed += existed
             self.info_update_progress(last_sync_count=tasks_created, tasks_existed=tasks_existed)
-
-            # skip if task already exists
-            if link_class.exists(key, self):
-                logger.debug(f'{self.__class__.__name__} link {key} already exists')
-                tasks_existed += 1  # update progress counter
+            if not items:
                 continue
 
-            logger.debug(f'{self}: found new key {key}')
-            try:
-                data = self.get_data(key)
-            except (UnicodeDecodeError, json.decoder.JSONDecodeError) as exc:
-                logger.debug(exc, exc_info=True)
-                raise ValueError(
-                    f'Error loading JSON from file "{key}".\nIf you\'re trying to import non-JSON data '
-                    f'(images, audio, text, etc.), edit storage settings and enable '
-                    f'"Treat every bucket object as a source file"'
-                )
-
-            task = self.add_task(data, self.project, maximum_annotations, max_inner_id, self, key, link_class)
-            max_inner_id += 1
+            tasks = self.add_tasks(items, self.project, maximum_annotations, max_inner_id, self, link_class)
+            max_inner_id += len(tasks)
 
             # update progress counters for storage info
-            tasks_created += 1
+            tasks_created += len(tasks)
+            self.info_update_progress(last_sync_count=tasks_created, tasks_existed=tasks_existed)
 
-            # add task to webhook list
-            tasks_for_webhook.append(task)
+            # add tasks to webhook list
+            tasks_for_webhook.extend(tasks)
 
             # settings.WEBHOOK_BATCH_SIZE
             # `WEBHOOK_BATCH_SIZE` sets the maximum number of tasks sent in a single webhook call, ensuring manageable payload sizes.
@@ -408,11 +590,14 @@ class ImportStorage(Storage):
             # `emit_webhooks_for_instance`, and `tasks_for_webhook` is cleared for new tasks.
             # If tasks remain in `tasks_for_webhook` at process end (less than `WEBHOOK_BATCH_SIZE`), they're sent in a final webhook
             # call to ensure all tasks are processed and no task is left unreported in the webhook.
-            if len(tasks_for_webhook) >= settings.WEBHOOK_BATCH_SIZE:
+            while len(tasks_for_webhook) >= settings.WEBHOOK_BATCH_SIZE:
                 emit_webhooks_for_instance(
-                    self.project.organization, self.project, WebhookAction.TASKS_CREATED, tasks_for_webhook
+                    self.project.organization,
+                    self.project,
+                    WebhookAction.TASKS_CREATED,
+                    tasks_for_webhook[: settings.WEBHOOK_BATCH_SIZE],
                 )
-                tasks_for_webhook = []
+                tasks_for_webhook = tasks_for_webhook[settings.WEBHOOK_BATCH_SIZE :]
         if tasks_for_webhook:
             emit_webhooks_for_instance(
                 self.project.organization, self.project, WebhookAction.TASKS_CREATED, tasks_for_webhook
@@ -429,14 +614,22 @@ class ImportStorage(Storage):
         """This is proto method - you can override it, or just replace ImportStorageLink by your own model"""
         self._scan_and_create_links(ImportStorageLink)
 
-    def sync(self):
+    def sync(self, incremental=None):
+        """Start storage sync
+
+        :param incremental: list only keys after the last key seen by the previous sync,
+                            the whole storage is rescanned if False, None means STORAGE_INCREMENTAL_SYNC
+        """
+        if incremental is None:
+            incremental = settings.STORAGE_INCREMENTAL_SYNC
+
         if redis_connected():
             queue = django_rq.get_queue('low')
             meta = {'project': self.project.id, 'storage': self.id}
             if not is_job_in_queue(queue, 'import_sync_background', meta=meta) and not is_job_on_worker(
                 job_id=self.last_sync_job, queue_name='low'
             ):
-                self.info_set_queued()
+                self.info_set_queued(incremental=incremental)
                 sync_job = queue.enqueue(
                     import_sync_background,
                     self.__class__,
@@ -452,7 +645,7 @@ class ImportStorage(Storage):
         else:
             try:
                 logger.info(f'Start syncing storage {self}')
-                self.info_set_queued()
+                self.info_set_queued(incremental=incremental)
                 import_sync_background(self.__class__, self.id)
             except Exception:
                 storage_background_failure(self)
@@ -486,9 +679,9 @@ def import_sync_background(storage_class, storage_id, timeout=settings.RQ_LONG_J
 
 
 @job('low', timeout=settings.RQ_LONG_JOB_TIMEOUT)
-def export_sync_background(storage_class, storage_id, **kwargs):
+def export_sync_background(storage_class, storage_id, force=False, **kwargs):
     storage = storage_class.objects.get(id=storage_id)
-    storage.save_all_annotations()
+    storage.save_all_annotations(force=force)
 
 
 def storage_background_failure(*args, **kwargs):
@@ -522,9 +715,7 @@ class ExportStorage(Storage, ProjectStorageMixin):
 
     def _get_serialized_data(self, annotation):
         if settings.FUTURE_SAVE_TASK_TO_STORAGE:
-            # export task with annotations
-            # TODO: we have to rewrite save_all_annotations, because this func will be called for each annotation
-            # TODO: instead of each task, however, we have to call it only once per task
+            # export task with annotations, save_all_annotations serializes each task only once
             return ExportDataSerializer(annotation.task).data
         else:
             serializer_class = load_func(settings.STORAGE_ANNOTATION_SERIALIZER)
@@ -534,23 +725,143 @@ class ExportStorage(Storage, ProjectStorageMixin):
     def save_annotation(self, annotation):
         raise NotImplementedError
 
-    def save_all_annotations(self):
-        annotation_exported = 0
-        total_annotations = Annotation.objects.filter(project=self.project).count()
+    def save_object(self, key, data):
+        """Put serialized object into storage
+
+        :param key: object key from ExportStorageLink.get_key(), storage prefix is added here
+        :param data: serialized task or annotation
+        """
+        raise NotImplementedError
+
+    def _get_export_objects(self, ids):
+        """Serialize a chunk of annotations (or tasks if FUTURE_SAVE_TASK_TO_STORAGE is on)
+
+        :return: list of (key, data, annotations) tuples, one for each storage object
+        """
+        link_class = self.links.model
+        if settings.FUTURE_SAVE_TASK_TO_STORAGE:
+            # one object per task with all its annotations inside
+            tasks = list(
+                Task.objects.filter(id__in=ids)
+                .select_related('project')
+                .prefetch_related('annotations', 'predictions')
+                .order_by('id')
+            )
+            data = ExportDataSerializer(tasks, many=True).data
+            objects = []
+            for task, item in zip(tasks, data):
+                annotations = list(task.annotations.all())
+                # annotations might be removed while export is running
+                if annotations:
+                    objects.append((link_class.get_key(annotations[0]), item, annotations))
+            return objects
+
+        annotations = list(
+            Annotation.objects.filter(id__in=ids).select_related('task__project', 'completed_by').order_by('id')
+        )
+        serializer_class = load_func(settings.STORAGE_ANNOTATION_SERIALIZER)
+        data = serializer_class(annotations, many=True, context={'project': self.project}).data
+        return [(link_class.get_key(annotation), item, [annotation]) for annotation, item in zip(annotations, data)]
+
+    def delete_object(self, key):
+        """Remove object from storage
+
+        :param key: object key from ExportStorageLink.get_key(), storage prefix is added here
+        """
+        raise NotImplementedError
+
+    def _save_changed_objects(self, objects, executor, force=False):
+        """Upload objects whose content differs from the last saved one
+
+        :return: number of exported annotations and number of annotations with unchanged objects
+        """
+        annotation_ids = [annotation.id for *_, annotations in objects for annotation in annotations]
+        links = self.links.filter(annotation__in=annotation_ids)
+        saved_hashes = dict(links.values_list('annotation_id', 'content_hash'))
+
+        changed, content_hashes, unchanged = [], {}, 0
+        for key, data, annotations in objects:
+            content_hash = get_content_hash(data)
+            if not force and all(saved_hashes.get(annotation.id) == content_hash for annotation in annotations):
+                unchanged += len(annotations)
+                continue
+            changed.append((key, data))
+            content_hashes.update({annotation.id: content_hash for annotation in annotations})
+
+        # list() re-raises upload exceptions
+        list(executor.map(lambda obj: self.save_object(*obj), changed))
+
+        exported = [annotation for *_, annotations in objects for annotation in annotations]
+        exported = [annotation for annotation in exported if annotation.id in content_hashes]
+        self.links.model.create_many(exported, self, content_hashes=content_hashes)
+        return len(exported), unchanged
+
+    def _delete_removed_objects(self, executor):
+        """Drop links of removed annotations and delete their objects if the storage allows it"""
+        removed = self.links.filter(annotation__isnull=True)
+        keys = set(removed.exclude(object_key=None).values_list('object_key', flat=True))
+        # objects with tasks are shared by annotations, keep the ones which are still in use
+        used = self.links.filter(annotation__isnull=False, object_key__in=keys)
+        keys -= set(used.values_list('object_key', flat=True))
+
+        deleted = 0
+        if keys and self.can_delete_objects:
+            list(executor.map(self.delete_object, keys))
+            deleted = len(keys)
+        removed.delete()
+        return deleted
+
+    def delete_removed_objects(self):
+        """Drop links of removed annotations without the full sync, e.g. for storages which are never synced again
+
+        :return: number of deleted objects
+        """
+        with ThreadPoolExecutor(max_workers=settings.STORAGE_EXPORT_CONCURRENCY) as executor:
+            return self._delete_removed_objects(executor)
+
+    def save_all_annotations(self, force=False):
+        """Export all project annotations: chunks are serialized with prefetched relations,
+        only objects with changed content are uploaded by a thread pool and links are updated in bulk,
+        objects of removed annotations are deleted at the end
+
+        :param force: upload all objects, even unchanged ones, e.g. when they were removed from the storage
+        """
+        annotation_exported = annotations_unchanged = 0
+        annotations = Annotation.objects.filter(project=self.project)
+        total_annotations = annotations.count()
         self.info_set_in_progress()
 
-        for annotation in Annotation.objects.filter(project=self.project).iterator(
-            chunk_size=settings.STORAGE_EXPORT_CHUNK_SIZE
-        ):
-            self.save_annotation(annotation)
+        if settings.FUTURE_SAVE_TASK_TO_STORAGE:
+            # tasks are exported only once, no matter how many annotations they have
+            queryset = Task.objects.filter(project=self.project).filter(
+                Exists(Annotation.objects.filter(task=OuterRef('pk')))
+            )
+        else:
+            queryset = annotations
+
+        with ThreadPoolExecutor(max_workers=settings.STORAGE_EXPORT_CONCURRENCY) as executor:
+            for ids in batch_ids(queryset, settings.STORAGE_EXPORT_CHUNK_SIZE):
+                exported, unchanged = self._save_changed_objects(self._get_export_objects(ids), executor, force)
+
+                # update progress counters
+                annotation_exported += exported
+                annotations_unchanged += unchanged
+                self.info_update_progress(
+                    last_sync_count=annotation_exported,
+                    total_annotations=total_annotations,
+                    annotations_unchanged=annotations_unchanged,
+                )
 
-            # update progress counters
-            annotation_exported += 1
-            self.info_update_progress(last_sync_count=annotation_exported, total_annotations=total_annotations)
+            objects_deleted = self._delete_removed_objects(executor)
 
-        self.info_set_completed(last_sync_count=annotation_exported, total_annotations=total_annotations)
+        self.info_set_completed(
+            last_sync_count=annotation_exported,
+            total_annotations=total_annotations,
+            annotations_unchanged=annotations_unchanged,
+            objects_deleted=objects_deleted,
+        )
 
-    def sync(self):
+    def sync(self, force=False):
         if redis_connected():
             queue = django_rq.get_queue('low')
             self.info_set_queued()
@@ -558,6 +869,7 @@ class ExportStorage(Storage, ProjectStorageMixin):
                 export_sync_background,
                 self.__class__,
                 self.id,
+                force=force,
                 job_timeout=settings.RQ_LONG_JOB_TIMEOUT,
                 project_id=self.project.id,
                 organization_id=self.project.organization.id,
@@ -569,7 +881,7 @@ class ExportStorage(Storage, ProjectStorageMixin):
             try:
                 logger.info(f'Start syncing storage {self}')
                 self.info_set_queued()
-                export_sync_background(self.__class__, self.id)
+                export_sync_background(self.__class__, self.id, force=force)
             except Exception:
                 storage_background_failure(self)
 
@@ -590,23 +902,38 @@ class ImportStorageLink(models.Model):
     def exists(cls, key, storage):
         return cls.objects.filter(key=key, storage=storage.id).exists()
 
+    @classmethod
+    def existing_keys(cls, keys, storage):
+        """Return the subset of keys that are already linked to tasks, one query for the whole list"""
+        return set(cls.objects.filter(key__in=keys, storage=storage.id).values_list('key', flat=True))
+
     @classmethod
     def create(cls, task, key, storage):
         link, created = cls.objects.get_or_create(task_id=task.id, key=key, storage=storage, object_exists=True)
         return link
 
+    @classmethod
+    def create_many(cls, tasks, keys, storage):
+        links = [cls(task_id=task.id, key=key, storage=storage, object_exists=True) for task, key in zip(tasks, keys)]
+        return cls.objects.bulk_create(links, batch_size=settings.BATCH_SIZE)
+
     class Meta:
         abstract = True
 
 
 class ExportStorageLink(models.Model):
 
+    # links of removed annotations are kept until the next sync deletes their objects from storage
     annotation = models.OneToOneField(
-        'tasks.Annotation', on_delete=models.CASCADE, related_name='%(app_label)s_%(class)s'
+        'tasks.Annotation', on_delete=models.SET_NULL, null=True, related_name='%(app_label)s_%(class)s'
     )
     object_exists = models.BooleanField(
         _('object exists'), help_text='Whether object under external link still exists', default=True
     )
+    object_key = models.TextField(_('object key'), null=True, blank=True, help_text='Key of the saved object')
+    content_hash = models.CharField(
+        _('content hash'), max_length=32, null=True, blank=True, help_text='MD5 of the saved object content'
+    )
     created_at = models.DateTimeField(_('created at'), auto_now_add=True, help_text='Creation time')
     updated_at = models.DateTimeField(_('updated at'), auto_now=True, help_text='Update time')
 
@@ -618,21 +945,50 @@ class ExportStorageLink(models.Model):
 
     @property
     def key(self):
-        return self.get_key(self.annotation)
+        return self.object_key or self.get_key(self.annotation)
 
     @classmethod
     def exists(cls, annotation, storage):
         return cls.objects.filter(annotation=annotation.id, storage=storage.id).exists()
 
     @classmethod
-    def create(cls, annotation, storage):
-        link, created = cls.objects.get_or_create(annotation=annotation, storage=storage, object_exists=True)
-        if not created:
-            # update updated_at field
-            link.save()
+    def create(cls, annotation, storage, content_hash=None):
+        link, created = cls.objects.update_or_create(
+            annotation=annotation,
+            storage=storage,
+            defaults={'object_exists': True, 'object_key': cls.get_key(annotation), 'content_hash': content_hash},
+        )
         return link
 
+    @classmethod
+    def create_many(cls, annotations, storage, content_hashes=None):
+        """Bulk version of create: update existing links and add the missing ones
+
+        :param content_hashes: dict {annotation id: hash of the saved object}
+        """
+        content_hashes = content_hashes or {}
+        links = {link.annotation_id: link for link in cls.objects.filter(annotation__in=annotations, storage=storage)}
+        now = timezone.now()
+        new_links = []
+        for annotation in annotations:
+            link = links.get(annotation.id)
+            if link is None:
+                link = cls(annotation=annotation, storage=storage)
+                new_links.append(link)
+            link.object_exists = True
+            link.object_key = cls.get_key(annotation)
+            link.content_hash = content_hashes.get(annotation.id)
+            # bulk_update doesn't touch auto_now fields
+            link.updated_at = now
+
+        fields = ['object_exists', 'object_key', 'content_hash', 'updated_at']
+        cls.objects.bulk_update(list(links.values()), fields, batch_size=settings.BATCH_SIZE)
+        cls.objects.bulk_create(new_links, batch_size=settings.BATCH_SIZE, ignore_conflicts=True)
+
     def has_permission(self, user):
+        if self.annotation is None:
+            # link of removed annotation, its object is waiting for deletion
+            return self.storage.has_permission(user)
         user.project = self.annotation.project  # link for activity log
         if self.annotation.has_permission(user):
             return True
@@ -0,0 +1,64 @@
+"""This file and its contents are licensed under the Apache License 2.0. Please see the included NOTICE for copyright information and LICENSE for a copy of the license.
+"""
+import hashlib
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+
+class ClientPool(object):
+    """Thread-safe LRU pool of cloud storage clients with TTL eviction.
+
+    Clients are keyed by storage type and a hash of the credentials, so secrets are not kept in keys
+    and rotated credentials never reuse the old client: it's evicted by LRU or TTL later.
+    """
+
+    def __init__(self):
+        self._clients = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(kind, credentials):
+        digest = hashlib.sha256(json.dumps(credentials, sort_keys=True, default=str).encode()).hexdigest()
+        return kind, digest
+
+    def get(self, kind, credentials, factory):
+        """Return pooled client or build a new one
+
+        :param kind: storage type, e.g. 's3'
+        :param credentials: JSON serializable credentials which the client is built from
+        :param factory: callable without arguments that builds the client
+        """
+        key = self.make_key(kind, credentials)
+        now = time.monotonic()
+        with self._lock:
+            item = self._clients.get(key)
+            if item is not None and now - item[0] < settings.STORAGE_CLIENT_POOL_TTL:
+                self._clients.move_to_end(key)
+                return item[1]
+
+        # client initialization is slow (~100 ms), don't block other threads meanwhile
+        client = factory()
+        with self._lock:
+            self._clients[key] = (now, client)
+            self._clients.move_to_end(key)
+            while len(self._clients) > settings.STORAGE_CLIENT_POOL_SIZE:
+                self._clients.popitem(last=False)
+        logger.debug(f'New {kind} client is added to the pool, pool size {len(self._clients)}')
+        return client
+
+    def clear(self):
+        with self._lock:
+            self._clients.clear()
+
+    def __len__(self):
+        return len(self._clients)
+
+
+client_pool = ClientPool()
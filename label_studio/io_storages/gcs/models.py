@@ -17,6 +17,7 @@ from io_storages.base_models import (
     ProjectStorageMixin,
 )
 from io_storages.gcs.utils import GCS
+from io_storages.utils import get_content_hash
 from tasks.models import Annotation
 
 logger = logging.getLogger(__name__)
@@ -39,6 +40,9 @@ class GCSStorageMixin(models.Model):
     )
     google_project_id = models.TextField(_('Google Project ID'), null=True, blank=True, help_text='Google project ID')
 
+    def get_client_credentials(self):
+        return self.google_project_id, self.google_application_credentials
+
     def get_client(self):
         return GCS.get_client(
             google_project_id=self.google_project_id,
@@ -69,12 +73,16 @@ class GCSImportStorageBase(GCSStorageMixin, ImportStorage):
     )
 
     def iterkeys(self):
+        return self.iterkeys_after(None)
+
+    def iterkeys_after(self, key):
         return GCS.iter_blobs(
             client=self.get_client(),
             bucket_name=self.bucket,
             prefix=self.prefix,
             regex_filter=self.regex_filter,
             return_key=True,
+            start_after=key,
         )
 
     def get_data(self, key):
@@ -113,20 +121,27 @@ class GCSImportStorage(ProjectStorageMixin, GCSImportStorageBase):
 
 class GCSExportStorage(GCSStorageMixin, ExportStorage):
     def save_annotation(self, annotation):
-        bucket = self.get_bucket()
         logger.debug(f'Creating new object on {self.__class__.__name__} Storage {self} for annotation {annotation}')
         ser_annotation = self._get_serialized_data(annotation)
 
         # get key that identifies this object in storage
         key = GCSExportStorageLink.get_key(annotation)
+        self.save_object(key, ser_annotation)
+
+        # create link if everything ok
+        GCSExportStorageLink.create(annotation, self, content_hash=get_content_hash(ser_annotation))
+
+    def save_object(self, key, data):
+        bucket = self.get_bucket()
         key = str(self.prefix) + '/' + key if self.prefix else key
 
         # put object into storage
         blob = bucket.blob(key)
-        blob.upload_from_string(json.dumps(ser_annotation))
+        blob.upload_from_string(json.dumps(data))
 
-        # create link if everything ok
-        GCSExportStorageLink.create(annotation, self)
+    def delete_object(self, key):
+        key = str(self.prefix) + '/' + key if self.prefix else key
+        self.get_bucket().blob(key).delete()
 
 
 def async_export_annotation_to_gcs_storages(annotation):
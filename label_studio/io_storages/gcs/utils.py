@@ -15,6 +15,7 @@ from core.utils.common import get_ttl_hash
 from django.conf import settings
 from google.auth.exceptions import DefaultCredentialsError
 from google.oauth2 import service_account
+from io_storages.client_pool import client_pool
 
 logger = logging.getLogger(__name__)
 
@@ -22,7 +23,6 @@ Base64 = bytes
 
 
 class GCS(object):
-    _client_cache = {}
     _credentials_cache = None
     DEFAULT_GOOGLE_PROJECT_ID = gcs.client._marker
 
@@ -58,26 +58,24 @@ class GCS(object):
         :return:
         """
         google_project_id = google_project_id or GCS.DEFAULT_GOOGLE_PROJECT_ID
-        cache_key = google_application_credentials
-
-        if cache_key not in GCS._client_cache:
 
+        def create_client():
             # use credentials from LS Cloud Storage settings
             if google_application_credentials:
-                if isinstance(google_application_credentials, str):
+                credentials_info = google_application_credentials
+                if isinstance(credentials_info, str):
                     try:
-                        google_application_credentials = json.loads(google_application_credentials)
+                        credentials_info = json.loads(credentials_info)
                     except JSONDecodeError as e:
                         # change JSON error to human-readable format
                         raise ValueError(f'Google Application Credentials must be valid JSON string. {e}')
-                credentials = service_account.Credentials.from_service_account_info(google_application_credentials)
-                GCS._client_cache[cache_key] = gcs.Client(project=google_project_id, credentials=credentials)
+                credentials = service_account.Credentials.from_service_account_info(credentials_info)
+                return gcs.Client(project=google_project_id, credentials=credentials)
 
             # use Google Application Default Credentials (ADC)
-            else:
-                GCS._client_cache[cache_key] = gcs.Client(project=google_project_id)
+            return gcs.Client(project=google_project_id)
 
-        return GCS._client_cache[cache_key]
+        return client_pool.get('gcs', (google_project_id, google_application_credentials), create_client)
 
     @classmethod
     def validate_connection(
@@ -114,6 +112,7 @@ class GCS(object):
         regex_filter: str = None,
         limit: int = None,
         return_key: bool = False,
+        start_after: str = None,
     ):
         """
         Iterate files on the bucket. Optionally return limited number of files that match provided extensions
@@ -123,16 +122,20 @@ class GCS(object):
         :param regex_filter: RegEx filter
         :param limit: specify limit for max files
         :param return_key: return object key string instead of gcs.Blob object
+        :param start_after: list only blobs going after this name in lexicographical order
         :return: Iterator object
         """
         total_read = 0
-        blob_iter = client.list_blobs(bucket_name, prefix=prefix)
+        blob_iter = client.list_blobs(bucket_name, prefix=prefix, start_offset=start_after)
         prefix = str(prefix) if prefix else ''
         regex = re.compile(str(regex_filter)) if regex_filter else None
         for blob in blob_iter:
             # skip dir level
             if blob.name == (prefix.rstrip('/') + '/'):
                 continue
+            # start_offset is inclusive
+            if start_after and blob.name == start_after:
+                continue
             # check regex pattern filter
             if regex and not regex.match(blob.name):
                 logger.debug(blob.name + ' is skipped by regex filter')
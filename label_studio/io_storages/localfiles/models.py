@@ -19,6 +19,7 @@ from io_storages.base_models import (
     ImportStorageLink,
     ProjectStorageMixin,
 )
+from io_storages.utils import get_content_hash
 from rest_framework.exceptions import ValidationError
 from tasks.models import Annotation
 
@@ -115,14 +116,22 @@ class LocalFilesExportStorage(LocalFilesMixin, ExportStorage):
 
         # get key that identifies this object in storage
         key = LocalFilesExportStorageLink.get_key(annotation)
+        self.save_object(key, ser_annotation)
+
+        # Create export storage link
+        LocalFilesExportStorageLink.create(annotation, self, content_hash=get_content_hash(ser_annotation))
+
+    def save_object(self, key, data):
         key = os.path.join(self.path, f'{key}')
 
         # put object into storage
         with open(key, mode='w') as f:
-            json.dump(ser_annotation, f, indent=2)
+            json.dump(data, f, indent=2)
 
-        # Create export storage link
-        LocalFilesExportStorageLink.create(annotation, self)
+    def delete_object(self, key):
+        key = os.path.join(self.path, f'{key}')
+        if os.path.exists(key):
+            os.remove(key)
 
 
 class LocalFilesImportStorageLink(ImportStorageLink):
@@ -0,0 +1,27 @@
+import logging
+
+from django.core.management.base import BaseCommand
+from io_storages.localfiles.models import LocalFilesExportStorage
+from io_storages.models import get_storage_classes
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = 'Drop export storage links of removed annotations and delete their objects if storages allow it'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--project', type=int, default=None, help='project id, all projects by default')
+
+    def handle(self, *args, **options):
+        deleted = 0
+        for storage_class in get_storage_classes('export') + [LocalFilesExportStorage]:
+            # only storages with links of removed annotations
+            storages = storage_class.objects.filter(links__isnull=False, links__annotation__isnull=True).distinct()
+            if options['project']:
+                storages = storages.filter(project_id=options['project'])
+            for storage in storages:
+                deleted += storage.delete_removed_objects()
+                logger.debug(f'Links of removed annotations are dropped for {storage}')
+
+        self.stdout.write(f'{deleted} objects of removed annotations are deleted')
@@ -0,0 +1,90 @@
+# Generated by Django 3.2.23 on 2026-10-18 06:08
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tasks', '0045_auto_20231124_1238'),
+        ('io_storages', '0016_add_aws_sse_kms_key'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='azureblobexportstoragelink',
+            name='content_hash',
+            field=models.CharField(blank=True, help_text='MD5 of the saved object content', max_length=32, null=True, verbose_name='content hash'),
+        ),
+        migrations.AddField(
+            model_name='azureblobexportstoragelink',
+            name='object_key',
+            field=models.TextField(blank=True, help_text='Key of the saved object', null=True, verbose_name='object key'),
+        ),
+        migrations.AddField(
+            model_name='gcsexportstoragelink',
+            name='content_hash',
+            field=models.CharField(blank=True, help_text='MD5 of the saved object content', max_length=32, null=True, verbose_name='content hash'),
+        ),
+        migrations.AddField(
+            model_name='gcsexportstoragelink',
+            name='object_key',
+            field=models.TextField(blank=True, help_text='Key of the saved object', null=True, verbose_name='object key'),
+        ),
+        migrations.AddField(
+            model_name='localfilesexportstoragelink',
+            name='content_hash',
+            field=models.CharField(blank=True, help_text='MD5 of the saved object content', max_length=32, null=True, verbose_name='content hash'),
+        ),
+        migrations.AddField(
+            model_name='localfilesexportstoragelink',
+            name='object_key',
+            field=models.TextField(blank=True, help_text='Key of the saved object', null=True, verbose_name='object key'),
+        ),
+        migrations.AddField(
+            model_name='redisexportstoragelink',
+            name='content_hash',
+            field=models.CharField(blank=True, help_text='MD5 of the saved object content', max_length=32, null=True, verbose_name='content hash'),
+        ),
+        migrations.AddField(
+            model_name='redisexportstoragelink',
+            name='object_key',
+            field=models.TextField(blank=True, help_text='Key of the saved object', null=True, verbose_name='object key'),
+        ),
+        migrations.AddField(
+            model_name='s3exportstoragelink',
+            name='content_hash',
+            field=models.CharField(blank=True, help_text='MD5 of the saved object content', max_length=32, null=True, verbose_name='content hash'),
+        ),
+        migrations.AddField(
+            model_name='s3exportstoragelink',
+            name='object_key',
+            field=models.TextField(blank=True, help_text='Key of the saved object', null=True, verbose_name='object key'),
+        ),
+        migrations.AlterField(
+            model_name='azureblobexportstoragelink',
+            name='annotation',
+            field=models.OneToOneField(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='io_storages_azureblobexportstoragelink', to='tasks.annotation'),
+        ),
+        migrations.AlterField(
+            model_name='gcsexportstoragelink',
+            name='annotation',
+            field=models.OneToOneField(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='io_storages_gcsexportstoragelink', to='tasks.annotation'),
+        ),
+        migrations.AlterField(
+            model_name='localfilesexportstoragelink',
+            name='annotation',
+            field=models.OneToOneField(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='io_storages_localfilesexportstoragelink', to='tasks.annotation'),
+        ),
+        migrations.AlterField(
+            model_name='redisexportstoragelink',
+            name='annotation',
+            field=models.OneToOneField(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='io_storages_redisexportstoragelink', to='tasks.annotation'),
+        ),
+        migrations.AlterField(
+            model_name='s3exportstoragelink',
+            name='annotation',
+            field=models.OneToOneField(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='io_storages_s3exportstoragelink', to='tasks.annotation'),
+        ),
+    ]
@@ -0,0 +1,105 @@
+"""This file and its contents are licensed under the Apache License 2.0. Please see the included NOTICE for copyright information and LICENSE for a copy of the license.
+"""
+import hashlib
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+
+from core.redis import redis_get, redis_set
+from django.conf import settings
+from io_storages.client_pool import ClientPool
+
+logger = logging.getLogger(__name__)
+
+
+class PresignedUrlCache(object):
+    """Cache of URLs generated by storages, it keeps presigned URLs stable between Data Manager pages
+    and saves signing on every request. Entries are held in-process (bounded LRU) and optionally in Redis
+    to share them between workers.
+    """
+
+    REDIS_PREFIX = 'presigned-url:'
+
+    def __init__(self):
+        self._urls = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(storage, url):
+        # URLs signed with rotated credentials are not reused, the same as pooled clients
+        _, credentials = ClientPool.make_key(storage.__class__.__name__, storage.get_client_credentials())
+        key = f'{storage.__class__.__name__}:{storage.id}:{getattr(storage, "presign", None)}:{credentials}:{url}'
+        return hashlib.sha256(key.encode()).hexdigest()
+
+    def _get_local(self, key, now):
+        with self._lock:
+            item = self._urls.get(key)
+            if item is None:
+                return None
+            if item[0] <= now:
+                del self._urls[key]
+                return None
+            self._urls.move_to_end(key)
+            return item[1]
+
+    def _set_local(self, key, url, expires_at):
+        with self._lock:
+            self._urls[key] = (expires_at, url)
+            self._urls.move_to_end(key)
+            while len(self._urls) > settings.STORAGE_PRESIGNED_URL_CACHE_SIZE:
+                self._urls.popitem(last=False)
+
+    def _get_redis(self, key, now):
+        try:
+            value = redis_get(self.REDIS_PREFIX + key)
+        except Exception as exc:
+            logger.debug(f'Presigned URL cache: redis read failed: {exc}')
+            return None
+        if value is None:
+            return None
+        value = json.loads(value)
+        if value['expires_at'] <= now:
+            return None
+        self._set_local(key, value['url'], value['expires_at'])
+        return value['url']
+
+    def _set_redis(self, key, url, expires_at, ttl):
+        value = json.dumps({'url': url, 'expires_at': expires_at})
+        try:
+            redis_set(self.REDIS_PREFIX + key, value, ttl=ttl)
+        except Exception as exc:
+            logger.debug(f'Presigned URL cache: redis write failed: {exc}')
+
+    def get_or_generate(self, storage, url, ttl, generate):
+        """Return cached URL or generate and cache a new one
+
+        :param storage: storage object that resolves the url
+        :param url: storage url, e.g. s3://bucket/key
+        :param ttl: cache TTL in seconds, must be shorter than TTL of the presigned URL
+        :param generate: callable without arguments that makes http url
+        """
+        key = self.make_key(storage, url)
+        # wall clock time because entries are shared between processes via redis
+        now = time.time()
+        http_url = self._get_local(key, now)
+        if http_url is None and settings.STORAGE_PRESIGNED_URL_CACHE_REDIS:
+            http_url = self._get_redis(key, now)
+        if http_url is not None:
+            return http_url
+
+        http_url = generate()
+        if http_url:
+            expires_at = now + ttl
+            self._set_local(key, http_url, expires_at)
+            if settings.STORAGE_PRESIGNED_URL_CACHE_REDIS:
+                self._set_redis(key, http_url, expires_at, ttl)
+        return http_url
+
+    def clear(self):
+        with self._lock:
+            self._urls.clear()
+
+
+presigned_url_cache = PresignedUrlCache()
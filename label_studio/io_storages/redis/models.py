@@ -15,6 +15,7 @@ from io_storages.base_models import (
     ImportStorageLink,
     ProjectStorageMixin,
 )
+from io_storages.utils import get_content_hash
 from tasks.models import Annotation
 
 logger = logging.getLogger(__name__)
@@ -111,18 +112,23 @@ class RedisExportStorage(RedisStorageMixin, ExportStorage):
     db = models.PositiveSmallIntegerField(_('db'), default=2, help_text='Server Database')
 
     def save_annotation(self, annotation):
-        client = self.get_client()
         logger.debug(f'Creating new object on {self.__class__.__name__} Storage {self} for annotation {annotation}')
         ser_annotation = self._get_serialized_data(annotation)
 
         # get key that identifies this object in storage
         key = RedisExportStorageLink.get_key(annotation)
+        self.save_object(key, ser_annotation)
+
+        # create link if everything ok
+        RedisExportStorageLink.create(annotation, self, content_hash=get_content_hash(ser_annotation))
 
+    def save_object(self, key, data):
+        client = self.get_client()
         # put object into storage
-        client.set(key, json.dumps(ser_annotation))
+        client.set(key, json.dumps(data))
 
-        # create link if everything ok
-        RedisExportStorageLink.create(annotation, self)
+    def delete_object(self, key):
+        self.get_client().delete(key)
 
 
 @receiver(post_save, sender=Annotation)
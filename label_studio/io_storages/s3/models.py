@@ -19,7 +19,9 @@ from io_storages.base_models import (
     ImportStorageLink,
     ProjectStorageMixin,
 )
+from io_storages.client_pool import client_pool
 from io_storages.s3.utils import get_client_and_resource, resolve_s3_url
+from io_storages.utils import get_content_hash
 from tasks.models import Annotation
 from tasks.validation import ValidationError as TaskValidationError
 
@@ -29,8 +31,6 @@ logger = logging.getLogger(__name__)
 logging.getLogger('botocore').setLevel(logging.CRITICAL)
 boto3.set_stream_logger(level=logging.INFO)
 
-clients_cache = {}
-
 
 class S3StorageMixin(models.Model):
     bucket = models.TextField(_('bucket'), null=True, blank=True, help_text='S3 bucket name')
@@ -52,21 +52,19 @@ class S3StorageMixin(models.Model):
     region_name = models.TextField(_('region_name'), null=True, blank=True, help_text='AWS Region')
     s3_endpoint = models.TextField(_('s3_endpoint'), null=True, blank=True, help_text='S3 Endpoint')
 
-    def get_client_and_resource(self):
-        # s3 client initialization ~ 100 ms, for 30 tasks it's a 3 seconds, so we need to cache it
-        cache_key = f'{self.aws_access_key_id}:{self.aws_secret_access_key}:{self.aws_session_token}:{self.region_name}:{self.s3_endpoint}'
-        if cache_key in clients_cache:
-            return clients_cache[cache_key]
-
-        result = get_client_and_resource(
+    def get_client_credentials(self):
+        return (
             self.aws_access_key_id,
             self.aws_secret_access_key,
             self.aws_session_token,
             self.region_name,
             self.s3_endpoint,
         )
-        clients_cache[cache_key] = result
-        return result
+
+    def get_client_and_resource(self):
+        # s3 client initialization ~ 100 ms, for 30 tasks it's a 3 seconds, so we need to cache it
+        credentials = self.get_client_credentials()
+        return client_pool.get('s3', credentials, lambda: get_client_and_resource(*credentials))
 
     def get_client(self):
         client, _ = self.get_client_and_resource()
@@ -125,14 +123,19 @@ class S3ImportStorageBase(S3StorageMixin, ImportStorage):
     )
 
     def iterkeys(self):
+        return self.iterkeys_after(None)
+
+    def iterkeys_after(self, key):
         client, bucket = self.get_client_and_bucket()
+        list_kwargs = {}
         if self.prefix:
-            list_kwargs = {'Prefix': self.prefix.rstrip('/') + '/'}
+            list_kwargs['Prefix'] = self.prefix.rstrip('/') + '/'
             if not self.recursive_scan:
                 list_kwargs['Delimiter'] = '/'
-            bucket_iter = bucket.objects.filter(**list_kwargs).all()
-        else:
-            bucket_iter = bucket.objects.all()
+        if key:
+            # S3 lists keys in lexicographical order starting after the marker
+            list_kwargs['Marker'] = key
+        bucket_iter = bucket.objects.filter(**list_kwargs).all() if list_kwargs else bucket.objects.all()
         regex = re.compile(str(self.regex_filter)) if self.regex_filter else None
         for obj in bucket_iter:
             key = obj.key
@@ -161,10 +164,10 @@ class S3ImportStorageBase(S3StorageMixin, ImportStorage):
             data_key = settings.DATA_UNDEFINED_NAME
             return {data_key: uri}
 
-        # read task json from bucket and validate it
-        _, s3 = self.get_client_and_resource()
-        bucket = s3.Bucket(self.bucket)
-        obj = s3.Object(bucket.name, key).get()['Body'].read().decode('utf-8')
+        # read task json from bucket and validate it,
+        # use client instead of resource because boto3 clients are thread-safe and objects are loaded in parallel
+        client = self.get_client()
+        obj = client.get_object(Bucket=self.bucket, Key=key)['Body'].read().decode('utf-8')
         value = json.loads(obj)
         if not isinstance(value, dict):
             raise ValueError(f'Error on key {key}: For S3 your JSON file must be a dictionary with one task')
@@ -176,15 +179,7 @@ class S3ImportStorageBase(S3StorageMixin, ImportStorage):
         return resolve_s3_url(url, self.get_client(), self.presign, expires_in=self.presign_ttl * 60)
 
     def get_blob_metadata(self, key):
-        return AWS.get_blob_metadata(
-            key,
-            self.bucket,
-            aws_access_key_id=self.aws_access_key_id,
-            aws_secret_access_key=self.aws_secret_access_key,
-            aws_session_token=self.aws_session_token,
-            region_name=self.region_name,
-            s3_endpoint=self.s3_endpoint,
-        )
+        return AWS.get_blob_metadata(key, self.bucket, client=self.get_client())
 
     class Meta:
         abstract = True
@@ -197,18 +192,31 @@ class S3ImportStorage(ProjectStorageMixin, S3ImportStorageBase):
 
 class S3ExportStorage(S3StorageMixin, ExportStorage):
     def save_annotation(self, annotation):
-        client, s3 = self.get_client_and_resource()
         logger.debug(f'Creating new object on {self.__class__.__name__} Storage {self} for annotation {annotation}')
         ser_annotation = self._get_serialized_data(annotation)
 
         # get key that identifies this object in storage
         key = S3ExportStorageLink.get_key(annotation)
+        self.save_object(key, ser_annotation)
+
+        # create link if everything ok
+        S3ExportStorageLink.create(annotation, self, content_hash=get_content_hash(ser_annotation))
+
+    def save_all_annotations(self, force=False):
+        # objects are saved from worker threads, resolve the user for feature flags in advance
+        self.cached_user = self.project.organization.created_by
+        super().save_all_annotations(force=force)
+
+    def save_object(self, key, data):
+        # use client instead of resource because boto3 clients are thread-safe and objects are saved in parallel
+        client = self.get_client()
         key = str(self.prefix) + '/' + key if self.prefix else key
 
         # put object into storage
         additional_params = {}
 
-        self.cached_user = getattr(self, 'cached_user', annotation.task.project.organization.created_by)
+        if not hasattr(self, 'cached_user'):
+            self.cached_user = self.project.organization.created_by
         if flag_set(
             'fflag_feat_back_lsdv_3958_server_side_encryption_for_target_storage_short', user=self.cached_user
         ):
@@ -218,21 +226,21 @@ class S3ExportStorage(S3StorageMixin, ExportStorage):
             else:
                 additional_params['ServerSideEncryption'] = 'AES256'
 
-        s3.Object(self.bucket, key).put(Body=json.dumps(ser_annotation), **additional_params)
+        client.put_object(Bucket=self.bucket, Key=key, Body=json.dumps(data), **additional_params)
 
-        # create link if everything ok
-        S3ExportStorageLink.create(annotation, self)
+    def delete_object(self, key):
+        client = self.get_client()
+        key = str(self.prefix) + '/' + key if self.prefix else key
+        client.delete_object(Bucket=self.bucket, Key=key)
 
     def delete_annotation(self, annotation):
-        client, s3 = self.get_client_and_resource()
         logger.debug(f'Deleting object on {self.__class__.__name__} Storage {self} for annotation {annotation}')
 
         # get key that identifies this object in storage
         key = S3ExportStorageLink.get_key(annotation)
-        key = str(self.prefix) + '/' + key if self.prefix else key
 
         # delete object from storage
-        s3.Object(self.bucket, key).delete()
+        self.delete_object(key)
 
         # delete link if everything ok
         S3ExportStorageLink.objects.filter(storage=self, annotation=annotation).delete()
@@ -277,6 +285,23 @@ class S3ImportStorageLink(ImportStorageLink):
             or cls.objects.filter(key=prefix + '/' + key, storage=storage.id).exists()
         )
 
+    @classmethod
+    def existing_keys(cls, keys, storage):
+        # TODO: this is a workaround to be compatible with old keys version - remove it later
+        prefix = str(storage.prefix) or ''
+        legacy_keys = {}
+        for key in keys:
+            legacy_keys[prefix + key] = key
+            legacy_keys[prefix + '/' + key] = key
+        keys = set(keys)
+        existing = set()
+        for key in super(S3ImportStorageLink, cls).existing_keys(list(keys | legacy_keys.keys()), storage):
+            if key in keys:
+                existing.add(key)
+            if key in legacy_keys:
+                existing.add(legacy_keys[key])
+        return existing
+
 
 class S3ExportStorageLink(ExportStorageLink):
     storage = models.ForeignKey(S3ExportStorage, on_delete=models.CASCADE, related_name='links')
@@ -35,7 +35,7 @@ class StorageTaskSerializer(TaskSerializer):
 
     class Meta:
         model = Task
-        fields = '__all__'
+        exclude = ('random_key',)
 
 
 class StorageCompletedBySerializer(serializers.ModelSerializer):
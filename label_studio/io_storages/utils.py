@@ -1,5 +1,7 @@
 """This file and its contents are licensed under the Apache License 2.0. Please see the included NOTICE for copyright information and LICENSE for a copy of the license.
 """
+import hashlib
+import json
 import logging
 import re
 
@@ -38,3 +40,17 @@ def get_uri_via_regex(data, prefixes=('s3', 'gs')):
             logger.warning("Can't parse task.data to match URI. Reason: Match is not found.")
             return None, None
     return r_match.group('uri'), r_match.group('storage')
+
+
+def _skip_volatile_fields(data):
+    if isinstance(data, dict):
+        return {key: _skip_volatile_fields(value) for key, value in data.items() if key != 'created_ago'}
+    if isinstance(data, list):
+        return [_skip_volatile_fields(value) for value in data]
+    return data
+
+
+def get_content_hash(data):
+    """MD5 of serialized storage object, humanized `created_ago` fields are skipped because they change with time"""
+    content = json.dumps(_skip_volatile_fields(data), sort_keys=True, default=str)
+    return hashlib.md5(content.encode()).hexdigest()  # nosec
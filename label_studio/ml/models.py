@@ -378,6 +378,12 @@ class MLBackendTrainJob(models.Model):
         return status['job_status'] in ('queued', 'started')
 
 
+def train_ml_backends(project_id):
+    """Start training of all ML backends connected to the project, it's run as a background job"""
+    for ml_backend in MLBackend.objects.filter(project_id=project_id):
+        ml_backend.train()
+
+
 def _validate_ml_api_result(ml_api_result, tasks, curr_logger):
     if ml_api_result.is_error:
         curr_logger.info(ml_api_result.error_message)
@@ -1,4 +1,5 @@
 import logging
+import random
 from collections import Counter
 
 from core.feature_flags import flag_set
@@ -7,6 +8,7 @@ from django.conf import settings
 from django.db.models import BooleanField, Case, Count, Exists, Max, OuterRef, Q, Value, When
 from django.db.models.fields import DecimalField
 from projects.functions.stream_history import add_stream_history
+from projects.functions.task_reservations import get_reserved_task, reservations_enabled, reserve_tasks
 from tasks.models import Annotation, Task
 
 logger = logging.getLogger(__name__)
@@ -19,26 +21,57 @@ def get_next_task_logging_level(user):
     return level
 
 
-def _get_random_unlocked(task_query, user, upper_limit=None):
-    for task in task_query.order_by('?').only('id')[: settings.RANDOM_NEXT_TASK_SAMPLE_SIZE]:
-        try:
-            task = Task.objects.select_for_update(skip_locked=True).get(pk=task.id)
-            if not task.has_lock(user):
-                return task
-        except Task.DoesNotExist:
-            logger.debug('Task with id {} locked'.format(task.id))
-
-
-def _get_first_unlocked(tasks_query, user):
-    # Skip tasks that are locked due to being taken by collaborators
-    for task_id in tasks_query.values_list('id', flat=True):
-        try:
-            task = Task.objects.select_for_update(skip_locked=True).get(pk=task_id)
-            if not task.has_lock(user):
-                return task
-
-        except Task.DoesNotExist:
-            logger.debug('Task with id {} locked'.format(task_id))
+def _get_unlocked_task(task_ids, user, project):
+    """Return the first task from task_ids which is not locked for the user.
+    All candidates are locked with SKIP LOCKED and checked like Task.has_lock() in one query.
+    """
+    if not task_ids:
+        return None
+    candidates = Task.objects.select_for_update(skip_locked=True).filter(pk__in=task_ids)
+    unlocked_ids = set(Task.filter_unlocked(candidates, user, project).values_list('id', flat=True))
+    for task_id in task_ids:
+        if task_id in unlocked_ids:
+            return Task.objects.get(pk=task_id)
+        logger.debug('Task with id {} locked'.format(task_id))
+
+
+def sample_random_task_ids(task_query, size):
+    """Uniform random sample of task ids using the index on Task.random_key:
+    tasks next to a random point in the key range are taken, so the database doesn't sort the whole queryset
+    """
+    task_query = task_query.values_list('id', flat=True)
+    if task_query.filter(random_key__isnull=True).exists():
+        # tasks with null keys (e.g. inserted bypassing the model) are never reached by the key range,
+        # so the whole queryset is sampled until backfill_task_random_keys command fills them
+        return list(task_query.order_by('?')[:size])
+
+    point = random.random()
+    task_query = task_query.order_by('random_key')
+    task_ids = list(task_query.filter(random_key__gte=point)[:size])
+    if len(task_ids) < size:
+        task_ids += list(task_query.filter(random_key__lt=point)[: size - len(task_ids)])
+    return task_ids
+
+
+def _get_random_unlocked(task_query, user, project, upper_limit=None):
+    task_ids = sample_random_task_ids(task_query, settings.RANDOM_NEXT_TASK_SAMPLE_SIZE)
+    return _get_unlocked_task(task_ids, user, project)
+
+
+def _get_first_unlocked(tasks_query, user, project):
+    """Return the first task of the ordered queryset which is not locked for the user.
+    Tasks taken by collaborators are skipped in SQL, so it's a constant number of queries
+    unless candidates are being locked by concurrent requests at the same moment.
+    """
+    batch_size = settings.SEQUENCE_NEXT_TASK_BATCH_SIZE
+    candidates = Task.filter_unlocked(tasks_query, user, project).values_list('id', flat=True)
+    offset = 0
+    while True:
+        task_ids = list(candidates[offset : offset + batch_size])
+        task = _get_unlocked_task(task_ids, user, project)
+        if task is not None or len(task_ids) < batch_size:
+            return task
+        offset += batch_size
 
 
 def _try_ground_truth(tasks, project, user):
@@ -49,8 +82,8 @@ def _try_ground_truth(tasks, project, user):
     )
     if not_solved_tasks_with_ground_truths.exists():
         if project.sampling == project.SEQUENCE:
-            return _get_first_unlocked(not_solved_tasks_with_ground_truths, user)
-        return _get_random_unlocked(not_solved_tasks_with_ground_truths, user)
+            return _get_first_unlocked(not_solved_tasks_with_ground_truths, user, project)
+        return _get_random_unlocked(not_solved_tasks_with_ground_truths, user, project)
 
 
 def _try_tasks_with_overlap(tasks):
@@ -62,7 +95,7 @@ def _try_tasks_with_overlap(tasks):
         return None, tasks.filter(overlap=1)
 
 
-def _try_breadth_first(tasks, user):
+def _try_breadth_first(tasks, user, project):
     """Try to find tasks with maximum amount of annotations, since we are trying to label tasks as fast as possible"""
 
     tasks = tasks.annotate(annotations_count=Count('annotations', filter=~Q(annotations__completed_by=user)))
@@ -84,7 +117,7 @@ def _try_breadth_first(tasks, user):
     )
     if not_solved_tasks_labeling_with_max_annotations.exists():
         # try to complete tasks that are already in progress
-        return _get_random_unlocked(not_solved_tasks_labeling_with_max_annotations, user)
+        return _get_random_unlocked(not_solved_tasks_labeling_with_max_annotations, user, project)
 
 
 def _try_uncertainty_sampling(tasks, project, user_solved_tasks_array, user, prepared_tasks):
@@ -116,17 +149,20 @@ def _try_uncertainty_sampling(tasks, project, user_solved_tasks_array, user, pre
         if num_annotators > 1 and num_tasks_with_current_predictions > 0:
             # try to randomize tasks to avoid concurrent labeling between several annotators
             next_task = _get_random_unlocked(
-                possible_next_tasks, user, upper_limit=min(num_annotators + 1, num_tasks_with_current_predictions)
+                possible_next_tasks,
+                user,
+                project,
+                upper_limit=min(num_annotators + 1, num_tasks_with_current_predictions),
             )
         else:
-            next_task = _get_first_unlocked(possible_next_tasks, user)
+            next_task = _get_first_unlocked(possible_next_tasks, user, project)
     else:
         # uncertainty sampling fallback: choose by random sampling
         logger.debug(
             f'Uncertainty sampling fallbacks to random sampling '
             f'(current project.model_version={str(project.model_version)})'
         )
-        next_task = _get_random_unlocked(tasks, user)
+        next_task = _get_random_unlocked(tasks, user, project)
     return next_task
 
 
@@ -184,7 +220,7 @@ def get_next_task_without_dm_queue(user, project, not_solved_tasks, assigned_fla
     if not next_task and project.maximum_annotations > 1:
         # if there any tasks in progress (with maximum number of annotations), randomly sampling from them
         logger.debug(f'User={user} tries depth first from prepared tasks')
-        next_task = _try_breadth_first(not_solved_tasks, user)
+        next_task = _try_breadth_first(not_solved_tasks, user, project)
         if next_task:
             queue_info += (' & ' if queue_info else '') + 'Breadth first queue'
 
@@ -198,7 +234,7 @@ def skipped_queue(next_task, prepared_tasks, project, user, queue_info):
         if skipped_tasks.exists():
             preserved_order = Case(*[When(pk=pk, then=pos) for pos, pk in enumerate(skipped_tasks)])
             skipped_tasks = prepared_tasks.filter(pk__in=skipped_tasks).order_by(preserved_order)
-            next_task = _get_first_unlocked(skipped_tasks, user)
+            next_task = _get_first_unlocked(skipped_tasks, user, project)
             queue_info = 'Skipped queue'
 
     return next_task, queue_info
@@ -214,7 +250,7 @@ def postponed_queue(next_task, prepared_tasks, project, user, queue_info):
         if postponed_tasks.exists():
             preserved_order = Case(*[When(pk=pk, then=pos) for pos, pk in enumerate(postponed_tasks)])
             postponed_tasks = prepared_tasks.filter(pk__in=postponed_tasks).order_by(preserved_order)
-            next_task = _get_first_unlocked(postponed_tasks, user)
+            next_task = _get_first_unlocked(postponed_tasks, user, project)
             if next_task is not None:
                 next_task.allow_postpone = False
             queue_info = 'Postponed draft queue'
@@ -227,7 +263,7 @@ def get_task_from_qs_with_sampling(
 ):
     if project.sampling == project.SEQUENCE:
         logger.debug(f'User={user} tries sequence sampling from prepared tasks')
-        next_task = _get_first_unlocked(not_solved_tasks, user)
+        next_task = _get_first_unlocked(not_solved_tasks, user, project)
         if next_task:
             queue_info += (' & ' if queue_info else '') + 'Sequence queue'
 
@@ -239,7 +275,7 @@ def get_task_from_qs_with_sampling(
 
     elif project.sampling == project.UNIFORM:
         logger.debug(f'User={user} tries random sampling from prepared tasks')
-        next_task = _get_random_unlocked(not_solved_tasks, user)
+        next_task = _get_random_unlocked(not_solved_tasks, user, project)
         if next_task:
             queue_info += (' & ' if queue_info else '') + 'Uniform random queue'
 
@@ -258,7 +294,16 @@ def get_next_task(user, prepared_tasks, project, dm_queue, assigned_flag=None):
             user, project, prepared_tasks, assigned_flag, queue_info
         )
 
-        if not dm_queue:
+        # tasks reserved for the user by previous calls, see reserve_tasks()
+        use_reservations = reservations_enabled() and not dm_queue and not assigned_flag
+        if use_reservations:
+            next_task = get_reserved_task(not_solved_tasks, user, project)
+            if next_task:
+                logger.debug(f'User={user} got reserved task {next_task}')
+                use_task_lock = False
+                queue_info += (' & ' if queue_info else '') + 'Reserved queue'
+
+        if not next_task and not dm_queue:
             next_task, use_task_lock, queue_info = get_next_task_without_dm_queue(
                 user, project, not_solved_tasks, assigned_flag
             )
@@ -292,6 +337,8 @@ def get_next_task(user, prepared_tasks, project, dm_queue, assigned_flag=None):
         if next_task and use_task_lock:
             # set lock for the task with TTL 3x time more then current average lead time (or 1 hour by default)
             next_task.set_lock(user)
+            if use_reservations:
+                reserve_tasks(next_task, not_solved_tasks, user, project)
 
         logger.log(
             get_next_task_logging_level(user),
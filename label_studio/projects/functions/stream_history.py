@@ -1,6 +1,6 @@
 from django.conf import settings
-from django.db import transaction
-from projects.models import LabelStreamHistory
+from django.db import IntegrityError, transaction
+from projects.models import LabelStreamHistoryItem
 from tasks.models import Annotation, Task
 
 TASK_ID_KEY = 'taskId'
@@ -8,53 +8,57 @@ ANNOTATION_ID_KEY = 'annotationId'
 
 
 def add_stream_history(next_task, user, project):
-    if next_task is not None:
+    if next_task is None:
+        return
+    history = LabelStreamHistoryItem.objects.filter(user=user, project=project)
+    if history.filter(task_id=next_task.id).exists():
+        # task taken again keeps its place in the history
+        return
+    try:
         with transaction.atomic():
-            history, created = LabelStreamHistory.objects.get_or_create(user=user, project=project)
-            new_history_data = {TASK_ID_KEY: next_task.id, ANNOTATION_ID_KEY: None}
-            if created:
-                history.data = [new_history_data]
-            else:
-                task_ids = set([h[TASK_ID_KEY] for h in history.data])
-                if next_task.id not in task_ids:
-                    history.data.append(new_history_data)
-                if len(task_ids) + 1 > settings.LABEL_STREAM_HISTORY_LIMIT:
-                    history.data = history.data[-settings.LABEL_STREAM_HISTORY_LIMIT :]
-            history.save()
+            LabelStreamHistoryItem.objects.create(user=user, project=project, task_id=next_task.id)
+    except IntegrityError:
+        # the same task is added by a concurrent /next call
+        return
+
+    # drop items which go beyond the limit, only the first one beyond it is fetched
+    first_dropped_id = (
+        history.order_by('-id').values_list('id', flat=True)[settings.LABEL_STREAM_HISTORY_LIMIT :].first()
+    )
+    if first_dropped_id is not None:
+        history.filter(id__lte=first_dropped_id).delete()
 
 
 def fill_history_annotation(user, task, annotation):
-    history = user.histories.filter(project=task.project).first()
-    if history and history.data:
-        for item in history.data:
-            if item[TASK_ID_KEY] == task.id:
-                item[ANNOTATION_ID_KEY] = annotation.id
-        history.save()
+    LabelStreamHistoryItem.objects.filter(user=user, project_id=task.project_id, task_id=task.id).update(
+        annotation_id=annotation.id
+    )
 
 
 def get_label_stream_history(user, project):
-    result = []
-
-    with transaction.atomic():
-        history = user.histories.filter(project=project).first()
-        if history is None:
-            return result
+    items = list(
+        LabelStreamHistoryItem.objects.filter(user=user, project=project)
+        .order_by('id')
+        .values('id', 'task_id', 'annotation_id')
+    )
+    if not items:
+        return []
 
-        data = history.data
+    task_ids = set(item['task_id'] for item in items)
+    annotation_ids = set(item['annotation_id'] for item in items if item['annotation_id'] is not None)
+    existing_task_ids = set(Task.objects.filter(pk__in=task_ids).values_list('id', flat=True))
+    existing_annotation_ids = set(Annotation.objects.filter(pk__in=annotation_ids).values_list('id', flat=True))
 
-        task_ids = set([h[TASK_ID_KEY] for h in history.data])
-        annotation_ids = set([h[ANNOTATION_ID_KEY] for h in history.data])
-        existing_task_ids = set(Task.objects.filter(pk__in=task_ids).values_list('id', flat=True))
-        existing_annotation_ids = set(Annotation.objects.filter(pk__in=annotation_ids).values_list('id', flat=True))
-
-        result = []
-        for item in data:
-            if item[TASK_ID_KEY] not in existing_task_ids:
-                continue
-            if item[ANNOTATION_ID_KEY] not in existing_annotation_ids:
-                item[ANNOTATION_ID_KEY] = None
-            result.append(item)
-        history.data = result
-        history.save(update_fields=['data'])
+    result = []
+    removed_ids = []
+    for item in items:
+        if item['task_id'] not in existing_task_ids:
+            removed_ids.append(item['id'])
+            continue
+        annotation_id = item['annotation_id'] if item['annotation_id'] in existing_annotation_ids else None
+        result.append({TASK_ID_KEY: item['task_id'], ANNOTATION_ID_KEY: annotation_id})
 
+    # items of removed tasks are cleaned up here, so they don't take places in the history
+    if removed_ids:
+        LabelStreamHistoryItem.objects.filter(id__in=removed_ids).delete()
     return result
@@ -0,0 +1,91 @@
+"""This file and its contents are licensed under the Apache License 2.0. Please see the included NOTICE for copyright information and LICENSE for a copy of the license.
+"""
+import datetime
+import logging
+
+from core.utils.common import db_is_not_sqlite
+from core.utils.db import fast_first
+from django.conf import settings
+from django.db.models import Case, When
+from django.utils.timezone import now
+from tasks.models import Task, TaskLock
+
+logger = logging.getLogger(__name__)
+
+
+def reservations_enabled():
+    return settings.NEXT_TASK_RESERVATION_SIZE > 1
+
+
+def _release_reservations(task_ids, user, keep_task_id=None):
+    """Release locks of reserved tasks, the lock of the task taken at work is kept"""
+    task_ids = [task_id for task_id in task_ids if task_id != keep_task_id]
+    if task_ids:
+        TaskLock.objects.filter(task_id__in=task_ids, user=user).delete()
+
+
+def get_reserved_task(not_solved_tasks, user, project):
+    """Take the first task of the user reservation which still can be labeled by the user.
+    The reservation is the live locks of the user in the project, so all workers see the same one,
+    locks are created in the order of reserved tasks. The reservation is kept until the task is labeled,
+    skipped or postponed, so the same task is returned for repeated /next calls.
+
+    :param not_solved_tasks: queryset of tasks which the user can label
+    :return: task or None if there are no reserved tasks, its lock is extended to TASK_LOCK_TTL
+    """
+    locks = TaskLock.objects.filter(user=user, task__project=project, expire_at__gt=now())
+    reserved = list(locks.order_by('id').values_list('task_id', 'expire_at'))
+    if not reserved:
+        return None
+
+    task_ids = [task_id for task_id, _ in reserved]
+    # reserved locks expire in NEXT_TASK_RESERVATION_TTL after the reservation, locks of tasks at work live longer
+    reservation_ttl = datetime.timedelta(seconds=settings.NEXT_TASK_RESERVATION_TTL)
+    reserved_expire_at = [expire_at for _, expire_at in reserved if expire_at <= now() + reservation_ttl]
+    if reserved_expire_at and project.updated_at > min(reserved_expire_at) - reservation_ttl:
+        logger.debug(f'User={user} reservation in project={project} is outdated by project settings')
+        _release_reservations(task_ids, user, keep_task_id=task_ids[0])
+        return None
+
+    # the order of reserved tasks is kept, solved tasks are skipped
+    preserved_order = Case(*[When(pk=pk, then=pos) for pos, pk in enumerate(task_ids)])
+    next_task = fast_first(not_solved_tasks.filter(pk__in=task_ids).order_by(preserved_order))
+    if next_task is None:
+        return None
+
+    TaskLock.objects.filter(task=next_task, user=user).update(
+        expire_at=now() + datetime.timedelta(seconds=settings.TASK_LOCK_TTL)
+    )
+    return next_task
+
+
+def reserve_tasks(next_task, not_solved_tasks, user, project):
+    """Lock the next NEXT_TASK_RESERVATION_SIZE - 1 tasks after next_task for the user in one pass,
+    so the following /next calls take them from the reservation instead of sampling again.
+    Reserved tasks are locked for NEXT_TASK_RESERVATION_TTL only, then they return to other annotators.
+
+    :param next_task: task which is given to the user right now, it's locked already
+    :param not_solved_tasks: queryset of tasks which the user can label
+    """
+    from projects.functions.next_task import sample_random_task_ids
+
+    candidates = Task.filter_unlocked(not_solved_tasks.exclude(pk=next_task.id), user, project)
+    limit = settings.NEXT_TASK_RESERVATION_SIZE - 1
+    if project.sampling == project.SEQUENCE:
+        candidate_ids = list(candidates.values_list('id', flat=True)[:limit])
+    else:
+        candidate_ids = sample_random_task_ids(candidates, limit)
+    if db_is_not_sqlite() and candidate_ids:
+        # skip tasks which are being locked by concurrent /next calls right now
+        locked_ids = set(
+            Task.objects.select_for_update(skip_locked=True).filter(pk__in=candidate_ids).values_list('id', flat=True)
+        )
+        candidate_ids = [task_id for task_id in candidate_ids if task_id in locked_ids]
+
+    expire_at = now() + datetime.timedelta(seconds=settings.NEXT_TASK_RESERVATION_TTL)
+    TaskLock.objects.filter(task_id__in=candidate_ids, user=user).delete()
+    # locks are created in the order of candidates, it's the order of the reservation
+    TaskLock.objects.bulk_create(
+        [TaskLock(task_id=task_id, user=user, expire_at=expire_at) for task_id in candidate_ids]
+    )
+    logger.debug(f'User={user} reserved tasks {candidate_ids} in project={project}')
@@ -0,0 +1,26 @@
+import logging
+
+from django.core.management.base import BaseCommand
+from projects.models import ProjectSummary, ProjectSummaryDelta
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = 'Fold pending counter changes (ProjectSummaryDelta) into project summaries'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--project', type=int, default=None, help='project id, all projects by default')
+
+    def handle(self, *args, **options):
+        project_ids = ProjectSummaryDelta.objects.values_list('project_id', flat=True).distinct()
+        if options['project']:
+            project_ids = project_ids.filter(project_id=options['project'])
+
+        processed = 0
+        for summary in ProjectSummary.objects.filter(project_id__in=list(project_ids)):
+            summary.compact()
+            processed += 1
+            logger.debug(f'{processed} project summaries compacted')
+
+        self.stdout.write(f'Summaries are compacted for {processed} projects')
@@ -0,0 +1,18 @@
+# Generated by Django 3.2.23 on 2026-10-18 06:36
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0026_auto_20231103_0020'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='project',
+            name='indexed_data_columns',
+            field=models.JSONField(blank=True, default=list, help_text='Task data columns with database indexes for Data Manager filters and ordering', null=True, verbose_name='indexed data columns'),
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 3.2.23 on 2026-10-18 08:40
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0027_project_indexed_data_columns'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProjectSummaryDelta',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('operation', models.CharField(help_text='ProjectSummary method which changed the counters', max_length=64, verbose_name='operation')),
+                ('data', models.JSONField(default=dict, help_text='Counters added or removed by the operation', verbose_name='data')),
+                ('created_at', models.DateTimeField(auto_now_add=True, help_text='Creation time', verbose_name='created at')),
+                ('project', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='summary_deltas', to='projects.project')),
+            ],
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 3.2.23 on 2026-10-18 09:05
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0028_projectsummarydelta'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProjectAnnotationsCounter',
+            fields=[
+                ('project', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='annotations_counter', serialize=False, to='projects.project')),
+                ('value', models.BigIntegerField(default=0, help_text='Number of created annotations', verbose_name='value')),
+            ],
+        ),
+    ]
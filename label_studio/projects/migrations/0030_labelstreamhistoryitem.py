@@ -0,0 +1,81 @@
+# Generated by Django 3.2.23 on 2026-10-18 11:20
+
+from itertools import groupby
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def forwards(apps, schema_editor):
+    LabelStreamHistory = apps.get_model('projects', 'LabelStreamHistory')
+    LabelStreamHistoryItem = apps.get_model('projects', 'LabelStreamHistoryItem')
+
+    items = []
+    for history in LabelStreamHistory.objects.all().iterator():
+        task_ids = set()
+        for item in history.data or []:
+            task_id = item.get('taskId')
+            if task_id is None or task_id in task_ids:
+                continue
+            task_ids.add(task_id)
+            items.append(
+                LabelStreamHistoryItem(
+                    user_id=history.user_id,
+                    project_id=history.project_id,
+                    task_id=task_id,
+                    annotation_id=item.get('annotationId'),
+                )
+            )
+        if len(items) >= 1000:
+            LabelStreamHistoryItem.objects.bulk_create(items)
+            items = []
+    LabelStreamHistoryItem.objects.bulk_create(items)
+
+
+def backwards(apps, schema_editor):
+    LabelStreamHistory = apps.get_model('projects', 'LabelStreamHistory')
+    LabelStreamHistoryItem = apps.get_model('projects', 'LabelStreamHistoryItem')
+
+    items = (
+        LabelStreamHistoryItem.objects.order_by('user_id', 'project_id', 'id')
+        .values_list('user_id', 'project_id', 'task_id', 'annotation_id')
+        .iterator()
+    )
+    histories = []
+    for (user_id, project_id), group in groupby(items, key=lambda item: item[:2]):
+        data = [{'taskId': task_id, 'annotationId': annotation_id} for _, _, task_id, annotation_id in group]
+        histories.append(LabelStreamHistory(user_id=user_id, project_id=project_id, data=data))
+        if len(histories) >= 1000:
+            LabelStreamHistory.objects.bulk_create(histories)
+            histories = []
+    LabelStreamHistory.objects.bulk_create(histories)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('projects', '0029_projectannotationscounter'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LabelStreamHistoryItem',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('task_id', models.IntegerField(help_text='Task ID')),
+                ('annotation_id', models.IntegerField(default=None, help_text='Annotation ID', null=True)),
+                ('project', models.ForeignKey(help_text='Project ID', on_delete=django.db.models.deletion.CASCADE, related_name='history_items', to='projects.project')),
+                ('user', models.ForeignKey(help_text='User ID', on_delete=django.db.models.deletion.CASCADE, related_name='history_items', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='labelstreamhistoryitem',
+            constraint=models.UniqueConstraint(fields=('user', 'project', 'task_id'), name='unique_history_item'),
+        ),
+        migrations.RunPython(forwards, backwards),
+        migrations.DeleteModel(
+            name='LabelStreamHistory',
+        ),
+    ]
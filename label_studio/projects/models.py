@@ -2,6 +2,7 @@
 """
 import json
 import logging
+from collections import Counter
 from typing import Any, Mapping, Optional
 
 from annoying.fields import AutoOneToOneField
@@ -20,6 +21,7 @@ from core.label_config import (
     get_sample_task,
     validate_label_config,
 )
+from core.redis import start_job_async_or_sync
 from core.utils.common import (
     create_hash,
     get_attr_or_item,
@@ -27,10 +29,14 @@ from core.utils.common import (
     merge_labels_counters,
 )
 from core.utils.exceptions import LabelStudioValidationErrorSentryIgnored
+from data_manager.indexes import sync_data_column_indexes
+from data_manager.result_cache import bump_data_version
 from django.conf import settings
 from django.core.validators import MaxLengthValidator, MinLengthValidator
 from django.db import models, transaction
-from django.db.models import Avg, BooleanField, Case, Count, JSONField, Q, Sum, Value, When
+from django.db.models import Avg, BooleanField, Case, Count, F, JSONField, Q, Sum, Value, When
+from django.db.models.signals import post_delete
+from django.dispatch import receiver
 from django.utils.translation import gettext_lazy as _
 from label_studio_tools.core.label_config import parse_config
 from labels_manager.models import Label
@@ -229,6 +235,13 @@ class Project(ProjectMixin, models.Model):
         _('model version'), blank=True, null=True, default='', help_text='Machine learning model version'
     )
     data_types = JSONField(_('data_types'), default=dict, null=True)
+    indexed_data_columns = JSONField(
+        _('indexed data columns'),
+        default=list,
+        null=True,
+        blank=True,
+        help_text='Task data columns with database indexes for Data Manager filters and ordering',
+    )
 
     is_draft = models.BooleanField(
         _('is draft'), default=False, help_text='Whether or not the project is in the middle of being created'
@@ -272,6 +285,7 @@ class Project(ProjectMixin, models.Model):
         self.__maximum_annotations = self.maximum_annotations
         self.__overlap_cohort_percentage = self.overlap_cohort_percentage
         self.__skip_queue = self.skip_queue
+        self.__indexed_data_columns = self.indexed_data_columns
 
         # TODO: once bugfix with incorrect data types in List
         # logging.warning('! Please, remove code below after patching of all projects (extract_data_types)')
@@ -339,7 +353,7 @@ class Project(ProjectMixin, models.Model):
     def only_undefined_field(self):
         return (
             self.one_object_in_label_config
-            and self.summary.common_data_columns
+            and self.summary.compacted().common_data_columns
             and self.summary.common_data_columns[0] == settings.DATA_UNDEFINED_NAME
         )
 
@@ -438,6 +452,9 @@ class Project(ProjectMixin, models.Model):
         elif tasks_number_changed and self.overlap_cohort_percentage < 100 and self.maximum_annotations > 1:
             self._rearrange_overlap_cohort()
 
+        # tasks were updated in bulk, so drop cached Data Manager results
+        bump_data_version(self.id)
+
     def _rearrange_overlap_cohort(self):
         """
         Rearrange overlap depending on annotation count in tasks
@@ -557,7 +574,9 @@ class Project(ProjectMixin, models.Model):
         if not annotations_from_config:
             logger.debug('Annotation schema is not found in config')
             return
-        annotations_from_data = set(self.summary.created_annotations)
+        # labels in use are read from the summary with pending counter changes
+        summary = self.summary.compacted()
+        annotations_from_data = set(summary.created_annotations)
         if annotations_from_data and not annotations_from_data.issubset(annotations_from_config):
             different_annotations = list(annotations_from_data.difference(annotations_from_config))
             diff_str = []
@@ -571,7 +590,7 @@ class Project(ProjectMixin, models.Model):
                     or t not in get_all_types(config_string)
                 ):
                     diff_str.append(
-                        f'{self.summary.created_annotations[ann_tuple]} '
+                        f'{summary.created_annotations[ann_tuple]} '
                         f'with from_name={from_name}, to_name={to_name}, type={t}'
                     )
             if len(diff_str) > 0:
@@ -582,7 +601,7 @@ class Project(ProjectMixin, models.Model):
 
         # validate labels consistency
         labels_from_config, dynamic_label_from_config = get_all_labels(config_string)
-        created_labels = merge_labels_counters(self.summary.created_labels, self.summary.created_labels_drafts)
+        created_labels = merge_labels_counters(summary.created_labels, summary.created_labels_drafts)
 
         def display_count(count: int, type: str) -> Optional[str]:
             """Helper for displaying pluralized sources of validation errors,
@@ -624,8 +643,8 @@ class Project(ProjectMixin, models.Model):
                 different_labels = list(set(labels_from_data).difference(labels_from_config_by_tag))
                 diff_str = ''
                 for label in different_labels:
-                    annotation_label_count = self.summary.created_labels.get(control_tag_from_data, {}).get(label, 0)
-                    draft_label_count = self.summary.created_labels_drafts.get(control_tag_from_data, {}).get(label, 0)
+                    annotation_label_count = summary.created_labels.get(control_tag_from_data, {}).get(label, 0)
+                    draft_label_count = summary.created_labels_drafts.get(control_tag_from_data, {}).get(label, 0)
                     annotation_display_count = display_count(annotation_label_count, 'annotation')
                     draft_display_count = display_count(draft_label_count, 'draft')
 
@@ -725,6 +744,10 @@ class Project(ProjectMixin, models.Model):
             self.__maximum_annotations = self.maximum_annotations
             self.__overlap_cohort_percentage = self.overlap_cohort_percentage
 
+        if self.__indexed_data_columns != self.indexed_data_columns:
+            start_job_async_or_sync(sync_data_column_indexes, self.id, self.indexed_data_columns or [])
+            self.__indexed_data_columns = self.indexed_data_columns
+
         if self.__skip_queue != self.skip_queue:
             bulk_update_stats_project_tasks(
                 self.tasks.filter(Q(annotations__isnull=False) & Q(annotations__ground_truth=False))
@@ -921,7 +944,7 @@ class Project(ProjectMixin, models.Model):
 
         if storage:
             return {
-                'url': storage.generate_http_url(url),
+                'url': storage.get_http_url(url),
                 'presign_ttl': storage.presign_ttl,
             }
 
@@ -945,6 +968,7 @@ class Project(ProjectMixin, models.Model):
                 num_tasks_updated += update_tasks_counters(queryset, from_scratch)
                 bulk_update_stats_project_tasks(queryset, self)
             page_idx += 1
+        bump_data_version(self.id)
         return num_tasks_updated
 
     def _update_tasks_counters_and_task_states(
@@ -983,6 +1007,12 @@ class Project(ProjectMixin, models.Model):
         ]
 
 
+@receiver(post_delete, sender=Project)
+def drop_data_column_indexes(sender, instance, **kwargs):
+    if instance.indexed_data_columns:
+        sync_data_column_indexes(instance.id, [])
+
+
 class ProjectOnboardingSteps(models.Model):
     """ """
 
@@ -1029,16 +1059,21 @@ class ProjectOnboarding(models.Model):
             self.project.save(recalc=False)
 
 
-class LabelStreamHistory(models.Model):
+class LabelStreamHistoryItem(models.Model):
+    """Task taken by the user from the label stream, the order of items is the order of ids"""
 
     user = models.ForeignKey(
-        settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='histories', help_text='User ID'
+        settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='history_items', help_text='User ID'
+    )
+    project = models.ForeignKey(
+        Project, on_delete=models.CASCADE, related_name='history_items', help_text='Project ID'
     )
-    project = models.ForeignKey(Project, on_delete=models.CASCADE, related_name='histories', help_text='Project ID')
-    data = models.JSONField(default=list)
+    # plain ids, so removing tasks and annotations doesn't touch the history, missing ones are skipped on read
+    task_id = models.IntegerField(help_text='Task ID')
+    annotation_id = models.IntegerField(null=True, default=None, help_text='Annotation ID')
 
     class Meta:
-        constraints = [models.UniqueConstraint(fields=['user', 'project'], name='unique_history')]
+        constraints = [models.UniqueConstraint(fields=['user', 'project', 'task_id'], name='unique_history_item')]
 
 
 class ProjectMember(models.Model):
@@ -1078,11 +1113,23 @@ class ProjectSummary(models.Model):
         _('created labels in drafts'), null=True, default=dict, help_text='Unique drafts labels'
     )
 
+    # methods changing counters and the fields they change, see _change_counters()
+    DELTA_OPERATIONS = {
+        'update_data_columns': ['all_data_columns', 'common_data_columns'],
+        'remove_data_columns': ['all_data_columns', 'common_data_columns'],
+        'update_created_annotations_and_labels': ['created_annotations', 'created_labels'],
+        'remove_created_annotations_and_labels': ['created_annotations', 'created_labels'],
+        'update_created_labels_drafts': ['created_labels_drafts'],
+        'remove_created_drafts_and_labels': ['created_labels_drafts'],
+    }
+
     def has_permission(self, user):
         user.project = self.project  # link for activity log
         return self.project.has_permission(user)
 
     def reset(self, tasks_data_based=True):
+        # pending deltas are folded first, otherwise they would be applied to the reset counters
+        self.compact()
         if tasks_data_based:
             self.all_data_columns = {}
             self.common_data_columns = []
@@ -1091,21 +1138,77 @@ class ProjectSummary(models.Model):
         self.created_labels_drafts = {}
         self.save()
 
-    def update_data_columns(self, tasks):
+    def compacted(self):
+        """Summary with pending ProjectSummaryDelta changes folded in, counters are read through it"""
+        self.compact()
+        return self
+
+    def _change_counters(self, operation, data):
+        """Apply the change of counters made by operation to the locked summary row right away or,
+        with PROJECT_SUMMARY_DELTAS, append it to ProjectSummaryDelta without locking of the summary row
+
+        :param operation: key of DELTA_OPERATIONS
+        :param data: counters to add or remove, it's passed to _apply_<operation>()
+        """
+        if settings.PROJECT_SUMMARY_DELTAS:
+            ProjectSummaryDelta.objects.create(project_id=self.project_id, operation=operation, data=data)
+            return
+
+        # the change is applied to the locked row, other summary instances in memory can be outdated
+        fields = self.DELTA_OPERATIONS[operation]
+        with transaction.atomic():
+            summary = ProjectSummary.objects.select_for_update().get(pk=self.pk)
+            getattr(summary, f'_apply_{operation}')(data)
+            summary.save(update_fields=fields)
+
+        for field in fields:
+            setattr(self, field, getattr(summary, field))
+
+    def compact(self):
+        """Fold pending ProjectSummaryDelta changes into the summary, it's called before the summary is read"""
+        deltas = ProjectSummaryDelta.objects.filter(project_id=self.project_id).order_by('id')
+        if not deltas.exists():
+            return
+
+        fields = sorted({field for fields in self.DELTA_OPERATIONS.values() for field in fields})
+        with transaction.atomic():
+            summary = ProjectSummary.objects.select_for_update().get(pk=self.pk)
+            while batch := list(deltas[: settings.BATCH_SIZE]):
+                for delta in batch:
+                    getattr(summary, f'_apply_{delta.operation}')(delta.data)
+                ProjectSummaryDelta.objects.filter(id__in=[delta.id for delta in batch]).delete()
+            summary.save(update_fields=fields)
+
+        for field in fields:
+            setattr(self, field, getattr(summary, field))
+        logger.debug(f'summary of project {self.project_id} is compacted')
+
+    @staticmethod
+    def _count_data_columns(tasks):
+        columns = Counter()
         common_data_columns = set()
-        all_data_columns = dict(self.all_data_columns)
         for task in tasks:
             try:
                 task_data = get_attr_or_item(task, 'data')
             except KeyError:
                 task_data = task
             task_data_keys = task_data.keys()
-            for column in task_data_keys:
-                all_data_columns[column] = all_data_columns.get(column, 0) + 1
+            columns.update(task_data_keys)
             if not common_data_columns:
                 common_data_columns = set(task_data_keys)
             else:
                 common_data_columns &= set(task_data_keys)
+        return dict(columns), sorted(common_data_columns)
+
+    def update_data_columns(self, tasks):
+        columns, common_data_columns = self._count_data_columns(tasks)
+        self._change_counters('update_data_columns', {'columns': columns, 'common': common_data_columns})
+
+    def _apply_update_data_columns(self, data):
+        all_data_columns = dict(self.all_data_columns)
+        for column, count in data['columns'].items():
+            all_data_columns[column] = all_data_columns.get(column, 0) + count
+        common_data_columns = set(data['common'])
 
         self.all_data_columns = all_data_columns
         if not self.common_data_columns:
@@ -1114,20 +1217,23 @@ class ProjectSummary(models.Model):
             self.common_data_columns = list(sorted(set(self.common_data_columns) & common_data_columns))
         logger.debug(f'summary.all_data_columns = {self.all_data_columns}')
         logger.debug(f'summary.common_data_columns = {self.common_data_columns}')
-        self.save(update_fields=['all_data_columns', 'common_data_columns'])
 
     def remove_data_columns(self, tasks):
+        columns = Counter()
+        for task in tasks:
+            columns.update(get_attr_or_item(task, 'data').keys())
+        self._change_counters('remove_data_columns', {'columns': dict(columns)})
+
+    def _apply_remove_data_columns(self, data):
         all_data_columns = dict(self.all_data_columns)
         keys_to_remove = []
 
-        for task in tasks:
-            task_data = get_attr_or_item(task, 'data')
-            for key in task_data.keys():
-                if key in all_data_columns:
-                    all_data_columns[key] -= 1
-                    if all_data_columns[key] == 0:
-                        keys_to_remove.append(key)
-                        all_data_columns.pop(key)
+        for key, count in data['columns'].items():
+            if key in all_data_columns:
+                all_data_columns[key] -= count
+                if all_data_columns[key] <= 0:
+                    keys_to_remove.append(key)
+                    all_data_columns.pop(key)
         self.all_data_columns = all_data_columns
 
         if keys_to_remove:
@@ -1138,12 +1244,6 @@ class ProjectSummary(models.Model):
             self.common_data_columns = common_data_columns
         logger.debug(f'summary.all_data_columns = {self.all_data_columns}')
         logger.debug(f'summary.common_data_columns = {self.common_data_columns}')
-        self.save(
-            update_fields=[
-                'all_data_columns',
-                'common_data_columns',
-            ]
-        )
 
     def _get_annotation_key(self, result):
         result_type = result.get('type', None)
@@ -1178,9 +1278,33 @@ class ProjectSummary(models.Model):
                 labels.append(str(label))
         return labels
 
-    def update_created_annotations_and_labels(self, annotations):
-        created_annotations = dict(self.created_annotations)
-        labels = dict(self.created_labels)
+    @staticmethod
+    def _add_labels(labels, delta):
+        labels = {from_name: dict(counts) for from_name, counts in labels.items()}
+        for from_name, counts in delta.items():
+            from_name_labels = labels.setdefault(from_name, {})
+            for label, count in counts.items():
+                from_name_labels[label] = from_name_labels.get(label, 0) + count
+        return labels
+
+    @staticmethod
+    def _remove_labels(labels, delta):
+        labels = {from_name: dict(counts) for from_name, counts in labels.items()}
+        for from_name, counts in delta.items():
+            if from_name not in labels:
+                continue
+            for label, count in counts.items():
+                if label in labels[from_name]:
+                    labels[from_name][label] -= count
+                    if labels[from_name][label] <= 0:
+                        labels[from_name].pop(label)
+            if not labels[from_name]:
+                labels.pop(from_name)
+        return labels
+
+    def _count_annotations_and_labels(self, annotations):
+        created_annotations = Counter()
+        labels = {}
         for annotation in annotations:
             results = get_attr_or_item(annotation, 'result') or []
             if not isinstance(results, list):
@@ -1191,58 +1315,44 @@ class ProjectSummary(models.Model):
                 key = self._get_annotation_key(result)
                 if not key:
                     continue
-                created_annotations[key] = created_annotations.get(key, 0) + 1
-                from_name = result['from_name']
+                created_annotations[key] += 1
 
                 # aggregate labels
-                if from_name not in self.created_labels:
-                    labels[from_name] = dict()
+                labels.setdefault(result['from_name'], Counter()).update(self._get_labels(result))
+        return {'annotations': dict(created_annotations), 'labels': {k: dict(v) for k, v in labels.items()}}
+
+    def update_created_annotations_and_labels(self, annotations):
+        self._change_counters('update_created_annotations_and_labels', self._count_annotations_and_labels(annotations))
 
-                for label in self._get_labels(result):
-                    labels[from_name][label] = labels[from_name].get(label, 0) + 1
+    def _apply_update_created_annotations_and_labels(self, data):
+        created_annotations = dict(self.created_annotations)
+        for key, count in data['annotations'].items():
+            created_annotations[key] = created_annotations.get(key, 0) + count
 
         logger.debug(f'summary.created_annotations = {created_annotations}')
-        logger.debug(f'summary.created_labels = {labels}')
         self.created_annotations = created_annotations
-        self.created_labels = labels
-        self.save(update_fields=['created_annotations', 'created_labels'])
+        self.created_labels = self._add_labels(self.created_labels, data['labels'])
+        logger.debug(f'summary.created_labels = {self.created_labels}')
 
     def remove_created_annotations_and_labels(self, annotations):
+        self._change_counters('remove_created_annotations_and_labels', self._count_annotations_and_labels(annotations))
+
+    def _apply_remove_created_annotations_and_labels(self, data):
         created_annotations = dict(self.created_annotations)
-        labels = dict(self.created_labels)
-        for annotation in annotations:
-            results = get_attr_or_item(annotation, 'result') or []
-            if not isinstance(results, list):
-                continue
+        for key, count in data['annotations'].items():
+            # reduce annotation counters
+            if key in created_annotations:
+                created_annotations[key] -= count
+                if created_annotations[key] <= 0:
+                    created_annotations.pop(key)
 
-            for result in results:
-                # reduce annotation counters
-                key = self._get_annotation_key(result)
-                if key in created_annotations:
-                    created_annotations[key] -= 1
-                    if created_annotations[key] == 0:
-                        created_annotations.pop(key)
-
-                # reduce labels counters
-                from_name = result.get('from_name', None)
-                if from_name not in labels:
-                    continue
-                for label in self._get_labels(result):
-                    label = str(label)
-                    if label in labels[from_name]:
-                        labels[from_name][label] -= 1
-                        if labels[from_name][label] == 0:
-                            labels[from_name].pop(label)
-                if not labels[from_name]:
-                    labels.pop(from_name)
         logger.debug(f'summary.created_annotations = {created_annotations}')
-        logger.debug(f'summary.created_labels = {labels}')
         self.created_annotations = created_annotations
-        self.created_labels = labels
-        self.save(update_fields=['created_annotations', 'created_labels'])
+        self.created_labels = self._remove_labels(self.created_labels, data['labels'])
+        logger.debug(f'summary.created_labels = {self.created_labels}')
 
-    def update_created_labels_drafts(self, drafts):
-        labels = dict(self.created_labels_drafts)
+    def _count_drafts_labels(self, drafts):
+        labels = {}
         for draft in drafts:
             results = get_attr_or_item(draft, 'result') or []
             if not isinstance(results, list):
@@ -1251,42 +1361,63 @@ class ProjectSummary(models.Model):
             for result in results:
                 if 'from_name' not in result:
                     continue
-                from_name = result['from_name']
+                labels.setdefault(result['from_name'], Counter()).update(self._get_labels(result))
+        return {'labels': {k: dict(v) for k, v in labels.items()}}
 
-                # aggregate labels
-                if from_name not in self.created_labels_drafts:
-                    labels[from_name] = dict()
-
-                for label in self._get_labels(result):
-                    labels[from_name][label] = labels[from_name].get(label, 0) + 1
+    def update_created_labels_drafts(self, drafts):
+        self._change_counters('update_created_labels_drafts', self._count_drafts_labels(drafts))
 
-        logger.debug(f'update summary.created_labels_drafts = {labels}')
-        self.created_labels_drafts = labels
-        self.save(update_fields=['created_labels_drafts'])
+    def _apply_update_created_labels_drafts(self, data):
+        self.created_labels_drafts = self._add_labels(self.created_labels_drafts, data['labels'])
+        logger.debug(f'update summary.created_labels_drafts = {self.created_labels_drafts}')
 
     def remove_created_drafts_and_labels(self, drafts):
-        labels = dict(self.created_labels_drafts)
-        for draft in drafts:
-            results = get_attr_or_item(draft, 'result') or []
-            if not isinstance(results, list):
-                continue
+        self._change_counters('remove_created_drafts_and_labels', self._count_drafts_labels(drafts))
 
-            for result in results:
-                # reduce labels counters
-                from_name = result.get('from_name', None)
-                if from_name not in labels:
-                    continue
-                for label in self._get_labels(result):
-                    label = str(label)
-                    if label in labels[from_name]:
-                        labels[from_name][label] -= 1
-                        if labels[from_name][label] == 0:
-                            labels[from_name].pop(label)
-                if not labels[from_name]:
-                    labels.pop(from_name)
-        logger.debug(f'summary.created_labels_drafts = {labels}')
-        self.created_labels_drafts = labels
-        self.save(update_fields=['created_labels_drafts'])
+    def _apply_remove_created_drafts_and_labels(self, data):
+        self.created_labels_drafts = self._remove_labels(self.created_labels_drafts, data['labels'])
+        logger.debug(f'summary.created_labels_drafts = {self.created_labels_drafts}')
+
+
+class ProjectSummaryDelta(models.Model):
+    """Change of ProjectSummary counters: concurrent saves append deltas instead of rewriting
+    the summary row, deltas are folded into the summary by ProjectSummary.compact()
+    """
+
+    project = models.ForeignKey(Project, on_delete=models.CASCADE, related_name='summary_deltas')
+    operation = models.CharField(
+        _('operation'), max_length=64, help_text='ProjectSummary method which changed the counters'
+    )
+    data = JSONField(_('data'), default=dict, help_text='Counters added or removed by the operation')
+    created_at = models.DateTimeField(_('created at'), auto_now_add=True, help_text='Creation time')
+
+
+class ProjectAnnotationsCounter(models.Model):
+    """Number of annotations created in the project, it's only incremented by UPDATE queries,
+    so concurrent saves never lose increments and get distinct values
+    """
+
+    project = models.OneToOneField(
+        Project, primary_key=True, on_delete=models.CASCADE, related_name='annotations_counter'
+    )
+    value = models.BigIntegerField(_('value'), default=0, help_text='Number of created annotations')
+
+    @classmethod
+    def increment(cls, project_id, delta=1):
+        """Increment the counter and return its new value
+
+        :param project_id: project id, the counter starts from the current number of project annotations
+        :param delta: number of created annotations, e.g. bulk created ones
+        """
+        with transaction.atomic():
+            if not cls.objects.filter(project_id=project_id).update(value=F('value') + delta):
+                # the new annotations are counted already
+                count = Annotation.objects.filter(project_id=project_id).count()
+                counter, created = cls.objects.get_or_create(project_id=project_id, defaults={'value': count})
+                if created:
+                    return counter.value
+                cls.objects.filter(project_id=project_id).update(value=F('value') + delta)
+            return cls.objects.filter(project_id=project_id).values_list('value', flat=True).get()
 
 
 class ProjectImport(models.Model):
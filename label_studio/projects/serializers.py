@@ -2,6 +2,8 @@
 """
 import bleach
 from constants import SAFE_HTML_ATTRIBUTES, SAFE_HTML_TAGS
+from data_manager.indexes import INDEXED_DATA_COLUMN_RE
+from django.conf import settings
 from django.db.models import Q
 from projects.models import Project, ProjectImport, ProjectOnboarding, ProjectReimport, ProjectSummary
 from rest_flex_fields import FlexFieldsModelSerializer
@@ -152,6 +154,7 @@ class ProjectSerializer(FlexFieldsModelSerializer):
             'skip_queue',
             'reveal_preannotations_interactively',
             'pinned_at',
+            'indexed_data_columns',
             'finished_task_number',
             'queue_total',
             'queue_done',
@@ -166,6 +169,20 @@ class ProjectSerializer(FlexFieldsModelSerializer):
             self.instance.validate_config(value)
         return value
 
+    def validate_indexed_data_columns(self, value):
+        if value is None:
+            return []
+        if not isinstance(value, list) or not all(isinstance(column, str) for column in value):
+            raise serializers.ValidationError('Indexed data columns must be a list of strings')
+        if len(value) > settings.DATA_MANAGER_MAX_INDEXED_COLUMNS:
+            raise serializers.ValidationError(
+                f'Too many indexed data columns, maximum is {settings.DATA_MANAGER_MAX_INDEXED_COLUMNS}'
+            )
+        for column in value:
+            if not INDEXED_DATA_COLUMN_RE.match(column):
+                raise serializers.ValidationError(f'Data column "{column}" can\'t be indexed: unsupported characters')
+        return list(dict.fromkeys(value))
+
     def get_queue_total(self, project):
         remain = project.tasks.filter(
             Q(is_labeled=False) & ~Q(annotations__completed_by_id=self.user_id)
@@ -14,11 +14,9 @@ from data_manager.models import PrepareParams
 from data_manager.serializers import DataManagerTaskSerializer
 from django.db import transaction
 from django.db.models import Q
-from django.utils import timezone
 from django.utils.decorators import method_decorator
 from django_filters.rest_framework import DjangoFilterBackend
 from drf_yasg.utils import swagger_auto_schema
-from projects.functions.stream_history import fill_history_annotation
 from projects.models import Project
 from rest_framework import generics, viewsets, status
 from rest_framework.exceptions import PermissionDenied
@@ -32,6 +30,7 @@ from tasks.serializers import (
     TaskSerializer,
     TaskSimpleSerializer,
 )
+from tasks.side_effects import get_prediction_snapshot, schedule_annotation_side_effects, side_effects_deferred
 from webhooks.models import WebhookAction
 from webhooks.utils import (
     api_webhook,
@@ -395,17 +394,6 @@ class AnnotationsListAPI(GetParentObjectMixin, generics.ListCreateAPIView):
         task = generics.get_object_or_404(Task.objects.for_user(self.request.user), pk=self.kwargs.get('pk', 0))
         return Annotation.objects.filter(Q(task=task) & Q(was_cancelled=False)).order_by('pk')
 
-    def delete_draft(self, draft_id, annotation_id):
-        try:
-            draft = AnnotationDraft.objects.get(id=draft_id)
-            # We call delete on the individual draft object because
-            # AnnotationDraft#delete has special behavior (updating created_labels_drafts).
-            # This special behavior won't be triggered if we call delete on the queryset.
-            # Only for drafts with empty annotation_id, other ones deleted by signal
-            draft.delete()
-        except AnnotationDraft.DoesNotExist:
-            pass
-
     def perform_create(self, ser):
         task = self.get_parent_object()
         # annotator has write access only to annotations and it can't be checked it after serializer.save()
@@ -416,17 +404,12 @@ class AnnotationsListAPI(GetParentObjectMixin, generics.ListCreateAPIView):
         extra_args = {'task_id': self.kwargs['pk'], 'project_id': task.project_id}
 
         # save stats about how well annotator annotations coincide with current prediction
-        # only for finished task annotations
+        # only for finished task annotations, the snapshot is taken in background with deferred side effects
+        deferred = side_effects_deferred()
         if result is not None:
-            prediction = Prediction.objects.filter(task=task, model_version=task.project.model_version)
-            if prediction.exists():
-                prediction = prediction.first()
-                prediction_ser = PredictionSerializer(prediction).data
-            else:
-                logger.debug(f'User={self.request.user}: there are no predictions for task={task}')
-                prediction_ser = {}
-            # serialize annotation
-            extra_args.update({'prediction': prediction_ser, 'updated_by': user})
+            extra_args['updated_by'] = user
+            if not deferred:
+                extra_args['prediction'] = get_prediction_snapshot(task)
 
         if 'was_cancelled' in self.request.GET:
             extra_args['was_cancelled'] = bool_from_request(self.request.GET, 'was_cancelled', False)
@@ -451,23 +434,18 @@ class AnnotationsListAPI(GetParentObjectMixin, generics.ListCreateAPIView):
         logger.debug(f'User={self.request.user}: save annotation')
         annotation = ser.save(**extra_args)
 
-        logger.debug(f'Save activity for user={self.request.user}')
-        self.request.user.activity_at = timezone.now()
-        self.request.user.save()
-
         # Release task if it has been taken at work (it should be taken by the same user, or it makes sentry error
         logger.debug(f'User={user} releases task={task}')
         task.release_lock(user)
 
-        # if annotation created from draft - remove this draft
-        if draft_id is not None:
-            logger.debug(f'Remove draft {draft_id} after creating annotation {annotation.id}')
-            self.delete_draft(draft_id, annotation.id)
-
+        # the response must not show other ground truth annotations of the task
         if self.request.data.get('ground_truth'):
-            annotation.task.ensure_unique_groundtruth(annotation_id=annotation.id)
+            task.ensure_unique_groundtruth(annotation_id=annotation.id)
 
-        fill_history_annotation(user, task, annotation)
+        # user activity, draft removal, stream history, etc
+        schedule_annotation_side_effects(
+            annotation, user, draft_id=draft_id, prediction=deferred and result is not None, deferred=deferred
+        )
 
         return annotation
 
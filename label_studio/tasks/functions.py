@@ -6,7 +6,7 @@ import sys
 from core.bulk_update_utils import bulk_update
 from core.models import AsyncMigrationStatus
 from core.redis import start_job_async_or_sync
-from core.utils.common import batch
+from core.utils.common import batch_ids
 from data_export.mixins import ExportMixin
 from data_export.models import DataExport
 from data_export.serializers import ExportDataSerializer
@@ -16,7 +16,7 @@ from django.db import transaction
 from django.db.models import Count, Q
 from organizations.models import Organization
 from projects.models import Project
-from tasks.models import Annotation, Prediction, Task
+from tasks.models import Annotation, Prediction, Task, TaskAggregate
 
 logger = logging.getLogger(__name__)
 
@@ -102,9 +102,7 @@ def export_project(project_id, export_format, path, serializer_context=None):
     supported_formats = [s['name'] for s in DataExport.get_export_formats(project)]
     assert export_format in supported_formats, f'Export format is not supported, please use {supported_formats}'
 
-    task_ids = (
-        Task.objects.filter(project=project).select_related('project').prefetch_related('annotations', 'predictions')
-    )
+    task_ids = Task.objects.filter(project=project)
 
     logger.debug(f'Start exporting project <{project.title}> ({project.id}) with task count {task_ids.count()}.')
 
@@ -113,10 +111,17 @@ def export_project(project_id, export_format, path, serializer_context=None):
         serializer_context = json.loads(serializer_context)
     serializer_options = ExportMixin._get_export_serializer_option(serializer_context)
 
-    # export cycle
-    tasks = []
-    for _task_ids in batch(task_ids, 1000):
-        tasks += ExportDataSerializer(_task_ids, many=True, **serializer_options).data
+    # export cycle: tasks are serialized lazily batch by batch while the export file is being written
+    def export_data():
+        for _task_ids in batch_ids(task_ids, 1000):
+            tasks = (
+                Task.objects.filter(id__in=_task_ids)
+                .select_related('project')
+                .prefetch_related('annotations', 'predictions')
+            )
+            yield from ExportDataSerializer(tasks, many=True, **serializer_options).data
+
+    tasks = export_data()
 
     # convert to output format
     export_stream, _, filename = DataExport.generate_export_file(
@@ -179,8 +184,6 @@ def update_tasks_counters(queryset, from_scratch=True):
     :param from_scratch: Skip calculated tasks
     :return: Count of updated tasks
     """
-    objs = []
-
     total_annotations = Count('annotations', distinct=True, filter=Q(annotations__was_cancelled=False))
     cancelled_annotations = Count('annotations', distinct=True, filter=Q(annotations__was_cancelled=True))
     total_predictions = Count('predictions', distinct=True)
@@ -196,28 +199,39 @@ def update_tasks_counters(queryset, from_scratch=True):
             Q(total_annotations__gt=0) | Q(cancelled_annotations__gt=0) | Q(total_predictions__gt=0)
         )
 
-    # filter our tasks with 0 annotations and 0 predictions and update them with 0
-    queryset.filter(annotations__isnull=True, predictions__isnull=True).update(
-        total_annotations=0, cancelled_annotations=0, total_predictions=0
-    )
+    # walk over tasks with keyset pagination, so aggregations are calculated for one batch at once
+    updated = 0
+    for ids in batch_ids(queryset, settings.BATCH_SIZE):
+        batch_queryset = Task.objects.filter(id__in=ids)
 
-    # filter our tasks with 0 annotations and 0 predictions
-    queryset = queryset.filter(Q(annotations__isnull=False) | Q(predictions__isnull=False))
-    queryset = queryset.annotate(
-        new_total_annotations=total_annotations,
-        new_cancelled_annotations=cancelled_annotations,
-        new_total_predictions=total_predictions,
-    )
+        # filter our tasks with 0 annotations and 0 predictions and update them with 0
+        batch_queryset.filter(annotations__isnull=True, predictions__isnull=True).update(
+            total_annotations=0, cancelled_annotations=0, total_predictions=0
+        )
 
-    for task in queryset.only('id', 'total_annotations', 'cancelled_annotations', 'total_predictions'):
-        task.total_annotations = task.new_total_annotations
-        task.cancelled_annotations = task.new_cancelled_annotations
-        task.total_predictions = task.new_total_predictions
-        objs.append(task)
-    with transaction.atomic():
-        bulk_update(
-            objs,
-            update_fields=['total_annotations', 'cancelled_annotations', 'total_predictions'],
-            batch_size=settings.BATCH_SIZE,
+        # filter our tasks with 0 annotations and 0 predictions
+        batch_queryset = batch_queryset.filter(Q(annotations__isnull=False) | Q(predictions__isnull=False))
+        batch_queryset = batch_queryset.annotate(
+            new_total_annotations=total_annotations,
+            new_cancelled_annotations=cancelled_annotations,
+            new_total_predictions=total_predictions,
         )
-    return len(objs)
+
+        objs = []
+        for task in batch_queryset.only('id', 'total_annotations', 'cancelled_annotations', 'total_predictions'):
+            task.total_annotations = task.new_total_annotations
+            task.cancelled_annotations = task.new_cancelled_annotations
+            task.total_predictions = task.new_total_predictions
+            objs.append(task)
+        with transaction.atomic():
+            bulk_update(
+                objs,
+                update_fields=['total_annotations', 'cancelled_annotations', 'total_predictions'],
+                batch_size=settings.BATCH_SIZE,
+            )
+        updated += len(objs)
+
+        # counters are reconciled after bulk operations, materialized aggregates go along with them
+        if settings.DATA_MANAGER_MATERIALIZED_AGGREGATES:
+            TaskAggregate.refresh(ids)
+    return updated
@@ -0,0 +1,28 @@
+import logging
+
+from core.utils.common import batch_ids
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from tasks.models import Task, TaskAggregate
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = 'Calculate materialized task aggregates (TaskAggregate) for existing tasks'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--project', type=int, default=None, help='project id, all projects by default')
+
+    def handle(self, *args, **options):
+        tasks = Task.objects.all()
+        if options['project']:
+            tasks = tasks.filter(project_id=options['project'])
+
+        processed = 0
+        for ids in batch_ids(tasks, settings.BATCH_SIZE):
+            TaskAggregate.refresh(ids)
+            processed += len(ids)
+            logger.debug(f'{processed} tasks processed')
+
+        self.stdout.write(f'Task aggregates are calculated for {processed} tasks')
@@ -0,0 +1,31 @@
+import logging
+import random
+
+from core.utils.common import batch_ids
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from tasks.models import Task
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = 'Set random keys (Task.random_key) used by uniform sampling for existing tasks'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--project', type=int, default=None, help='project id, all projects by default')
+
+    def handle(self, *args, **options):
+        tasks = Task.objects.filter(random_key__isnull=True)
+        if options['project']:
+            tasks = tasks.filter(project_id=options['project'])
+
+        processed = 0
+        for ids in batch_ids(tasks, settings.BATCH_SIZE):
+            Task.objects.bulk_update(
+                [Task(id=task_id, random_key=random.random()) for task_id in ids], ['random_key'], batch_size=1000
+            )
+            processed += len(ids)
+            logger.debug(f'{processed} tasks processed')
+
+        self.stdout.write(f'Random keys are set for {processed} tasks')
@@ -0,0 +1,40 @@
+import datetime
+import logging
+
+from core.redis import start_job_async_or_sync
+from django.core.management.base import BaseCommand
+from django.utils.timezone import now
+from projects.models import Project
+from tasks.functions import update_tasks_counters
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = (
+        'Reconcile task counters (total_annotations, cancelled_annotations, total_predictions) '
+        'which are changed incrementally on annotation and prediction saves, run it periodically'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--project', type=int, default=None, help='project id, all projects by default')
+        parser.add_argument(
+            '--hours',
+            type=int,
+            default=None,
+            help='reconcile only tasks updated during the last N hours, all tasks by default',
+        )
+
+    def handle(self, *args, **options):
+        projects = Project.objects.all()
+        if options['project']:
+            projects = projects.filter(id=options['project'])
+
+        for project in projects.only('id').iterator():
+            tasks = project.tasks.all()
+            if options['hours']:
+                tasks = tasks.filter(updated_at__gte=now() - datetime.timedelta(hours=options['hours']))
+            logger.debug(f'Start reconciling task counters for project {project.id}.')
+            start_job_async_or_sync(update_tasks_counters, tasks)
+
+        self.stdout.write('Task counters reconciliation is started')
@@ -0,0 +1,27 @@
+# Generated by Django 3.2.23 on 2026-10-18 06:27
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tasks', '0045_auto_20231124_1238'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TaskAggregate',
+            fields=[
+                ('task', models.OneToOneField(help_text='Task', on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='aggregate', serialize=False, to='tasks.task')),
+                ('last_annotation_at', models.DateTimeField(db_index=True, help_text='Creation time of the newest annotation', null=True, verbose_name='last annotation at')),
+                ('avg_lead_time', models.FloatField(db_index=True, help_text='Average lead time of task annotations', null=True, verbose_name='average lead time')),
+                ('predictions_score', models.FloatField(db_index=True, help_text='Average score of task predictions', null=True, verbose_name='predictions score')),
+                ('draft_exists', models.BooleanField(db_index=True, default=False, help_text='Whether task has annotation drafts', verbose_name='draft exists')),
+            ],
+            options={
+                'db_table': 'task_aggregate',
+            },
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 3.2.23 on 2026-10-18 08:02
+
+import random
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tasks', '0046_taskaggregate'),
+    ]
+
+    operations = [
+        # existing tasks keep null keys (no table rewrite), they are filled by backfill_task_random_keys command
+        migrations.AddField(
+            model_name='task',
+            name='random_key',
+            field=models.FloatField(help_text='Uniformly distributed value in [0, 1) for random task sampling by index', null=True, verbose_name='random key'),
+        ),
+        migrations.AlterField(
+            model_name='task',
+            name='random_key',
+            field=models.FloatField(default=random.random, help_text='Uniformly distributed value in [0, 1) for random task sampling by index', null=True, verbose_name='random key'),
+        ),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['project', 'random_key'], name='task_project_d1cc66_idx'),
+        ),
+    ]
@@ -5,6 +5,7 @@ import datetime
 import logging
 import numbers
 import os
+import random
 import uuid
 from typing import Any, Mapping, Optional, cast
 from urllib.parse import urljoin
@@ -21,15 +22,16 @@ from core.utils.common import (
     string_is_url,
     temporary_disconnect_list_signal,
 )
-from core.utils.db import fast_first
+from core.utils.db import SQCount, fast_first
 from core.utils.params import get_env
 from data_import.models import FileUpload
 from data_manager.managers import PreparedTaskManager, TaskManager
+from data_manager.result_cache import bump_data_version
 from django.conf import settings
 from django.contrib.auth.models import AnonymousUser
 from django.core.files.storage import default_storage
 from django.db import OperationalError, models, transaction
-from django.db.models import JSONField, Q
+from django.db.models import DEFERRED, Avg, Exists, F, JSONField, OuterRef, Q, Subquery
 from django.db.models.signals import post_delete, post_save, pre_delete, pre_save
 from django.dispatch import Signal, receiver
 from django.urls import reverse
@@ -159,6 +161,12 @@ class Task(TaskMixin, models.Model):
         db_index=True,
         help_text='When the last comment was updated',
     )
+    random_key = models.FloatField(
+        _('random key'),
+        default=random.random,
+        null=True,
+        help_text='Uniformly distributed value in [0, 1) for random task sampling by index',
+    )
 
     objects = TaskManager()  # task manager by default
     prepared = PreparedTaskManager()  # task manager with filters, ordering, etc for data_manager app
@@ -172,6 +180,7 @@ class Task(TaskMixin, models.Model):
             models.Index(fields=['id', 'overlap']),
             models.Index(fields=['overlap']),
             models.Index(fields=['project', 'id']),
+            models.Index(fields=['project', 'random_key']),
         ]
 
     @property
@@ -194,21 +203,16 @@ class Task(TaskMixin, models.Model):
         if lock:
             return lock.task
 
-    def has_lock(self, user=None):
-        """
-        Check whether current task has been locked by some user
-
-        Also has workaround for fixing not consistent is_labeled flag state
-        """
-        from projects.functions.next_task import get_next_task_logging_level
-
-        SkipQueue = self.project.SkipQueue
+    @staticmethod
+    def _not_counted_annotations_q(project, user):
+        """Annotations which don't take the task for the user, depending on the project skip queue"""
+        SkipQueue = project.SkipQueue
 
-        if self.project.skip_queue == SkipQueue.REQUEUE_FOR_ME:
+        if project.skip_queue == SkipQueue.REQUEUE_FOR_ME:
             # REQUEUE_FOR_ME means: only my skipped tasks go back to me,
             # alien's skipped annotations are counted as regular annotations
             q = Q(was_cancelled=True) & Q(completed_by=user)
-        elif self.project.skip_queue == SkipQueue.REQUEUE_FOR_OTHERS:
+        elif project.skip_queue == SkipQueue.REQUEUE_FOR_OTHERS:
             # REQUEUE_FOR_OTHERS: my skipped tasks go to others
             # alien's skipped annotations are not counted at all
             q = Q(was_cancelled=True) & ~Q(completed_by=user)
@@ -216,9 +220,33 @@ class Task(TaskMixin, models.Model):
             # IGNORE_SKIPPED: my skipped tasks don't go anywhere
             # alien's and my skipped annotations are counted as regular annotations
             q = Q()
+        return q | Q(ground_truth=True)
+
+    @classmethod
+    def filter_unlocked(cls, queryset, user, project):
+        """Keep tasks of the queryset which are not locked for the user, it's has_lock() in one query for many tasks"""
+        locks = TaskLock.objects.filter(task=OuterRef('pk'), expire_at__gt=now()).exclude(user=user).values('id')
+        annotations = (
+            Annotation.objects.filter(task=OuterRef('pk'))
+            .exclude(cls._not_counted_annotations_q(project, user))
+            .values('id')
+        )
+        return queryset.annotate(num_locks_user=SQCount(locks), num_counted_annotations=SQCount(annotations)).filter(
+            num_locks_user__lt=F('overlap') - F('num_counted_annotations')
+        )
+
+    def has_lock(self, user=None):
+        """
+        Check whether current task has been locked by some user
+
+        Also has workaround for fixing not consistent is_labeled flag state
+        """
+        from projects.functions.next_task import get_next_task_logging_level
+
+        q = self._not_counted_annotations_q(self.project, user)
 
         num_locks = self.num_locks_user(user=user)
-        num_annotations = self.annotations.exclude(q | Q(ground_truth=True)).count()
+        num_annotations = self.annotations.exclude(q).count()
         num = num_locks + num_annotations
         if num > self.overlap:
             logger.error(
@@ -330,7 +358,7 @@ class Task(TaskMixin, models.Model):
 
         if storage:
             return {
-                'url': storage.generate_http_url(url),
+                'url': storage.get_http_url(url),
                 'presign_ttl': storage.presign_ttl,
             }
 
@@ -615,6 +643,25 @@ class Annotation(AnnotationMixin, models.Model):
             models.Index(fields=['was_cancelled']),
         ]
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # remember the stored state, so counters are shifted on save without fetching the annotation again
+        loaded = dict(zip(field_names, values))
+        if loaded.get('result', DEFERRED) is not DEFERRED and loaded.get('was_cancelled', DEFERRED) is not DEFERRED:
+            instance._stored_state = {'result': loaded['result'], 'was_cancelled': loaded['was_cancelled']}
+        return instance
+
+    def get_stored_state(self):
+        """Result and was_cancelled values which are stored in DB for this annotation
+
+        :return: dict or None if the annotation is not saved yet
+        """
+        state = getattr(self, '_stored_state', None)
+        if state is None and self.id is not None:
+            state = Annotation.objects.filter(id=self.id).values('result', 'was_cancelled').first()
+        return state
+
     def created_ago(self):
         """Humanize date"""
         return timesince(self.created_at)
@@ -675,12 +722,10 @@ class Annotation(AnnotationMixin, models.Model):
         task = self.task
         logger.debug(f'Start updating counters for task {task.id}.')
         if self.was_cancelled:
-            cancelled = task.annotations.all().filter(was_cancelled=True).count()
-            Task.objects.filter(id=task.id).update(cancelled_annotations=cancelled)
+            change_task_counters(self, cancelled_annotations=-1)
             logger.debug(f'On delete updated cancelled_annotations for task {task.id}')
         else:
-            total = task.annotations.all().filter(was_cancelled=False).count()
-            Task.objects.filter(id=task.id).update(total_annotations=total)
+            change_task_counters(self, total_annotations=-1)
             logger.debug(f'On delete updated total_annotations for task {task.id}')
 
         logger.debug(f'Update task stats for task={task}')
@@ -904,6 +949,70 @@ class Prediction(models.Model):
         db_table = 'prediction'
 
 
+class TaskAggregate(models.Model):
+    """Aggregates over task annotations, predictions and drafts materialized for Data Manager sorting and filtering"""
+
+    task = models.OneToOneField(
+        'tasks.Task', on_delete=models.CASCADE, primary_key=True, related_name='aggregate', help_text='Task'
+    )
+    last_annotation_at = models.DateTimeField(
+        _('last annotation at'), null=True, db_index=True, help_text='Creation time of the newest annotation'
+    )
+    avg_lead_time = models.FloatField(
+        _('average lead time'), null=True, db_index=True, help_text='Average lead time of task annotations'
+    )
+    predictions_score = models.FloatField(
+        _('predictions score'), null=True, db_index=True, help_text='Average score of task predictions'
+    )
+    draft_exists = models.BooleanField(
+        _('draft exists'), default=False, db_index=True, help_text='Whether task has annotation drafts'
+    )
+
+    @classmethod
+    def refresh(cls, task_ids, create=True):
+        """Recalculate aggregates for tasks
+
+        :param task_ids: list of task ids
+        :param create: add missing rows, it's disabled when tasks can be removed in the same transaction
+        """
+        annotations = Annotation.objects.filter(task=OuterRef('pk')).order_by()
+        predictions = Prediction.objects.filter(task=OuterRef('pk')).order_by()
+        tasks = Task.objects.filter(id__in=task_ids).annotate(
+            new_last_annotation_at=Subquery(annotations.order_by('-id').values('created_at')[:1]),
+            new_avg_lead_time=Subquery(annotations.values('task').annotate(value=Avg('lead_time')).values('value')),
+            new_predictions_score=Subquery(predictions.values('task').annotate(value=Avg('score')).values('value')),
+            new_draft_exists=Exists(AnnotationDraft.objects.filter(task=OuterRef('pk'))),
+        )
+        objs = [
+            cls(
+                task_id=task.id,
+                last_annotation_at=task.new_last_annotation_at,
+                avg_lead_time=task.new_avg_lead_time,
+                predictions_score=task.new_predictions_score,
+                draft_exists=task.new_draft_exists,
+            )
+            for task in tasks.only('id')
+        ]
+
+        existing = set(cls.objects.filter(task_id__in=task_ids).values_list('task_id', flat=True))
+        fields = ['last_annotation_at', 'avg_lead_time', 'predictions_score', 'draft_exists']
+        cls.objects.bulk_update(
+            [obj for obj in objs if obj.task_id in existing], fields, batch_size=settings.BATCH_SIZE
+        )
+        if create:
+            # a missing row means the task has nothing to aggregate, so empty rows are not stored
+            new_objs = [
+                obj
+                for obj in objs
+                if obj.task_id not in existing
+                and (obj.last_annotation_at is not None or obj.predictions_score is not None or obj.draft_exists)
+            ]
+            cls.objects.bulk_create(new_objs, batch_size=settings.BATCH_SIZE, ignore_conflicts=True)
+
+    class Meta:
+        db_table = 'task_aggregate'
+
+
 @receiver(post_delete, sender=Task)
 def update_all_task_states_after_deleting_task(sender, instance, **kwargs):
     """after deleting_task
@@ -957,69 +1066,101 @@ def update_project_summary_data_columns(sender, instance, created, update_fields
     instance.increase_project_summary_counters()
 
 
+def change_task_counters(instance, **deltas):
+    """Shift counters (total_annotations, etc) of the instance task with atomic increments,
+    the task cached on the instance gets the same deltas, so it isn't fetched again
+    """
+    Task.objects.filter(id=instance.task_id).update(**{field: F(field) + delta for field, delta in deltas.items()})
+    if instance._meta.get_field('task').is_cached(instance):
+        for field, delta in deltas.items():
+            setattr(instance.task, field, getattr(instance.task, field) + delta)
+
+
 @receiver(pre_save, sender=Annotation)
 def delete_project_summary_annotations_before_updating_annotation(sender, instance, **kwargs):
     """Before updating annotation fields - ensure previous info removed from project.summary"""
-    try:
-        old_annotation = sender.objects.get(id=instance.id)
-    except Annotation.DoesNotExist:
+    old_state = instance.get_stored_state()
+    if old_state is None:
         # annotation just created - do nothing
         return
-    old_annotation.decrease_project_summary_counters()
+    if hasattr(instance.project, 'summary'):
+        logger.debug(f'Decrease project.summary counters from stored state of {instance}')
+        instance.project.summary.remove_created_annotations_and_labels([old_state])
 
     # update task counters if annotation changes it's was_cancelled status
-    task = instance.task
-    if old_annotation.was_cancelled != instance.was_cancelled:
-        if instance.was_cancelled:
-            task.cancelled_annotations = task.cancelled_annotations + 1
-            task.total_annotations = task.total_annotations - 1
-        else:
-            task.cancelled_annotations = task.cancelled_annotations - 1
-            task.total_annotations = task.total_annotations + 1
-        task.update_is_labeled()
-
-        Task.objects.filter(id=instance.task.id).update(
-            is_labeled=task.is_labeled,
-            total_annotations=task.total_annotations,
-            cancelled_annotations=task.cancelled_annotations,
-        )
+    if old_state['was_cancelled'] != instance.was_cancelled:
+        delta = 1 if instance.was_cancelled else -1
+        change_task_counters(instance, cancelled_annotations=delta, total_annotations=-delta)
 
 
 @receiver(post_save, sender=Annotation)
 def update_project_summary_annotations_and_is_labeled(sender, instance, created, **kwargs):
     """Update annotation counters in project summary"""
     instance.increase_project_summary_counters()
+    if created:
+        if instance.was_cancelled:
+            change_task_counters(instance, cancelled_annotations=1)
+        else:
+            change_task_counters(instance, total_annotations=1)
+    instance._stored_state = {'result': instance.result, 'was_cancelled': instance.was_cancelled}
 
     # If annotation is changed, update task.is_labeled state
     logger.debug(f'Update task stats for task={instance.task}')
-    if instance.was_cancelled:
-        instance.task.cancelled_annotations = instance.task.annotations.all().filter(was_cancelled=True).count()
-    else:
-        instance.task.total_annotations = instance.task.annotations.all().filter(was_cancelled=False).count()
     instance.task.update_is_labeled()
-    instance.task.save(update_fields=['is_labeled', 'total_annotations', 'cancelled_annotations'])
-    logger.debug(f'Updated total_annotations and cancelled_annotations for {instance.task.id}.')
+    Task.objects.filter(id=instance.task_id).update(is_labeled=instance.task.is_labeled)
+    logger.debug(f'Updated total_annotations and cancelled_annotations for {instance.task_id}.')
 
 
 @receiver(pre_delete, sender=Prediction)
 def remove_predictions_from_project(sender, instance, **kwargs):
     """Remove predictions counters"""
-    instance.task.total_predictions = instance.task.predictions.all().count() - 1
-    instance.task.save(update_fields=['total_predictions'])
-    logger.debug(f'Updated total_predictions for {instance.task.id}.')
+    change_task_counters(instance, total_predictions=-1)
+    logger.debug(f'Updated total_predictions for {instance.task_id}.')
 
 
 @receiver(post_save, sender=Prediction)
-def save_predictions_to_project(sender, instance, **kwargs):
+def save_predictions_to_project(sender, instance, created, **kwargs):
     """Add predictions counters"""
-    instance.task.total_predictions = instance.task.predictions.all().count()
-    instance.task.save(update_fields=['total_predictions'])
-    logger.debug(f'Updated total_predictions for {instance.task.id}.')
+    if created:
+        change_task_counters(instance, total_predictions=1)
+        logger.debug(f'Updated total_predictions for {instance.task_id}.')
 
 
 # =========== END OF PROJECT SUMMARY UPDATES ===========
 
 
+@receiver(post_save, sender=Annotation)
+@receiver(post_save, sender=Prediction)
+@receiver(post_save, sender=AnnotationDraft)
+def update_task_aggregate(sender, instance, **kwargs):
+    # aggregates are filled by backfill_task_aggregates command when the setting is enabled later
+    if not settings.DATA_MANAGER_MATERIALIZED_AGGREGATES:
+        return
+    if instance.task_id:
+        TaskAggregate.refresh([instance.task_id])
+
+
+@receiver(post_delete, sender=Annotation)
+@receiver(post_delete, sender=Prediction)
+@receiver(post_delete, sender=AnnotationDraft)
+def update_task_aggregate_after_deleting(sender, instance, **kwargs):
+    if not settings.DATA_MANAGER_MATERIALIZED_AGGREGATES:
+        return
+    # the task can be removed in the same transaction, so rows are not created here
+    if instance.task_id:
+        TaskAggregate.refresh([instance.task_id], create=False)
+
+
+@receiver(post_save, sender=Task)
+@receiver(post_save, sender=Annotation)
+@receiver(post_save, sender=Prediction)
+@receiver(post_delete, sender=Task)
+@receiver(post_delete, sender=Annotation)
+@receiver(post_delete, sender=Prediction)
+def invalidate_data_manager_results(sender, instance, **kwargs):
+    bump_data_version(instance.project_id)
+
+
 @receiver(post_save, sender=Annotation)
 def delete_draft(sender, instance, **kwargs):
     task = instance.task
@@ -1038,19 +1179,21 @@ def delete_draft(sender, instance, **kwargs):
 
 
 @receiver(post_save, sender=Annotation)
-def update_ml_backend(sender, instance, **kwargs):
-    if instance.ground_truth:
-        return
-
+def update_ml_backend(sender, instance, created, **kwargs):
     project = instance.project
 
-    if hasattr(project, 'ml_backends') and project.min_annotations_to_start_training:
-        annotation_count = Annotation.objects.filter(project=project).count()
+    if created and hasattr(project, 'ml_backends') and project.min_annotations_to_start_training:
+        from ml.models import train_ml_backends
+        from projects.models import ProjectAnnotationsCounter
+
+        # each new annotation gets a distinct counter value, so the training starts once per N annotations
+        annotation_count = ProjectAnnotationsCounter.increment(project.id)
+        if instance.ground_truth:
+            return
 
         # start training every N annotation
         if annotation_count % project.min_annotations_to_start_training == 0:
-            for ml_backend in project.ml_backends.all():
-                ml_backend.train()
+            start_job_async_or_sync(train_ml_backends, project.id)
 
 
 def update_task_stats(task, stats=('is_labeled',), save=True):
@@ -101,6 +101,20 @@ class AnnotationSerializer(FlexFieldsModelSerializer):
         expandable_fields = {'completed_by': (CompletedByDMSerializer,)}
 
 
+class PredictionBulkSerializer(PredictionSerializer):
+    """Validate predictions before bulk creation, task and project are assigned by the caller"""
+
+    class Meta(PredictionSerializer.Meta):
+        read_only_fields = ['task', 'project']
+
+
+class AnnotationBulkSerializer(AnnotationSerializer):
+    """Validate annotations before bulk creation, task and project are assigned by the caller"""
+
+    class Meta(AnnotationSerializer.Meta):
+        read_only_fields = ['task', 'project']
+
+
 class TaskSimpleSerializer(ModelSerializer):
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
@@ -118,7 +132,7 @@ class TaskSimpleSerializer(ModelSerializer):
 
     class Meta:
         model = Task
-        fields = '__all__'
+        exclude = ('random_key',)
 
 
 class BaseTaskSerializer(FlexFieldsModelSerializer):
@@ -157,7 +171,7 @@ class BaseTaskSerializer(FlexFieldsModelSerializer):
 
     class Meta:
         model = Task
-        fields = '__all__'
+        exclude = ('random_key',)
 
 
 class BaseTaskSerializerBulk(serializers.ListSerializer):
@@ -556,7 +570,7 @@ class BaseTaskSerializerBulk(serializers.ListSerializer):
 
     class Meta:
         model = Task
-        fields = '__all__'
+        exclude = ('random_key',)
 
 
 TaskSerializer = load_func(settings.TASK_SERIALIZER)
@@ -573,7 +587,7 @@ class TaskWithAnnotationsSerializer(TaskSerializer):
         model = Task
         list_serializer_class = load_func(settings.TASK_SERIALIZER_BULK)
 
-        exclude = ()
+        exclude = ('random_key',)
 
 
 class TaskIDWithAnnotationsSerializer(TaskSerializer):
@@ -596,7 +610,7 @@ class TaskWithPredictionsSerializer(TaskSerializer):
 
     class Meta:
         model = Task
-        fields = '__all__'
+        exclude = ('random_key',)
 
 
 class TaskWithAnnotationsAndPredictionsSerializer(TaskSerializer):
@@ -626,7 +640,7 @@ class TaskWithAnnotationsAndPredictionsSerializer(TaskSerializer):
 
     class Meta:
         model = Task
-        exclude = ()
+        exclude = ('random_key',)
 
 
 class AnnotationDraftSerializer(ModelSerializer):
@@ -0,0 +1,163 @@
+"""This file and its contents are licensed under the Apache License 2.0. Please see the included NOTICE for copyright information and LICENSE for a copy of the license.
+"""
+import json
+import logging
+
+from core.redis import (
+    redis_connected,
+    redis_delete,
+    redis_get,
+    redis_llen,
+    redis_lpush,
+    redis_lrem,
+    redis_rpoplpush,
+    redis_set,
+    start_job_async_or_sync,
+)
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from projects.functions.stream_history import fill_history_annotation
+from tasks.models import Annotation, AnnotationDraft, Prediction
+from tasks.serializers import PredictionSerializer
+from users.models import User
+
+logger = logging.getLogger(__name__)
+
+SIDE_EFFECTS_QUEUE_KEY = 'annotation-side-effects'
+# effects taken by a job stay here until they are processed, so effects of killed workers are not lost
+SIDE_EFFECTS_PROCESSING_KEY = 'annotation-side-effects:processing'
+# the job which sets this key is the only consumer of the queue until the key is deleted or expired
+SIDE_EFFECTS_SCHEDULED_KEY = 'annotation-side-effects:scheduled'
+SIDE_EFFECTS_DONE_KEY = 'annotation-side-effects:done:{annotation_id}'
+# a job which was lost or killed doesn't block the next ones longer than this, running jobs prolong it
+SIDE_EFFECTS_SCHEDULED_TTL = 600
+SIDE_EFFECTS_DONE_TTL = 24 * 3600
+
+
+def side_effects_deferred():
+    return settings.ANNOTATION_SIDE_EFFECTS_ASYNC and redis_connected()
+
+
+def get_prediction_snapshot(task):
+    """Serialized prediction of the current project model version, it's stored with the annotation"""
+    prediction = Prediction.objects.filter(task=task, model_version=task.project.model_version).first()
+    if prediction is None:
+        logger.debug(f'There are no predictions for task={task}')
+        return {}
+    return PredictionSerializer(prediction).data
+
+
+def schedule_annotation_side_effects(annotation, user, draft_id=None, prediction=False, deferred=None):
+    """Run follow-up updates of the created annotation: user activity, draft removal,
+    stream history and prediction snapshot. With ANNOTATION_SIDE_EFFECTS_ASYNC they are queued
+    after the transaction commit and processed by batched background jobs, otherwise they are done right away.
+
+    :param prediction: store the prediction snapshot in the annotation
+    :param deferred: result of side_effects_deferred() if it's checked already
+    """
+    effect = {
+        'annotation_id': annotation.id,
+        'user_id': user.id,
+        'activity_at': timezone.now().isoformat(),
+        'draft_id': draft_id,
+        'prediction': prediction,
+    }
+    if deferred is None:
+        deferred = side_effects_deferred()
+    if not deferred:
+        process_annotation_side_effects(**effect)
+        return
+    transaction.on_commit(lambda: _enqueue_side_effects(effect))
+
+
+def _enqueue_side_effects(effect):
+    redis_lpush(SIDE_EFFECTS_QUEUE_KEY, json.dumps(effect))
+    # one job drains the whole queue, so a new job is started only if there is no pending or running one
+    if redis_set(SIDE_EFFECTS_SCHEDULED_KEY, 1, ttl=SIDE_EFFECTS_SCHEDULED_TTL, nx=True):
+        start_job_async_or_sync(process_annotation_side_effects_batches, queue_name='low')
+
+
+def _process_queued_side_effects(item):
+    """Process effects taken from the queue at least once, the done key skips repeated deliveries"""
+    effect = json.loads(item)
+    done_key = SIDE_EFFECTS_DONE_KEY.format(annotation_id=effect['annotation_id'])
+    if redis_get(done_key):
+        logger.debug(f'Side effects of annotation {effect["annotation_id"]} are processed already')
+        return
+    process_annotation_side_effects(**effect)
+    redis_set(done_key, 1, ttl=SIDE_EFFECTS_DONE_TTL)
+
+
+def _process_side_effects_batch():
+    batch = []
+    while len(batch) < settings.ANNOTATION_SIDE_EFFECTS_BATCH_SIZE:
+        item = redis_rpoplpush(SIDE_EFFECTS_QUEUE_KEY, SIDE_EFFECTS_PROCESSING_KEY)
+        if item is None:
+            break
+        batch.append(item)
+
+    for item in batch:
+        try:
+            _process_queued_side_effects(item)
+        except Exception as exc:
+            logger.error(f'Annotation side effects {item} failed: {exc}', exc_info=True)
+        # failed effects are not retried, they are logged, the item is acknowledged anyway
+        redis_lrem(SIDE_EFFECTS_PROCESSING_KEY, item)
+    return len(batch)
+
+
+def process_annotation_side_effects_batches():
+    """Drain the queue of side effects, the job owns SIDE_EFFECTS_SCHEDULED_KEY set by _enqueue_side_effects,
+    so it's the only consumer and the processing list can hold items of a killed consumer only
+    """
+    while redis_rpoplpush(SIDE_EFFECTS_PROCESSING_KEY, SIDE_EFFECTS_QUEUE_KEY):
+        pass
+
+    processed = 0
+    while True:
+        batch_size = _process_side_effects_batch()
+        if batch_size:
+            processed += batch_size
+            redis_set(SIDE_EFFECTS_SCHEDULED_KEY, 1, ttl=SIDE_EFFECTS_SCHEDULED_TTL)
+            continue
+
+        # the queue is empty: effects queued after the key is deleted start a new job,
+        # the ones queued before it are taken by this job unless a new job owns the key already
+        redis_delete(SIDE_EFFECTS_SCHEDULED_KEY)
+        if not redis_llen(SIDE_EFFECTS_QUEUE_KEY):
+            break
+        if not redis_set(SIDE_EFFECTS_SCHEDULED_KEY, 1, ttl=SIDE_EFFECTS_SCHEDULED_TTL, nx=True):
+            break
+    logger.debug(f'{processed} annotation side effects processed')
+
+
+def process_annotation_side_effects(annotation_id, user_id, activity_at, draft_id=None, prediction=False):
+    """All updates here are safe to repeat, queued effects are delivered at least once"""
+    annotation = Annotation.objects.filter(id=annotation_id).select_related('task__project').first()
+    if annotation is None:
+        logger.debug(f'Annotation {annotation_id} is removed before processing its side effects')
+        return
+    task = annotation.task
+    user = User.objects.get(id=user_id)
+
+    if prediction:
+        Annotation.objects.filter(id=annotation_id).update(prediction=get_prediction_snapshot(task))
+
+    logger.debug(f'Save activity for user={user}')
+    activity_at = parse_datetime(activity_at)
+    User.objects.filter(Q(activity_at__isnull=True) | Q(activity_at__lt=activity_at), id=user_id).update(
+        activity_at=activity_at
+    )
+
+    # if annotation created from draft - remove this draft
+    if draft_id is not None:
+        logger.debug(f'Remove draft {draft_id} after creating annotation {annotation_id}')
+        # AnnotationDraft.delete updates created_labels_drafts, so drafts aren't deleted with the queryset
+        draft = AnnotationDraft.objects.filter(id=draft_id).first()
+        if draft is not None:
+            draft.delete()
+
+    fill_history_annotation(user, task, annotation)
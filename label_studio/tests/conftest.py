@@ -298,6 +298,29 @@ def mock_s3_resource_kms(mocker):
     mocker.patch('boto3.Session.resource', return_value=mock_s3_resource)
 
 
+@pytest.fixture(autouse=True)
+def storage_client_pool():
+    # pooled clients and cached urls would outlive mocks of other tests
+    from io_storages.client_pool import client_pool
+    from io_storages.presigned_url_cache import presigned_url_cache
+
+    client_pool.clear()
+    presigned_url_cache.clear()
+    yield
+    client_pool.clear()
+    presigned_url_cache.clear()
+
+
+@pytest.fixture(autouse=True)
+def django_cache():
+    # project ids are reused between tests, so cached Data Manager results must not leak
+    from django.core.cache import cache
+
+    cache.clear()
+    yield
+    cache.clear()
+
+
 @pytest.fixture(autouse=True)
 def gcs_client():
     with gcs_client_mock():
@@ -1,6 +1,7 @@
 """This file and its contents are licensed under the Apache License 2.0. Please see the included NOTICE for copyright information and LICENSE for a copy of the license.
 """
 import json
+from unittest import mock
 
 import pytest
 from projects.models import Project
@@ -8,6 +9,16 @@ from projects.models import Project
 from ..utils import make_annotation, make_prediction, make_task, project_id  # noqa
 
 
+@pytest.fixture
+def shared_result_cache(settings):
+    # the result cache is used with shared cache backends only, tests run in one process with the local one
+    settings.DATA_MANAGER_RESULT_CACHE_TTL = 60
+    with mock.patch('data_manager.result_cache.result_cache_enabled', return_value=True), mock.patch(
+        'data_manager.api.result_cache_enabled', return_value=True
+    ):
+        yield
+
+
 @pytest.mark.django_db
 def test_views_tasks_api(business_client, project_id):
     # create
@@ -128,3 +139,98 @@ def test_views_total_counters(tasks_count, annotations_count, predictions_count,
     assert response_data['total'] == tasks_count, response_data
     assert response_data['total_annotations'] == tasks_count * annotations_count, response_data
     assert response_data['total_predictions'] == tasks_count * predictions_count, response_data
+
+
+@pytest.mark.django_db
+def test_views_tasks_api_cached_results_disabled(business_client, project_id, settings):
+    from django.core.cache import cache
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+
+    # per-process cache can't be invalidated in other workers, so results are not cached with it
+    settings.DATA_MANAGER_RESULT_CACHE_TTL = 60
+    project = Project.objects.get(pk=project_id)
+    make_task({'data': {'text': 'text'}}, project)
+    assert cache.get(f'data-manager:data-version:{project_id}') is None
+
+    for _ in range(2):
+        with CaptureQueriesContext(connection) as queries:
+            response = business_client.get(f'/api/tasks?project={project_id}&page=1&page_size=2')
+        assert response.json()['total'] == 1
+        assert [query['sql'] for query in queries.captured_queries if 'COUNT(' in query['sql'].upper()]
+
+
+@pytest.mark.django_db
+@pytest.mark.usefixtures('shared_result_cache')
+def test_views_tasks_api_cached_results(business_client, project_id):
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+
+    response = business_client.post(
+        '/api/dm/views/', data=json.dumps({'project': project_id}), content_type='application/json'
+    )
+    view_id = response.json()['id']
+    project = Project.objects.get(pk=project_id)
+    task_ids = [make_task({'data': {'text': str(i)}}, project).id for i in range(5)]
+
+    response = business_client.get(f'/api/tasks?view={view_id}&page=1&page_size=2')
+    assert response.status_code == 200, response.content
+    assert response.json()['total'] == 5
+    assert [task['id'] for task in response.json()['tasks']] == task_ids[:2]
+
+    # next pages are taken from cached totals and ids
+    with CaptureQueriesContext(connection) as queries:
+        response = business_client.get(f'/api/tasks?view={view_id}&page=3&page_size=2')
+    assert response.status_code == 200, response.content
+    assert response.json()['total'] == 5
+    assert [task['id'] for task in response.json()['tasks']] == task_ids[4:]
+    assert not [query['sql'] for query in queries.captured_queries if 'COUNT(' in query['sql'].upper()]
+
+    # new annotations invalidate cached results
+    make_annotation({'result': []}, task_ids[0])
+    response = business_client.get(f'/api/tasks?view={view_id}&page=2&page_size=2')
+    assert response.json()['total_annotations'] == 1
+    assert [task['id'] for task in response.json()['tasks']] == task_ids[2:4]
+
+
+@pytest.mark.django_db
+@pytest.mark.usefixtures('shared_result_cache')
+def test_views_tasks_api_deferred_totals(business_client, project_id, settings):
+    settings.DATA_MANAGER_DEFERRED_TOTALS = True
+    project = Project.objects.get(pk=project_id)
+    task_ids = [make_task({'data': {'text': str(i)}}, project).id for i in range(5)]
+    make_annotation({'result': []}, task_ids[0])
+
+    # no filters: totals are estimated for the whole project
+    response = business_client.get(f'/api/tasks?project={project_id}&page=3&page_size=2')
+    assert response.status_code == 200, response.content
+    response_data = response.json()
+    assert response_data['totals_mode'] == 'estimate'
+    assert response_data['total'] == 5
+    assert [task['id'] for task in response_data['tasks']] == task_ids[4:]
+
+    # with filters totals are not counted
+    filters = {
+        'conjunction': 'and',
+        'items': [{'filter': 'filter:tasks:id', 'operator': 'greater', 'type': 'Number', 'value': task_ids[1]}],
+    }
+    response = business_client.post(
+        '/api/dm/views/',
+        data=json.dumps({'project': project_id, 'data': {'filters': filters}}),
+        content_type='application/json',
+    )
+    view_id = response.json()['id']
+    response = business_client.get(f'/api/tasks?view={view_id}&page=1&page_size=2')
+    response_data = response.json()
+    assert response_data['totals_mode'] == 'deferred'
+    assert response_data['total'] is None
+    assert [task['id'] for task in response_data['tasks']] == task_ids[2:4]
+    assert business_client.get(f'/api/tasks?view={view_id}&page=3&page_size=2').status_code == 404
+
+    # totals are fetched separately and then reused by the task list
+    response = business_client.get(f'/api/dm/totals/?view={view_id}')
+    assert response.status_code == 200, response.content
+    assert response.json() == {'total': 3, 'total_annotations': 0, 'total_predictions': 0}
+    response = business_client.get(f'/api/tasks?view={view_id}&page=2&page_size=2')
+    assert response.json()['totals_mode'] == 'exact'
+    assert response.json()['total'] == 3
@@ -386,3 +386,136 @@ def test_views_filters(filters, ids, business_client, project_id):
     response_ids = [task['id'] for task in response_data['tasks']]
     correct_ids = [task_ids[i] for i in ids]
     assert response_ids == correct_ids, (response_ids, correct_ids, filters)
+
+
+@pytest.mark.django_db
+def test_field_value_types_without_queries(configured_project, django_assert_num_queries):
+    from data_manager.managers import get_field_value_type
+    from tasks.models import Task
+
+    project = configured_project
+    queryset = Task.prepared.annotate_queryset(Task.objects.filter(project=project), all_fields=True)
+    expected = {
+        'data__text': 'str',
+        'data__unknown_column': 'str',
+        'total_annotations': 'int',
+        'is_labeled': 'bool',
+        'annotations__id': 'int',
+        'completed_at': 'datetime',
+        'predictions_score': 'float',
+        'file_upload_field': 'str',
+    }
+    with django_assert_num_queries(0):
+        assert {field: get_field_value_type(queryset, field, project) for field in expected} == expected
+
+
+@pytest.mark.django_db
+def test_annotate_queryset_without_queries(configured_project, django_assert_num_queries):
+    from tasks.models import Task
+
+    project = configured_project
+    fields = ['completed_at', 'avg_lead_time', 'annotators', 'draft_exists']
+    with django_assert_num_queries(0):
+        queryset = Task.prepared.annotate_queryset(
+            Task.objects.filter(project=project), fields_for_evaluation=fields, project=project
+        )
+        # fields annotated already are not aggregated twice
+        queryset = Task.prepared.annotate_queryset(queryset, fields_for_evaluation=fields, project=project)
+    assert set(fields) <= set(queryset.query.annotations)
+    assert queryset.count() == project.tasks.count()
+
+
+@pytest.mark.django_db
+def test_materialized_aggregates_are_not_written_when_disabled(project_id, settings):
+    from tasks.models import TaskAggregate
+
+    settings.DATA_MANAGER_MATERIALIZED_AGGREGATES = False
+    project = Project.objects.get(pk=project_id)
+    task = make_task({'data': {'text': 1}}, project)
+    make_annotation({'result': [], 'lead_time': 10}, task.id)
+    make_prediction({'result': [], 'score': 0.9}, task.id)
+    assert not TaskAggregate.objects.filter(task=task).exists()
+
+
+@pytest.mark.django_db
+def test_views_ordering_by_materialized_aggregates(business_client, project_id, settings):
+    from django.core.management import call_command
+    from tasks.models import AnnotationDraft, TaskAggregate
+
+    settings.DATA_MANAGER_MATERIALIZED_AGGREGATES = True
+    project = Project.objects.get(pk=project_id)
+    task_1 = make_task({'data': {'text': 1}}, project)
+    make_annotation({'result': [], 'lead_time': 10}, task_1.id)
+    make_prediction({'result': [], 'score': 0.9}, task_1.id)
+    task_2 = make_task({'data': {'text': 2}}, project)
+    make_annotation({'result': [], 'lead_time': 1}, task_2.id)
+    make_annotation({'result': [], 'lead_time': 3}, task_2.id)
+    make_prediction({'result': [], 'score': 0.1}, task_2.id)
+    task_3 = make_task({'data': {'text': 3}}, project)
+    draft = AnnotationDraft.objects.create(task=task_3, user=project.created_by, result=[])
+
+    # aggregates are maintained by signals
+    assert TaskAggregate.objects.get(task=task_2).avg_lead_time == 2
+    assert TaskAggregate.objects.get(task=task_3).draft_exists
+    draft.delete()
+    assert not TaskAggregate.objects.get(task=task_3).draft_exists
+
+    # and the backfill restores them from scratch
+    TaskAggregate.objects.all().delete()
+    call_command('backfill_task_aggregates', project=project_id)
+    assert TaskAggregate.objects.get(task=task_1).predictions_score == 0.9
+
+    for ordering, ids in [
+        ('tasks:avg_lead_time', [task_2.id, task_1.id, task_3.id]),
+        ('-tasks:predictions_score', [task_1.id, task_2.id, task_3.id]),
+    ]:
+        response = business_client.post(
+            '/api/dm/views/',
+            data=json.dumps({'project': project_id, 'data': {'ordering': [ordering]}}),
+            content_type='application/json',
+        )
+        view_id = response.json()['id']
+        response = business_client.get(f'/api/tasks?view={view_id}')
+        assert [task['id'] for task in response.json()['tasks']] == ids
+
+
+@pytest.mark.django_db
+def test_views_filters_use_data_column_index(business_client, project_id):
+    from data_manager.managers import apply_filters
+    from data_manager.prepare_params import Filters
+    from django.db import connection
+    from tasks.models import Task
+
+    project = Project.objects.get(pk=project_id)
+    for text in ['a', 'b']:
+        make_task({'data': {'text': text}}, project)
+
+    def get_data_indexes():
+        with connection.cursor() as cursor:
+            constraints = connection.introspection.get_constraints(cursor, 'task')
+        return [name for name in constraints if name.startswith('task_data_')]
+
+    response = business_client.patch(
+        f'/api/projects/{project_id}',
+        data=json.dumps({'indexed_data_columns': ['text']}),
+        content_type='application/json',
+    )
+    assert response.status_code == 200, response.content
+    indexes = get_data_indexes()
+    assert len(indexes) == 1
+
+    project.refresh_from_db()
+    filters = Filters(
+        conjunction='and',
+        items=[{'filter': 'filter:tasks:data.text', 'operator': 'equal', 'value': 'b', 'type': 'String'}],
+    )
+    queryset = apply_filters(Task.objects.filter(project=project), filters, project, request=None)
+    assert list(queryset.values_list('data__text', flat=True)) == ['b']
+    if connection.vendor == 'sqlite':
+        assert indexes[0] in queryset.explain()
+
+    # unmarked columns lose their indexes
+    business_client.patch(
+        f'/api/projects/{project_id}', data=json.dumps({'indexed_data_columns': []}), content_type='application/json'
+    )
+    assert get_data_indexes() == []
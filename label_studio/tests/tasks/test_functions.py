@@ -48,7 +48,7 @@ class TestExportProject:
 
     def test_export_project(self, mocker, generate_export_file, project):
         data = ExportDataSerializer(
-            project.tasks.all(),
+            project.tasks.order_by('id'),
             many=True,
             context={'interpolate_key_frames': settings.INTERPOLATE_KEY_FRAMES},
         ).data
@@ -58,7 +58,11 @@ class TestExportProject:
 
         assert filepath == os.path.join(settings.EXPORT_DIR, 'project.json')
 
-        generate_export_file.assert_called_once_with(project, data, 'JSON', settings.CONVERTER_DOWNLOAD_RESOURCES, {})
+        generate_export_file.assert_called_once_with(
+            project, mocker.ANY, 'JSON', settings.CONVERTER_DOWNLOAD_RESOURCES, {}
+        )
+        # tasks are passed as a generator and serialized lazily
+        assert list(generate_export_file.call_args[0][1]) == data
 
     def test_project_does_not_exist(self, mocker, generate_export_file):
         with mocker.patch('builtins.open'):
@@ -271,3 +271,159 @@ def test_accuracy_on_delete(business_client, project_with_max_annotations_2, ann
 #     if apps.is_installed('businesses'):
 #         assert task.accuracy is None
 #     assert not task.is_labeled
+
+
+@pytest.mark.django_db
+def test_ml_backend_training_trigger(configured_project):
+    from unittest import mock
+
+    from ml.models import train_ml_backends
+
+    from .utils import make_annotation
+
+    project = Project.objects.get(id=configured_project.id)
+    project.min_annotations_to_start_training = 2
+    project.save()
+    task = project.tasks.first()
+
+    with mock.patch('tasks.models.start_job_async_or_sync') as start_job:
+        annotation = make_annotation({'result': []}, task.id)
+        start_job.assert_not_called()
+        # updates don't change the counter
+        annotation.save()
+        make_annotation({'result': []}, task.id)
+        start_job.assert_called_once_with(train_ml_backends, project.id)
+        make_annotation({'result': []}, task.id)
+        assert start_job.call_count == 1
+    assert project.annotations_counter.value == 3
+
+
+@pytest.mark.django_db
+def test_task_counters_are_changed_incrementally(configured_project):
+    from tasks.functions import update_tasks_counters
+
+    from .utils import make_annotation, make_prediction
+
+    task = configured_project.tasks.first()
+    update_tasks_counters(Task.objects.filter(id=task.id))
+    task.refresh_from_db()
+    total, cancelled, predictions = task.total_annotations, task.cancelled_annotations, task.total_predictions
+
+    prediction = make_prediction({'result': []}, task.id)
+    # updates of predictions don't change counters
+    prediction.save()
+    annotation = make_annotation({'result': []}, task.id)
+    make_annotation({'result': [], 'was_cancelled': True}, task.id)
+    task.refresh_from_db()
+    assert (task.total_annotations, task.cancelled_annotations, task.total_predictions) == (
+        total + 1,
+        cancelled + 1,
+        predictions + 1,
+    )
+
+    # loaded annotation keeps its stored state, so it isn't fetched again on save
+    annotation = Annotation.objects.get(id=annotation.id)
+    annotation.was_cancelled = True
+    annotation.save()
+    task.refresh_from_db()
+    assert (task.total_annotations, task.cancelled_annotations) == (total, cancelled + 2)
+
+    annotation.delete()
+    prediction.delete()
+    task.refresh_from_db()
+    assert (task.total_annotations, task.cancelled_annotations, task.total_predictions) == (
+        total,
+        cancelled + 1,
+        predictions,
+    )
+
+    # reconciliation gives the same values
+    update_tasks_counters(Task.objects.filter(id=task.id))
+    task.refresh_from_db()
+    assert (task.total_annotations, task.cancelled_annotations, task.total_predictions) == (
+        total,
+        cancelled + 1,
+        predictions,
+    )
+
+
+@pytest.mark.django_db
+def test_annotation_side_effects_are_deferred(business_client, configured_project):
+    from unittest import mock
+
+    from tasks.models import AnnotationDraft
+
+    from .utils import make_prediction
+
+    project = configured_project
+    project.model_version = 'v1'
+    project.save()
+    task = project.tasks.first()
+    prediction = make_prediction({'result': [], 'model_version': 'v1'}, task.id)
+    user = business_client.user
+    draft = AnnotationDraft.objects.create(task=task, user=user, result=[], lead_time=1)
+
+    # in-memory replacement of redis lists and keys
+    lists, keys = {}, {}
+
+    def rpoplpush(source, destination):
+        if not lists.get(source):
+            return None
+        item = lists[source].pop()
+        lists.setdefault(destination, []).insert(0, item)
+        return item
+
+    redis_mocks = {
+        'redis_lpush': lambda key, item: lists.setdefault(key, []).insert(0, item),
+        'redis_rpoplpush': rpoplpush,
+        'redis_lrem': lambda key, item: lists[key].remove(item),
+        'redis_llen': lambda key: len(lists.get(key, [])),
+        'redis_get': keys.get,
+        'redis_set': lambda key, value, ttl=None, nx=False: keys.setdefault(key, value) == value,
+        'redis_delete': lambda key: keys.pop(key, None),
+    }
+    patches = [mock.patch(f'tasks.side_effects.{name}', side_effect=func) for name, func in redis_mocks.items()]
+    for patch in patches:
+        patch.start()
+    try:
+        with mock.patch('tasks.api.side_effects_deferred', return_value=True), mock.patch(
+            'tasks.side_effects.transaction.on_commit'
+        ) as on_commit:
+            r = business_client.post(
+                reverse('tasks:api:task-annotations', kwargs={'pk': task.id}),
+                data={'result': [], 'draft_id': draft.id},
+                content_type='application/json',
+            )
+            assert r.status_code == 201
+            # side effects wait for the transaction commit
+            assert AnnotationDraft.objects.filter(id=draft.id).exists()
+            on_commit.assert_called_once()
+            on_commit.call_args[0][0]()
+
+        assert not lists['annotation-side-effects'] and not lists['annotation-side-effects:processing']
+        # the job releases the queue when it's empty, so the next effects start a new job
+        assert 'annotation-side-effects:scheduled' not in keys
+        assert not AnnotationDraft.objects.filter(id=draft.id).exists()
+        annotation = Annotation.objects.get(id=r.json()['id'])
+        assert annotation.prediction['id'] == prediction.id
+
+        # repeated delivery of the same side effects does nothing
+        Annotation.objects.filter(id=annotation.id).update(prediction={})
+        lists['annotation-side-effects:processing'] = [
+            json.dumps(
+                {
+                    'annotation_id': annotation.id,
+                    'user_id': user.id,
+                    'activity_at': annotation.created_at.isoformat(),
+                    'prediction': True,
+                }
+            )
+        ]
+        from tasks.side_effects import process_annotation_side_effects_batches
+
+        process_annotation_side_effects_batches()
+        assert Annotation.objects.get(id=annotation.id).prediction == {}
+        assert not lists['annotation-side-effects:processing']
+    finally:
+        for patch in patches:
+            patch.stop()
@@ -3,11 +3,12 @@
 import types
 
 import pytest
-from core.utils.common import int_from_request
+from core.utils.common import batch_ids, int_from_request
 from core.utils.exceptions import InvalidUploadUrlError, LabelStudioAPIException
 from core.utils.io import validate_upload_url
 from core.utils.params import bool_from_request
 from rest_framework.exceptions import ValidationError
+from tasks.models import Task
 
 
 @pytest.mark.parametrize(
@@ -185,3 +186,23 @@ def test_core_validate_upload_url(url, block_local_urls, raises_exc):
 
     with pytest.raises(raises_exc):
         validate_upload_url(url, block_local_urls=block_local_urls)
+
+
+@pytest.mark.django_db
+def test_core_batch_ids(configured_project, django_assert_num_queries):
+    Task.objects.bulk_create([Task(data={'text': str(i)}, project=configured_project) for i in range(5)])
+    task_ids = list(configured_project.tasks.order_by('id').values_list('id', flat=True))
+
+    # 7 tasks in batches of 3: 3 + 3 + 1 ids, one query per batch
+    with django_assert_num_queries(3):
+        batches = list(batch_ids(configured_project.tasks.all(), 3))
+    assert batches == [task_ids[0:3], task_ids[3:6], task_ids[6:]]
+
+    # the last full batch requires one more query to detect the end
+    with django_assert_num_queries(3):
+        assert list(batch_ids(configured_project.tasks.filter(id__lte=task_ids[5]), 3)) == [
+            task_ids[0:3],
+            task_ids[3:6],
+        ]
+
+    assert list(batch_ids(Task.objects.none(), 3)) == []
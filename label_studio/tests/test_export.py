@@ -1,8 +1,11 @@
 """This file and its contents are licensed under the Apache License 2.0. Please see the included NOTICE for copyright information and LICENSE for a copy of the license.
 """
+import hashlib
+import io
 import json
 
 import pytest
+from data_export.models import DataExport, Export
 from django.apps import apps
 from tasks.models import Annotation, Prediction, Task
 from tasks.serializers import AnnotationSerializer
@@ -318,3 +321,87 @@ def test_export_with_predictions(
             assert task['predictions'][0]['score'] == predictions['score']
         else:
             assert task['predictions'] == []
+
+
+def test_write_export_data_streams_generator():
+    tasks = ({'id': i, 'data': {'text': f'текст {i}'}} for i in range(3))
+    file = io.BytesIO()
+
+    md5 = DataExport.write_export_data(tasks, file)
+
+    content = file.getvalue()
+    assert json.loads(content) == [{'id': i, 'data': {'text': f'текст {i}'}} for i in range(3)]
+    assert md5 == hashlib.md5(content).hexdigest()
+
+    empty = io.BytesIO()
+    DataExport.write_export_data(iter(()), empty)
+    assert json.loads(empty.getvalue()) == []
+
+
+@pytest.mark.django_db
+def test_export_api_json(business_client, configured_project):
+    task = configured_project.tasks.first()
+    Annotation.objects.create(
+        task=task,
+        project=configured_project,
+        completed_by=business_client.admin,
+        result=[
+            {
+                'from_name': 'text_class',
+                'to_name': 'text',
+                'type': 'choices',
+                'value': {'choices': ['class_A']},
+            }
+        ],
+    )
+
+    r = business_client.get(
+        f'/api/projects/{configured_project.id}/export', data={'exportType': 'JSON', 'download_all_tasks': 'true'}
+    )
+    assert r.status_code == 200
+    exported = json.loads(r.content)
+    assert sorted(t['id'] for t in exported) == sorted(configured_project.tasks.values_list('id', flat=True))
+    exported_task = next(t for t in exported if t['id'] == task.id)
+    assert exported_task['most_common_label'] == ['class_A', 1]
+
+    r = business_client.get(f'/api/projects/{configured_project.id}/export', data={'exportType': 'JSON'})
+    assert r.status_code == 200
+    assert [t['id'] for t in json.loads(r.content)] == [task.id]
+
+
+@pytest.mark.django_db(transaction=True)
+@pytest.mark.parametrize('prefetch_batches', [0, 2])
+def test_export_snapshot(business_client, configured_project, settings, prefetch_batches):
+    settings.EXPORT_PREFETCH_BATCHES = prefetch_batches
+    task_ids = sorted(configured_project.tasks.values_list('id', flat=True))
+
+    r = business_client.post(f'/api/projects/{configured_project.id}/exports', data={})
+    assert r.status_code == 201, r.content
+    export = Export.objects.get(id=r.json()['id'])
+    assert export.status == Export.Status.COMPLETED
+
+    content = export.file.open().read()
+    assert export.md5 == hashlib.md5(content).hexdigest()
+    assert sorted(t['id'] for t in json.loads(content)) == task_ids
+    assert export.counters['task_number'] == len(task_ids)
+
+
+@pytest.mark.django_db
+def test_export_snapshot_only_with_annotations(business_client, configured_project, django_assert_max_num_queries):
+    tasks = list(configured_project.tasks.order_by('id'))
+    Annotation.objects.create(task=tasks[0], project=configured_project, completed_by=business_client.admin)
+    Annotation.objects.create(
+        task=tasks[1], project=configured_project, completed_by=business_client.admin, was_cancelled=True
+    )
+    export = Export.objects.create(project=configured_project, created_by=business_client.admin)
+
+    with django_assert_max_num_queries(10):
+        data = list(
+            export.get_export_data(
+                task_filter_options={'only_with_annotations': True},
+                annotation_filter_options={'usual': True},
+            )
+        )
+
+    assert [t['id'] for t in data] == [tasks[0].id]
+    assert export.counters == {'task_number': 1}
@@ -40,3 +40,26 @@ def test_has_lock(business_client):
     task.refresh_from_db()
 
     assert task.is_labeled is True
+
+
+@pytest.mark.django_db
+def test_filter_unlocked(business_client):
+    from tasks.models import Task
+    from tests.utils import make_annotation, make_annotator, make_task
+
+    project = make_project({}, business_client.user, use_ml_backend=False)
+    annotator = make_annotator({'email': 'annotator@testfilterunlocked.com'}, project)
+    free_task = make_task({'data': {'text': 'free'}}, project)
+    locked_task = make_task({'data': {'text': 'locked'}}, project)
+    annotated_task = make_task({'data': {'text': 'annotated'}}, project)
+    locked_task.set_lock(annotator)
+    make_annotation({'result': [], 'completed_by': annotator}, annotated_task.id)
+
+    unlocked = Task.filter_unlocked(project.tasks.all(), business_client.user, project)
+    assert set(unlocked.values_list('id', flat=True)) == {free_task.id}
+    for task in (free_task, locked_task, annotated_task):
+        assert task.has_lock(business_client.user) is (task.id != free_task.id)
+
+    # own locks don't lock tasks
+    unlocked = Task.filter_unlocked(project.tasks.all(), annotator, project)
+    assert set(unlocked.values_list('id', flat=True)) == {free_task.id, locked_task.id}
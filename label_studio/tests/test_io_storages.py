@@ -1,6 +1,18 @@
 import json
+import time
+from unittest import mock
 
 import pytest
+from io_storages.client_pool import ClientPool
+from io_storages.gcs.models import GCSImportStorage
+from io_storages.localfiles.models import (
+    LocalFilesExportStorage,
+    LocalFilesExportStorageLink,
+    LocalFilesImportStorage,
+    LocalFilesImportStorageLink,
+)
+from projects.models import ProjectAnnotationsCounter
+from tasks.models import Annotation
 from tests.utils import make_project
 
 
@@ -30,3 +42,289 @@ def test_gcs_storage_credentials_validation(business_client):
         'Google Application Credentials must be valid JSON string.'
         in r.json()['validation_errors']['non_field_errors'][0]
     )
+
+
+@pytest.mark.django_db
+def test_local_files_import_storage_sync_in_batches(business_client, configured_project, settings, tmp_path):
+    settings.LOCAL_FILES_SERVING_ENABLED = True
+    settings.LOCAL_FILES_DOCUMENT_ROOT = str(tmp_path)
+    settings.STORAGE_IMPORT_BATCH_SIZE = 2
+    project = configured_project
+    path = tmp_path / 'tasks'
+    path.mkdir()
+
+    def write_task(name, task):
+        (path / name).write_text(json.dumps(task))
+
+    write_task('1.json', {'text': 'text 1'})
+    write_task(
+        '2.json',
+        {
+            'data': {'text': 'text 2'},
+            'predictions': [{'result': [], 'score': 0.5, 'model_version': 'v1'}],
+            'annotations': [
+                {
+                    'result': [
+                        {
+                            'from_name': 'text_class',
+                            'to_name': 'text',
+                            'type': 'choices',
+                            'value': {'choices': ['class_A']},
+                        }
+                    ]
+                },
+                {'result': [], 'was_cancelled': True},
+            ],
+        },
+    )
+    write_task('3.json', {'text': 'text 3'})
+
+    storage = LocalFilesImportStorage.objects.create(project=project, path=str(path), regex_filter='.*json')
+    storage.sync()
+
+    storage.refresh_from_db()
+    assert storage.status == storage.Status.COMPLETED
+    assert storage.last_sync_count == 3
+    tasks = list(project.tasks.order_by('id'))
+    assert [task.data['text'] for task in tasks] == ['text A', 'text B', 'text 1', 'text 2', 'text 3']
+    # fixture tasks have inner_id=0
+    assert [task.inner_id for task in tasks[2:]] == [1, 2, 3]
+
+    links = dict(LocalFilesImportStorageLink.objects.filter(storage=storage).values_list('key', 'task_id'))
+    assert links == {str(path / f'{i}.json'): task.id for i, task in enumerate(tasks[2:], start=1)}
+
+    task = tasks[3]
+    assert task.total_predictions == 1
+    assert task.total_annotations == 1
+    assert task.cancelled_annotations == 1
+    assert task.predictions.get().model_version == 'v1'
+    assert task.annotations.count() == 2
+    project.summary.refresh_from_db()
+    assert project.summary.created_labels['text_class'] == {'class_A': 1}
+
+    # only new keys are imported on the next sync
+    write_task('4.json', {'text': 'text 4'})
+    storage.sync()
+
+    storage.refresh_from_db()
+    assert storage.last_sync_count == 1
+    assert storage.meta['tasks_existed'] == 3
+    assert project.tasks.count() == 6
+    assert project.tasks.get(data__text='text 4').inner_id == 4
+
+
+@pytest.mark.django_db
+def test_import_storage_sync_concurrent_downloads_keep_order(configured_project, settings, mocker):
+    settings.STORAGE_IMPORT_BATCH_SIZE = 3
+    settings.STORAGE_IMPORT_CONCURRENCY = 4
+    keys = [f'key{i}' for i in range(7)]
+
+    def get_data(key):
+        # the first keys of each page are downloaded the slowest
+        time.sleep(0.01 * (3 - keys.index(key) % 3))
+        return {'text': key}
+
+    mocker.patch.object(LocalFilesImportStorage, 'iterkeys', return_value=iter(keys))
+    mocker.patch.object(LocalFilesImportStorage, 'get_data', side_effect=get_data)
+    storage = LocalFilesImportStorage.objects.create(project=configured_project, path='/tmp')
+    storage.sync()
+
+    storage.refresh_from_db()
+    assert storage.last_sync_count == 7
+    tasks = configured_project.tasks.filter(inner_id__gt=0).order_by('inner_id')
+    assert [task.data['text'] for task in tasks] == keys
+    assert [link.key for link in LocalFilesImportStorageLink.objects.order_by('task_id')] == keys
+
+
+@pytest.mark.django_db
+def test_gcs_import_storage_incremental_sync(configured_project):
+    storage = GCSImportStorage.objects.create(project=configured_project, bucket='test-bucket_JSON')
+    storage.sync()
+    storage.refresh_from_db()
+    assert storage.last_sync_count == 3
+    assert storage.meta['last_key'] == 'test-bucket_JSON/ghi'
+
+    # incremental sync lists keys after the watermark only
+    storage.sync(incremental=True)
+    storage.refresh_from_db()
+    assert storage.last_sync_count == 0
+    assert storage.meta['tasks_existed'] == 0
+    assert storage.meta['last_key'] == 'test-bucket_JSON/ghi'
+
+    # full rescan lists the whole bucket again
+    storage.sync(incremental=False)
+    storage.refresh_from_db()
+    assert storage.last_sync_count == 0
+    assert storage.meta['tasks_existed'] == 3
+    assert configured_project.tasks.count() == 5
+
+
+@pytest.mark.django_db
+def test_local_files_import_storage_cancelled_annotations(business_client, configured_project, settings, tmp_path):
+    settings.LOCAL_FILES_SERVING_ENABLED = True
+    settings.LOCAL_FILES_DOCUMENT_ROOT = str(tmp_path)
+    project = configured_project
+    project.maximum_annotations = 1
+    project.save()
+    path = tmp_path / 'tasks'
+    path.mkdir()
+    (path / 'skipped.json').write_text(
+        json.dumps({'data': {'text': 'skipped'}, 'annotations': [{'result': [], 'was_cancelled': True}]})
+    )
+    (path / 'labeled.json').write_text(json.dumps({'data': {'text': 'labeled'}, 'annotations': [{'result': []}]}))
+
+    ProjectAnnotationsCounter.objects.create(project=project, value=Annotation.objects.filter(project=project).count())
+    storage = LocalFilesImportStorage.objects.create(project=project, path=str(path), regex_filter='.*json')
+    storage.sync()
+
+    # skipped annotations don't complete tasks
+    tasks = {task.data['text']: task for task in project.tasks.filter(data__text__in=['skipped', 'labeled'])}
+    assert tasks['skipped'].cancelled_annotations == 1
+    assert not tasks['skipped'].is_labeled
+    assert tasks['labeled'].is_labeled
+    # bulk created annotations are counted too
+    counter = ProjectAnnotationsCounter.objects.get(project=project)
+    assert counter.value == Annotation.objects.filter(project=project).count()
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('save_task', [False, True])
+def test_export_storage_save_all_annotations(configured_project, business_client, settings, tmp_path, save_task):
+    settings.FUTURE_SAVE_TASK_TO_STORAGE = save_task
+    settings.STORAGE_EXPORT_CHUNK_SIZE = 2
+    project = configured_project
+    tasks = list(project.tasks.order_by('id'))
+    annotations = [
+        Annotation.objects.create(task=task, project=project, completed_by=business_client.user, result=[])
+        for task in tasks + tasks[:1]
+    ]
+
+    storage = LocalFilesExportStorage.objects.create(project=project, path=str(tmp_path))
+    storage.sync()
+
+    storage.refresh_from_db()
+    assert storage.status == storage.Status.COMPLETED
+    assert storage.last_sync_count == 3
+    links = LocalFilesExportStorageLink.objects.filter(storage=storage)
+    assert sorted(links.values_list('annotation_id', flat=True)) == [a.id for a in annotations]
+
+    files = {path.name: json.loads(path.read_text()) for path in tmp_path.iterdir()}
+    if save_task:
+        assert set(files) == {f'{task.id}.json' for task in tasks}
+        assert len(files[f'{tasks[0].id}.json']['annotations']) == 2
+    else:
+        assert set(files) == {str(a.id) for a in annotations}
+        assert files[str(annotations[0].id)]['task']['id'] == tasks[0].id
+
+    # the second sync updates existing links
+    storage.sync()
+    assert links.count() == 3
+
+
+@pytest.mark.django_db
+def test_export_storage_sync_uploads_changed_objects_only(configured_project, business_client, tmp_path):
+    project = configured_project
+    task = project.tasks.order_by('id').first()
+    annotations = [
+        Annotation.objects.create(task=task, project=project, completed_by=business_client.user, result=[])
+        for _i in range(3)
+    ]
+    storage = LocalFilesExportStorage.objects.create(project=project, path=str(tmp_path), can_delete_objects=True)
+    storage.sync()
+    storage.refresh_from_db()
+    assert storage.last_sync_count == 3
+
+    # nothing changed, nothing is uploaded
+    (tmp_path / str(annotations[0].id)).unlink()
+    storage.sync()
+    storage.refresh_from_db()
+    assert storage.last_sync_count == 0
+    assert storage.meta['annotations_unchanged'] == 3
+    assert not (tmp_path / str(annotations[0].id)).exists()
+
+    # changed annotation is uploaded again
+    Annotation.objects.filter(id=annotations[0].id).update(result=[{'value': 'changed'}])
+    storage.sync()
+    storage.refresh_from_db()
+    assert storage.last_sync_count == 1
+    assert json.loads((tmp_path / str(annotations[0].id)).read_text())['result'] == [{'value': 'changed'}]
+
+    # object of removed annotation is deleted
+    removed_id = annotations[2].id
+    annotations[2].delete()
+    storage.sync()
+    storage.refresh_from_db()
+    assert storage.meta['objects_deleted'] == 1
+    assert set(path.name for path in tmp_path.iterdir()) == {str(annotations[0].id), str(annotations[1].id)}
+    assert not (tmp_path / str(removed_id)).exists()
+    assert LocalFilesExportStorageLink.objects.filter(storage=storage).count() == 2
+
+
+@pytest.mark.django_db
+def test_export_storage_force_sync_and_removed_links(configured_project, business_client, tmp_path):
+    from django.core.management import call_command
+
+    project = configured_project
+    task = project.tasks.order_by('id').first()
+    annotations = [
+        Annotation.objects.create(task=task, project=project, completed_by=business_client.user, result=[])
+        for _i in range(2)
+    ]
+    storage = LocalFilesExportStorage.objects.create(project=project, path=str(tmp_path))
+    storage.sync()
+
+    # object removed from the storage by somebody else is uploaded again with force sync only
+    (tmp_path / str(annotations[0].id)).unlink()
+    storage.sync(force=True)
+    storage.refresh_from_db()
+    assert storage.last_sync_count == 2
+    assert (tmp_path / str(annotations[0].id)).exists()
+
+    # link of removed annotation checks permissions by its storage
+    removed_id = annotations[1].id
+    annotations[1].delete()
+    link = LocalFilesExportStorageLink.objects.get(storage=storage, annotation=None)
+    assert link.has_permission(business_client.user)
+
+    # links of removed annotations are dropped without sync, objects are kept if the storage can't delete them
+    call_command('delete_removed_export_objects', project=project.id)
+    assert not LocalFilesExportStorageLink.objects.filter(storage=storage, annotation=None).exists()
+    assert (tmp_path / str(removed_id)).exists()
+
+
+@pytest.mark.django_db
+def test_import_storage_caches_presigned_urls(configured_project, settings):
+    storage = GCSImportStorage.objects.create(project=configured_project, bucket='test-bucket', presign_ttl=10)
+    urls = iter(f'https://signed/{i}' for i in range(10))
+    with mock.patch.object(GCSImportStorage, 'generate_http_url', side_effect=lambda url: next(urls)) as generate:
+        resolved = storage.resolve_uri('gs://test-bucket/image.jpg')
+        assert resolved == storage.resolve_uri('gs://test-bucket/image.jpg') == 'https://signed/0'
+        assert storage.get_http_url('gs://test-bucket/other.jpg') == 'https://signed/1'
+        assert generate.call_count == 2
+
+        # URLs signed with the old credentials are not reused
+        storage.google_application_credentials = '{"type": "service_account"}'
+        storage.save()
+        assert storage.get_http_url('gs://test-bucket/other.jpg') == 'https://signed/2'
+        assert generate.call_count == 3
+
+        settings.STORAGE_PRESIGNED_URL_CACHE_TTL_RATIO = 0
+        assert storage.get_http_url('gs://test-bucket/image.jpg') == 'https://signed/3'
+
+
+def test_storage_client_pool_eviction(settings):
+    settings.STORAGE_CLIENT_POOL_SIZE = 2
+    settings.STORAGE_CLIENT_POOL_TTL = 3600
+    pool = ClientPool()
+    a = pool.get('s3', ('key-a', 'secret'), object)
+    b = pool.get('s3', ('key-b', 'secret'), object)
+    assert pool.get('s3', ('key-a', 'secret'), object) is a
+
+    # least recently used client is dropped, rotated credentials get a new client
+    pool.get('s3', ('key-a', 'rotated'), object)
+    assert len(pool) == 2
+    assert pool.get('s3', ('key-a', 'secret'), object) is a
+    assert pool.get('s3', ('key-b', 'secret'), object) is not b
+
+    settings.STORAGE_CLIENT_POOL_TTL = 0
+    assert pool.get('s3', ('key-a', 'secret'), object) is not a
@@ -1327,3 +1327,129 @@ def test_overlap_first(business_client, setup_before_upload, show_overlap_first)
     else:
         assert not all_tasks_with_overlap_are_labeled
         assert not all_tasks_without_overlap_are_not_labeled
+
+
+@pytest.mark.django_db
+def test_next_task_reservations(business_client, settings):
+    from django.core.cache import cache
+
+    settings.NEXT_TASK_RESERVATION_SIZE = 3
+    config = dict(
+        title='test_next_task_reservations',
+        is_published=True,
+        sampling=Project.SEQUENCE,
+        label_config="""
+            <View>
+              <Text name="text" value="$text"></Text>
+              <Choices name="text_class" choice="single" toName="text">
+                <Choice value="class_A"></Choice>
+                <Choice value="class_B"></Choice>
+              </Choices>
+            </View>""",
+    )
+    annotation_result = json.dumps(
+        [{'from_name': 'text_class', 'to_name': 'text', 'type': 'choices', 'value': {'choices': ['class_A']}}]
+    )
+    project = make_project(config, business_client.user)
+    task_ids = [make_task({'data': {'text': f'this is {i}'}}, project).id for i in range(5)]
+
+    ann1 = make_annotator({'email': 'ann1@testreservations.com'}, project, True)
+    ann2 = make_annotator({'email': 'ann2@testreservations.com'}, project, True)
+
+    # the first call locks the next task and reserves two more tasks in sequence order
+    r = ann1.get(f'/api/projects/{project.id}/next')
+    assert r.status_code == 200
+    assert r.json()['id'] == task_ids[0]
+    assert set(ann1.annotator.task_locks.values_list('task_id', flat=True)) == set(task_ids[:3])
+
+    # the same task is returned until it's labeled, workers don't share a local cache,
+    # so the reservation is taken from the locks only
+    cache.clear()
+    assert ann1.get(f'/api/projects/{project.id}/next').json()['id'] == task_ids[0]
+    assert set(ann1.annotator.task_locks.values_list('task_id', flat=True)) == set(task_ids[:3])
+
+    # reserved tasks are not given to other annotators
+    assert ann2.get(f'/api/projects/{project.id}/next').json()['id'] == task_ids[3]
+
+    ann1.post(f'/api/tasks/{task_ids[0]}/annotations/', data={'task': task_ids[0], 'result': annotation_result})
+    cache.clear()
+    r = ann1.get(f'/api/projects/{project.id}/next')
+    assert r.json()['id'] == task_ids[1]
+    assert r.json()['queue'] == 'Reserved queue'
+    assert set(ann1.annotator.task_locks.values_list('task_id', flat=True)) == set(task_ids[1:3])
+
+
+@pytest.mark.django_db
+def test_uniform_sampling_by_random_key(business_client):
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+
+    project = make_project(dict(title='test_uniform_sampling', sampling=Project.UNIFORM), business_client.user)
+    task_ids = {make_task({'data': {'text': f'this is {i}'}}, project).id for i in range(10)}
+    assert not Task.objects.filter(project=project, random_key__isnull=True).exists()
+
+    with CaptureQueriesContext(connection) as queries:
+        r = business_client.get(f'/api/projects/{project.id}/next')
+    assert r.status_code == 200
+    assert r.json()['id'] in task_ids
+    assert not [query['sql'] for query in queries.captured_queries if 'RANDOM()' in query['sql'].upper()]
+
+    # tasks without random keys are sampled too
+    Task.objects.get(pk=r.json()['id']).release_lock()
+    Task.objects.filter(project=project).update(random_key=None)
+    r = business_client.get(f'/api/projects/{project.id}/next')
+    assert r.status_code == 200
+    assert r.json()['id'] in task_ids
+
+    # tasks with null keys are not starved by tasks with keys
+    from projects.functions.next_task import sample_random_task_ids
+
+    Task.objects.filter(pk=min(task_ids)).update(random_key=0.5)
+    assert set(sample_random_task_ids(Task.objects.filter(project=project), 10)) == task_ids
+
+
+@pytest.mark.django_db
+def test_sequence_sampling_skips_locked_tasks_in_constant_queries(business_client):
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+
+    project = make_project(dict(title='test_sequence_locked', sampling=Project.SEQUENCE), business_client.user)
+    tasks = [make_task({'data': {'text': f'this is {i}'}}, project) for i in range(30)]
+    annotator = make_annotator({'email': 'ann@testsequencelocked.com'}, project)
+    for task in tasks[:25]:
+        task.set_lock(annotator)
+
+    with CaptureQueriesContext(connection) as queries:
+        r = business_client.get(f'/api/projects/{project.id}/next')
+    assert r.status_code == 200
+    assert r.json()['id'] == tasks[25].id
+    assert len(queries.captured_queries) < 50
+
+
+@pytest.mark.django_db
+def test_label_stream_history_items(business_client, configured_project, settings):
+    from projects.functions.stream_history import (
+        add_stream_history,
+        fill_history_annotation,
+        get_label_stream_history,
+    )
+
+    settings.LABEL_STREAM_HISTORY_LIMIT = 2
+    user = business_client.user
+    tasks = [make_task({'data': {'text': f'text {i}'}}, configured_project) for i in range(3)]
+
+    for task in tasks + [tasks[1]]:
+        add_stream_history(task, user, configured_project)
+    # the oldest task is dropped by the limit, a task taken again keeps its place
+    assert [item['taskId'] for item in get_label_stream_history(user, configured_project)] == [
+        tasks[1].id,
+        tasks[2].id,
+    ]
+
+    annotation = make_annotation({'result': []}, tasks[2].id)
+    fill_history_annotation(user, tasks[2], annotation)
+    tasks[1].delete()
+    assert get_label_stream_history(user, configured_project) == [
+        {'taskId': tasks[2].id, 'annotationId': annotation.id}
+    ]
+    assert configured_project.history_items.filter(user=user).count() == 1
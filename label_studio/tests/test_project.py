@@ -29,3 +29,59 @@ def test_update_tasks_counters_and_task_states(business_client):
     ids = set(project.tasks.all().values_list('id', flat=True))
     obj = project._update_tasks_counters_and_task_states(ids, True, True, True)
     assert obj == 0
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('summary_deltas', [False, True])
+def test_project_summary_counters(business_client, settings, summary_deltas):
+    from projects.models import ProjectSummaryDelta
+    from tests.utils import make_annotation, make_task
+
+    settings.PROJECT_SUMMARY_DELTAS = summary_deltas
+    project = make_project({}, business_client.user, use_ml_backend=False)
+    task_1 = make_task({'data': {'location': 'London', 'text': 'text A'}}, project)
+    task_2 = make_task({'data': {'text': 'text B'}}, project)
+    result = [
+        {'from_name': 'text_class', 'to_name': 'text', 'type': 'choices', 'value': {'choices': ['class_A']}},
+    ]
+    make_annotation({'result': result}, task_1.id)
+    annotation = make_annotation({'result': result}, task_2.id)
+    annotation.delete()
+    assert ProjectSummaryDelta.objects.filter(project=project).exists() is summary_deltas
+
+    r = business_client.get(f'/api/projects/{project.id}/summary/')
+    assert r.status_code == 200
+    summary = r.json()
+    assert summary['all_data_columns'] == {'location': 1, 'text': 2}
+    assert summary['common_data_columns'] == ['text']
+    assert summary['created_annotations'] == {'text_class|text|choices': 1}
+    assert summary['created_labels'] == {'text_class': {'class_A': 1}}
+    assert not ProjectSummaryDelta.objects.filter(project=project).exists()
+
+
+@pytest.mark.django_db
+def test_validate_config_reads_pending_summary_deltas(business_client, settings):
+    from core.utils.exceptions import LabelStudioValidationErrorSentryIgnored
+    from projects.models import ProjectSummaryDelta
+    from tests.utils import make_annotation, make_task
+
+    settings.PROJECT_SUMMARY_DELTAS = True
+    config = """
+        <View>
+          <Text name="text" value="$text"/>
+          <Choices name="text_class" toName="text">
+            <Choice value="class_A"/>
+            <Choice value="class_B"/>
+          </Choices>
+        </View>"""
+    project = make_project({'label_config': config}, business_client.user, use_ml_backend=False)
+    task = make_task({'data': {'text': 'text A'}}, project)
+    result = [
+        {'from_name': 'text_class', 'to_name': 'text', 'type': 'choices', 'value': {'choices': ['class_A']}},
+    ]
+    make_annotation({'result': result}, task.id)
+    assert ProjectSummaryDelta.objects.filter(project=project).exists()
+
+    # class_A is in use, it can't be removed even though its counter is in a pending delta
+    with pytest.raises(LabelStudioValidationErrorSentryIgnored):
+        project.validate_config(config.replace('<Choice value="class_A"/>', ''), strict=True)
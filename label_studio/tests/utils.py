@@ -131,13 +131,14 @@ def gcs_client_mock():
             is_json = bucket_name.endswith('_JSON')
             return DummyGCSBucket(bucket_name, is_json)
 
-        def list_blobs(self, bucket_name, prefix):
+        def list_blobs(self, bucket_name, prefix, start_offset=None):
             is_json = bucket_name.endswith('_JSON')
-            return [
+            blobs = [
                 DummyGCSBlob(bucket_name, 'abc', is_json),
                 DummyGCSBlob(bucket_name, 'def', is_json),
                 DummyGCSBlob(bucket_name, 'ghi', is_json),
             ]
+            return [blob for blob in blobs if start_offset is None or blob.name >= start_offset]
 
     with mock.patch.object(google_storage, 'Client', return_value=DummyGCSClient()):
         yield